@@ -15,6 +15,8 @@ class Settings:
     JWT_EXPIRE_MINUTES: int = 60  # Durée d'expiration du token JWT
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM")
+    # Jeton Bearer attendu sur /metrics ; sans valeur, l'endpoint n'est pas exposé
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN")
     
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET")
@@ -46,6 +48,81 @@ class Settings:
     REPLICATE_API_TOKEN: str = os.getenv("REPLICATE_API_TOKEN")
     REPLICATE_MODEL_REF: str = os.getenv("REPLICATE_MODEL_REF")
     REPLICATE_BODY_REF: str = os.getenv("REPLICATE_BODY_REF")
+    REPLICATE_API_BASE_URL: str = os.getenv("REPLICATE_API_BASE_URL", "https://api.replicate.com/v1")
+    # URL publique de POST /webhook/replicate ; sans elle les prédictions sont suivies par polling
+    REPLICATE_WEBHOOK_URL: str = os.getenv("REPLICATE_WEBHOOK_URL")
+    REPLICATE_WEBHOOK_SECRET: str = os.getenv("REPLICATE_WEBHOOK_SECRET")
+    REPLICATE_POLL_INITIAL: float = float(os.getenv("REPLICATE_POLL_INITIAL", 1))
+    REPLICATE_POLL_MAX: float = float(os.getenv("REPLICATE_POLL_MAX", 5))
+    REPLICATE_WEBHOOK_POLL_MAX: float = float(os.getenv("REPLICATE_WEBHOOK_POLL_MAX", 30))
+    REPLICATE_PREDICTION_TIMEOUT: float = float(os.getenv("REPLICATE_PREDICTION_TIMEOUT", 600))
+    REPLICATE_MAX_CONNECTIONS: int = int(os.getenv("REPLICATE_MAX_CONNECTIONS", 100))
+    REPLICATE_REQUEST_TIMEOUT: float = float(os.getenv("REPLICATE_REQUEST_TIMEOUT", 30))
+
+    TRYON_WORKER_CONCURRENCY: int = int(os.getenv("TRYON_WORKER_CONCURRENCY", 4))
+    TRYON_JOB_MAX_ATTEMPTS: int = int(os.getenv("TRYON_JOB_MAX_ATTEMPTS", 3))
+    TRYON_JOB_LEASE_SECONDS: float = float(os.getenv("TRYON_JOB_LEASE_SECONDS", 120))
+    TRYON_JOB_HEARTBEAT_SECONDS: float = float(os.getenv("TRYON_JOB_HEARTBEAT_SECONDS", 30))
+    TRYON_JOB_BACKOFF_SECONDS: float = float(os.getenv("TRYON_JOB_BACKOFF_SECONDS", 10))
+    TRYON_JOB_BACKOFF_MAX_SECONDS: float = float(os.getenv("TRYON_JOB_BACKOFF_MAX_SECONDS", 300))
+    # Déclinaisons WebP des sorties (plus grand côté en pixels), calculées dans le pool d'images
+    TRYON_THUMBNAIL_SIZE: int = int(os.getenv("TRYON_THUMBNAIL_SIZE", 256))
+    TRYON_MEDIUM_SIZE: int = int(os.getenv("TRYON_MEDIUM_SIZE", 768))
+    TRYON_WEBP_QUALITY: int = int(os.getenv("TRYON_WEBP_QUALITY", 80))
+    # Au-delà, la sortie n'est pas copiée sur disque pour le pool d'images : pas de déclinaisons
+    TRYON_RENDITION_MAX_SOURCE_BYTES: int = int(os.getenv("TRYON_RENDITION_MAX_SOURCE_BYTES", 32 * 1024 * 1024))
+    IMAGE_POOL_WORKERS: int = int(os.getenv("IMAGE_POOL_WORKERS", 2))
+    TRYON_PAGE_SIZE: int = int(os.getenv("TRYON_PAGE_SIZE", 24))
+    TRYON_PAGE_SIZE_MAX: int = int(os.getenv("TRYON_PAGE_SIZE_MAX", 100))
+    TRYON_BATCH_MAX_ITEMS: int = int(os.getenv("TRYON_BATCH_MAX_ITEMS", 20))
+    # Durée de validité des URLs d'entrée signées à la création d'un batch et portées par ses jobs
+    TRYON_BATCH_URL_EXPIRES: int = int(os.getenv("TRYON_BATCH_URL_EXPIRES", 6 * 3600))
+    WORKER_POLL_INTERVAL: float = float(os.getenv("WORKER_POLL_INTERVAL", 1))
+    TRYON_EVENTS_RELAY: bool = os.getenv("TRYON_EVENTS_RELAY", "true").lower() == "true"
+    # Pour le dev en un seul process : le worker tourne dans le lifespan de l'API
+    TRYON_EMBEDDED_WORKER: bool = os.getenv("TRYON_EMBEDDED_WORKER", "false").lower() == "true"
+
+    EXPLORER_MODEL_NAME: str = os.getenv("EXPLORER_MODEL_NAME", "paraphrase-MiniLM-L6-v2")
+    EXPLORER_MODEL_BACKEND: str = os.getenv("EXPLORER_MODEL_BACKEND", "torch")
+    EXPLORER_ONNX_FILE: str = os.getenv("EXPLORER_ONNX_FILE", "onnx/model_qint8_avx2.onnx")
+    EXPLORER_PRELOAD_MODEL: bool = os.getenv("EXPLORER_PRELOAD_MODEL", "true").lower() == "true"
+    EXPLORER_BATCH_WINDOW_MS: float = float(os.getenv("EXPLORER_BATCH_WINDOW_MS", 5))
+    EXPLORER_BATCH_MAX_SIZE: int = int(os.getenv("EXPLORER_BATCH_MAX_SIZE", 32))
+    EXPLORER_QUERY_CACHE_SIZE: int = int(os.getenv("EXPLORER_QUERY_CACHE_SIZE", 10000))
+    EXPLORER_QUERY_CACHE_TTL: int = int(os.getenv("EXPLORER_QUERY_CACHE_TTL", 86400))
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+    HTTP_RETRY_ATTEMPTS: int = int(os.getenv("HTTP_RETRY_ATTEMPTS", 3))
+    DOWNLOAD_MAX_CONNECTIONS: int = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS", 50))
+    DOWNLOAD_READ_TIMEOUT: float = float(os.getenv("DOWNLOAD_READ_TIMEOUT", 30))
+    PINTEREST_MAX_CONNECTIONS: int = int(os.getenv("PINTEREST_MAX_CONNECTIONS", 20))
+    PINTEREST_REQUEST_TIMEOUT: float = float(os.getenv("PINTEREST_REQUEST_TIMEOUT", 5))
+    PINTEREST_CSRF_TTL: int = int(os.getenv("PINTEREST_CSRF_TTL", 3600))
+    PINTEREST_CSRF_REFRESH_AHEAD: int = int(os.getenv("PINTEREST_CSRF_REFRESH_AHEAD", 300))
+    PINTEREST_CSRF_BACKGROUND_REFRESH: bool = os.getenv("PINTEREST_CSRF_BACKGROUND_REFRESH", "true").lower() == "true"
+    EXPLORER_QUERY_CACHE_PERSIST: bool = os.getenv("EXPLORER_QUERY_CACHE_PERSIST", "false").lower() == "true"
+    EXPLORER_SEARCH_CACHE_SIZE: int = int(os.getenv("EXPLORER_SEARCH_CACHE_SIZE", 2000))
+    EXPLORER_SEARCH_CACHE_TTL: int = int(os.getenv("EXPLORER_SEARCH_CACHE_TTL", 600))
+    EXPLORER_SEARCH_CACHE_STALE_TTL: int = int(os.getenv("EXPLORER_SEARCH_CACHE_STALE_TTL", 3600))
+    EXPLORER_SEARCH_CACHE_PERSIST: bool = os.getenv("EXPLORER_SEARCH_CACHE_PERSIST", "false").lower() == "true"
+    EXPLORER_PREFETCH_ENABLED: bool = os.getenv("EXPLORER_PREFETCH_ENABLED", "true").lower() == "true"
+    EXPLORER_PREFETCH_CONCURRENCY: int = int(os.getenv("EXPLORER_PREFETCH_CONCURRENCY", 4))
+    EXPLORER_PREFETCH_CACHE_SIZE: int = int(os.getenv("EXPLORER_PREFETCH_CACHE_SIZE", 1000))
+    EXPLORER_PREFETCH_TTL: int = int(os.getenv("EXPLORER_PREFETCH_TTL", 120))
+    EXPLORER_CATALOG_LOOKUP: bool = os.getenv("EXPLORER_CATALOG_LOOKUP", "false").lower() == "true"
+    EXPLORER_CATALOG_PAGE_SIZE: int = int(os.getenv("EXPLORER_CATALOG_PAGE_SIZE", 25))
+    EXPLORER_VOCAB_PATH: str = os.getenv("EXPLORER_VOCAB_PATH", "data/explorer_vocab.npz")
+    EXPLORER_INDEX_PATH: str = os.getenv("EXPLORER_INDEX_PATH", "data/explorer_index")
+    EXPLORER_INDEX_DTYPE: str = os.getenv("EXPLORER_INDEX_DTYPE", "float32")
+    EXPLORER_INDEX_TOP_K: int = int(os.getenv("EXPLORER_INDEX_TOP_K", 25))
+    # Intervalle (s) entre deux vérifications d'une nouvelle version de l'index et du vocabulaire sur disque
+    EXPLORER_INDEX_RELOAD_INTERVAL: float = float(os.getenv("EXPLORER_INDEX_RELOAD_INTERVAL", 30))
+    EXPLORER_HYBRID_REMOTE_TIMEOUT: float = float(os.getenv("EXPLORER_HYBRID_REMOTE_TIMEOUT", 2))
+    EXPLORER_DEDUP_ENABLED: bool = os.getenv("EXPLORER_DEDUP_ENABLED", "true").lower() == "true"
+    EXPLORER_DEDUP_SESSIONS: int = int(os.getenv("EXPLORER_DEDUP_SESSIONS", 10000))
+    EXPLORER_DEDUP_TTL: int = int(os.getenv("EXPLORER_DEDUP_TTL", 1800))
+    EXPLORER_DEDUP_CAPACITY: int = int(os.getenv("EXPLORER_DEDUP_CAPACITY", 2000))
+    EXPLORER_DEDUP_ERROR_RATE: float = float(os.getenv("EXPLORER_DEDUP_ERROR_RATE", 0.001))
 
     model_config = ConfigDict(
         env_file = ".env"
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.core.metrics import metrics
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache mémoire borné : éviction LRU au-delà de `maxsize`, expiration après
+    `ttl` secondes (None = pas d'expiration). Les hits/misses/évictions sont
+    comptés dans `metrics` sous `cache.<name>.*`.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+
+    def _count(self, event: str):
+        metrics.inc(f"cache.{self.name}.{event}")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ Retourne la valeur si présente et non expirée, sinon `default` """
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """ Retourne (valeur, âge en secondes) si présente et non expirée, sinon None """
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self._count("misses")
+            return None
+
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if self._expired(stored_at):
+            del self._data[key]
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        self._data.move_to_end(key)
+        self._count("hits")
+        return value, age
+
+    def set(self, key: Hashable, value: Any, age: float = 0):
+        """ `age` permet de réinjecter une entrée venant d'un autre tier sans la rajeunir """
+        self._data[key] = (value, time.monotonic() - age)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._count("evictions")
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """ Retire l'entrée ; une entrée expirée est jetée et renvoie `default` """
+        entry = self._data.pop(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        if self._expired(entry[1]):
+            self._count("expired")
+            return default
+        return entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key, _MISSING)
+        return entry is not _MISSING and not self._expired(entry[1])
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,27 @@
+# app/core/pagination.py
+"""
+Curseurs de pagination opaques : la position du dernier élément d'une page,
+sérialisée en JSON puis en base64 url-safe. Le client renvoie simplement le
+`next_cursor` reçu dans le paramètre `after`.
+"""
+
+import base64
+import json
+from typing import Any, Dict
+
+from app.core.errors import ValidationError
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValidationError("Invalid pagination cursor")
+    if not isinstance(position, dict):
+        raise ValidationError("Invalid pagination cursor")
+    return position
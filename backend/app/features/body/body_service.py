@@ -12,12 +12,14 @@ from app.infrastructure.storage.storage_repo import StorageRepository
 from app.infrastructure.storage.storage_path_builder import StoragePathBuilder
 from app.core.errors import NotFoundError, UnauthorizedError
 from app.core.config import settings
-import replicate
+from app.infrastructure.replicate.replicate_client import ReplicatePredictions, configured_webhook_url
 
 class BodyService:
-    def __init__(self, repo: BodyRepository, storage: StorageRepository = None):
+    def __init__(self, repo: BodyRepository, storage: StorageRepository = None, predictions: ReplicatePredictions = None):
         self.repo = repo
         self.storage = storage or StorageRepository()
+        # Côté API le webhook /webhook/replicate réveille l'attente dès la fin du run
+        self.predictions = predictions or ReplicatePredictions(webhook_url=configured_webhook_url())
 
     # ✅ Upload + Preprocessing
     async def upload_body(self, user, image: UploadFile) -> BodyUploadResponse:
@@ -69,15 +71,13 @@ class BodyService:
             # 1️⃣ Génère URL signée pour le modèle
             original_url = await self.storage.get_presigned_url(original_key)
 
-            # 2️⃣ Appel IA Replicate (exécuté dans un thread)
-            raw_output: dict = await asyncio.to_thread(
-                lambda: replicate.run(
-                    settings.REPLICATE_BODY_REF,
-                    input={
-                        "image": original_url,
-                        "max_height": 512,
-                    }
-                )
+            # 2️⃣ Appel IA Replicate (prédiction suivie sur l'event loop)
+            raw_output: dict = await self.predictions.run(
+                settings.REPLICATE_BODY_REF,
+                input={
+                    "image": original_url,
+                    "max_height": 512,
+                }
             )
 
             if not isinstance(raw_output, dict):
@@ -85,15 +85,15 @@ class BodyService:
 
             logger.info(f"✅ [IA] Replicate returned: {raw_output}")
 
-            # ✅ 3️⃣ (a) Lire le FileOutput pour l'original et overwrite sur S3
+            # ✅ 3️⃣ (a) Télécharger l'original retourné par le modèle et overwrite sur S3
             original_file = raw_output.get("original")
             if not original_file:
                 raise ValueError("Pas de champ 'original' dans la sortie IA")
 
-            orig_bytes = await asyncio.to_thread(original_file.read)
+            orig_bytes = await self.predictions.download(original_file)
             await self.storage.upload_image(original_key, orig_bytes)
 
-            # ✅ 3️⃣ (b) Lire et uploader chaque mask
+            # ✅ 3️⃣ (b) Télécharger et uploader chaque mask
             mask_map = {
                 "upper": "upper",
                 "lower": "lower",
@@ -105,7 +105,7 @@ class BodyService:
                 if not mask_file:
                     raise ValueError(f"Pas de mask '{model_key}' dans la sortie IA")
 
-                mask_bytes = await asyncio.to_thread(mask_file.read)
+                mask_bytes = await self.predictions.download(mask_file)
 
                 s3_key = StoragePathBuilder.body_mask(user_id, body_id, mask_type)
                 await self.storage.upload_image(s3_key, mask_bytes)
@@ -117,11 +117,9 @@ class BodyService:
             logger.info(f"✅ [IA] Body preprocessing done for {body_id}")
 
             # ✅ 5️⃣ Génère URLs signées pour le front
-            presigned_original = await self.storage.get_presigned_url(original_key)
-            presigned_masks = {
-                field: await self.storage.get_presigned_url(key)
-                for field, key in s3_masks.items()
-            }
+            urls = await self.storage.presign_many([original_key, *s3_masks.values()])
+            presigned_original = urls[original_key]
+            presigned_masks = {field: urls[key] for field, key in s3_masks.items()}
 
             # ✅ 6️⃣ SSE pour prévenir le front
             await pubsub_manager.publish(
@@ -147,13 +145,13 @@ class BodyService:
     # ✅ Liste des bodies
     async def get_all_bodies(self, user) -> BodyListResponse:
         bodies = await self.repo.get_all_bodies(user.id)
+        urls = await self.storage.presign_many(b.image_url for b in bodies)
         response_items = []
 
         for b in bodies:
-            presigned_url = await self.storage.get_presigned_url(b.image_url)
             response_items.append(BodyItem(
                 id=str(b.id),
-                image_url=presigned_url,
+                image_url=urls.get(b.image_url),
                 status=b.status,
                 is_default=b.is_default,
                 created_at=b.created_at
@@ -167,10 +165,11 @@ class BodyService:
         if not body:
             raise NotFoundError("No body found.")
 
-        mask_upper_url = await self.storage.get_presigned_url(body.mask_upper)
-        mask_lower_url = await self.storage.get_presigned_url(body.mask_lower)
-        mask_dress_url = await self.storage.get_presigned_url(body.mask_dress)
-        original_url = await self.storage.get_presigned_url(body.image_url)
+        urls = await self.storage.presign_many([body.mask_upper, body.mask_lower, body.mask_dress, body.image_url])
+        mask_upper_url = urls.get(body.mask_upper)
+        mask_lower_url = urls.get(body.mask_lower)
+        mask_dress_url = urls.get(body.mask_dress)
+        original_url = urls.get(body.image_url)
         
         return BodyItem(
             id=str(body.id),
@@ -189,10 +188,11 @@ class BodyService:
         if str(body.user_id) != str(user.id):
             raise UnauthorizedError("You do not own this body.")
 
-        mask_upper_url = await self.storage.get_presigned_url(body.mask_upper)
-        mask_lower_url = await self.storage.get_presigned_url(body.mask_lower)
-        mask_dress_url = await self.storage.get_presigned_url(body.mask_dress)
-        original_url = await self.storage.get_presigned_url(body.image_url)
+        urls = await self.storage.presign_many([body.mask_upper, body.mask_lower, body.mask_dress, body.image_url])
+        mask_upper_url = urls.get(body.mask_upper)
+        mask_lower_url = urls.get(body.mask_lower)
+        mask_dress_url = urls.get(body.mask_dress)
+        original_url = urls.get(body.image_url)
 
         return BodyMasksResponse(
             original=original_url,
@@ -40,6 +40,14 @@ class ClothingRepository:
         doc = await self._col.find_one({"_id": ObjectId(clothing_id)})
         return ClothingModel(**doc) if doc else None
 
+    async def get_clothes_by_ids(self, user_id: str, clothing_ids: List[str]) -> List[ClothingModel]:
+        """ Vêtements de l'utilisateur parmi `clothing_ids`, en une requête $in (les autres sont absents) """
+        docs = await self._col.find({
+            "_id": {"$in": [ObjectId(clothing_id) for clothing_id in clothing_ids]},
+            "user_id": ObjectId(user_id),
+        }).to_list(length=None)
+        return [ClothingModel(**doc) for doc in docs]
+
     async def delete_clothing(self, clothing_id: str) -> bool:
         result = await self._col.delete_one({"_id": ObjectId(clothing_id)})
         return result.deleted_count == 1
@@ -39,7 +39,7 @@ class ClothingService:
         )
 
         # 3. Génère URL signée
-        signed_url = await self.storage.get_presigned_url(clothing.image_url)
+        signed_url = (await self.storage.presign_many([clothing.image_url]))[clothing.image_url]
 
         return ClothingUploadResponse(
             clothing_id=str(clothing_id),
@@ -55,17 +55,15 @@ class ClothingService:
     # ✅ Get all clothing
     async def get_clothes(self, user, category: str = None) -> ClothingListResponse:
         records = await self.repo.get_clothes(user.id, category)
+        urls = await self.storage.presign_many(
+            key for r in records for key in (r.image_url, r.resized_url)
+        )
         items = []
         for r in records:
-            signed_url = await self.storage.get_presigned_url(r.image_url)
-            resized_url = (
-                await self.storage.get_presigned_url(r.resized_url)
-                if r.resized_url else None
-            )
             items.append(ClothingItem(
                 id=str(r.id),
-                image_url=signed_url,
-                resized_url=resized_url,
+                image_url=urls.get(r.image_url),
+                resized_url=urls.get(r.resized_url) if r.resized_url else None,
                 category=r.category,
                 cloth_type=r.cloth_type,
                 name=r.name,
@@ -81,13 +79,11 @@ class ClothingService:
         if str(r.user_id) != str(user.id):
             raise UnauthorizedError("Access denied.")
 
+        urls = await self.storage.presign_many([r.image_url, r.resized_url])
         return ClothingDetailResponse(
             id=str(r.id),
-            image_url=await self.storage.get_presigned_url(r.image_url),
-            resized_url=(
-                await self.storage.get_presigned_url(r.resized_url)
-                if r.resized_url else None
-            ),
+            image_url=urls[r.image_url],
+            resized_url=urls.get(r.resized_url) if r.resized_url else None,
             category=r.category,
             cloth_type=r.cloth_type,
             name=r.name,
@@ -116,14 +112,12 @@ class ClothingService:
             raise UnauthorizedError("Access denied.")
 
         updated = await self.repo.update_clothing(clothing_id, payload)
+        urls = await self.storage.presign_many([updated.image_url, updated.resized_url])
 
         return ClothingDetailResponse(
             id=str(updated.id),
-            image_url=await self.storage.get_presigned_url(updated.image_url),
-            resized_url=(
-                await self.storage.get_presigned_url(updated.resized_url)
-                if updated.resized_url else None
-            ),
+            image_url=urls[updated.image_url],
+            resized_url=urls.get(updated.resized_url) if updated.resized_url else None,
             category=updated.category,
             cloth_type=updated.cloth_type,
             name=updated.name,
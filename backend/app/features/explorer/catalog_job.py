@@ -0,0 +1,237 @@
+# app/features/explorer/catalog_job.py
+"""
+Pré‐chauffage du catalogue local à partir des combinaisons de KeyWordsSet.
+
+Usage :
+    python -m app.features.explorer.catalog_job --sets fr en styles --sample 500 \\
+        --concurrency 4 --rate 2 --pages 2
+
+Chaque recherche passe par `transform_as_clothe_query`, comme au runtime :
+le catalogue est indexé par la query que la recherche consultera.
+
+Le job est reprenable (checkpoint Mongo par nom de job, échecs notés à part
+et rejoués au run suivant) et idempotent (upsert des produits par pin id) :
+le relancer après une interruption reprend là où il s'était arrêté.
+"""
+
+import argparse
+import asyncio
+import random
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.infrastructure.database.mongodb import MongoDB
+from app.infrastructure.http.http_clients import ClientProfile, HttpClients
+from .csrf_token_cache import csrf_token_cache
+from .embedding_batcher import fashion_batcher
+from .explorer_repo import ExplorerRepository
+from .explorer_service import ExplorerService
+from .keywordsset import EnglishKeyWordsSet, EnglishStyleWordsSet, FrenchKeyWordsSet
+from .model_registry import ModelRegistry
+from .pinterest_scraper import AsyncPinterestScraper
+from .query_cache import normalize_query
+
+Search = Tuple[str, Optional[str]]
+QueryTransform = Callable[[str, Optional[str]], Awaitable[str]]
+
+KEYWORD_SETS = {
+    "fr": FrenchKeyWordsSet,
+    "en": EnglishKeyWordsSet,
+}
+
+
+def build_queries(sets: List[str], sample: Optional[int] = None, seed: int = 0) -> List[Search]:
+    """
+    Liste déterministe des recherches (query, genre) à pré‐chauffer : mêmes
+    arguments, même ordre, ce qui rend le checkpoint (un index dans cette
+    liste) valable entre deux runs. Le genre est séparé comme dans les
+    requêtes du front, pour passer par la même transformation.
+    """
+    searches: List[Search] = []
+    for name in sets:
+        if name == "styles":
+            searches += [
+                (f"{style} outfit", gender)
+                for style in EnglishStyleWordsSet().generate_style_combinations()
+                for gender in EnglishKeyWordsSet.genders
+            ]
+        else:
+            searches += [
+                (combo.model_copy(update={"gender": None}).to_query(), combo.gender)
+                for combo in KEYWORD_SETS[name]().generate_combinations()
+            ]
+
+    searches = list(dict.fromkeys(searches))
+    if sample and sample < len(searches):
+        searches = random.Random(seed).sample(searches, sample)
+    return searches
+
+
+async def join_gender(query: str, gender: Optional[str] = None) -> str:
+    """ Transformation par défaut, sans modèle : query normalisée suivie du genre """
+    return normalize_query(f"{query} {gender or ''}")
+
+
+class RateLimiter:
+    """Espace les requêtes sortantes d'au moins 1/rate seconde."""
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delay = self._next_slot - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_slot = max(now, self._next_slot) + self._interval
+
+
+class CatalogJob:
+    def __init__(
+        self,
+        repo: ExplorerRepository,
+        scraper: AsyncPinterestScraper,
+        job_name: str,
+        transform: QueryTransform = join_gender,
+        concurrency: int = 4,
+        rate: float = 2,
+        nb_pages: int = 1,
+        is_buyable: bool = True,
+        checkpoint_every: int = 20,
+    ):
+        self.repo = repo
+        self.scraper = scraper
+        self.job_name = job_name
+        # Même transformation qu'à la recherche : le catalogue est indexé par la query réellement cherchée
+        self.transform = transform
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.nb_pages = max(1, nb_pages)
+        self.is_buyable = is_buyable
+        self.checkpoint_every = checkpoint_every
+
+    async def _scrape(self, query: str) -> Tuple[List[dict], Optional[str]]:
+        products: List[dict] = []
+        bookmark, csrf_token = None, None
+        for _ in range(self.nb_pages):
+            await self.limiter.wait()
+            page = await self.scraper.get_page(
+                query=query, bookmark=bookmark, csrf_token=csrf_token, is_buyable=self.is_buyable
+            )
+            products += page["products"]
+            bookmark, csrf_token = page.get("bookmark"), page.get("csrf_token")
+            if not bookmark:
+                break
+        return products, bookmark
+
+    async def _process(self, search: Search) -> int:
+        query = await self.transform(*search)
+        products, next_bookmark = await self._scrape(query)
+        await self.repo.upsert_catalog_products(query, products)
+        await self.repo.set_catalog_query(query, next_bookmark, len(products))
+        return len(products)
+
+    async def run(self, searches: List[Search]) -> Dict[str, int]:
+        start = await self.repo.get_job_checkpoint(self.job_name)
+        total = len(searches)
+        # Les échecs des runs précédents sont rejoués avant de reprendre au checkpoint
+        failed = {index for index in await self.repo.get_job_failures(self.job_name) if index < total}
+        logger.info(
+            f"🟡 [Catalog] Job '{self.job_name}': {total - start} queries left (from {start}), "
+            f"{len(failed)} failed to retry"
+        )
+
+        stats = {"queries": 0, "products": 0, "errors": 0}
+        pending = iter([*sorted(failed), *range(start, total)])
+        completed = set()
+        watermark = start
+
+        async def worker():
+            nonlocal watermark
+            for index in pending:
+                try:
+                    stats["products"] += await self._process(searches[index])
+                except Exception as e:
+                    stats["errors"] += 1
+                    logger.warning(f"🔶 [Catalog] Query '{searches[index]}' failed: {e}")
+                    if index not in failed:
+                        await self.repo.add_job_failure(self.job_name, index)
+                else:
+                    if index in failed:
+                        await self.repo.remove_job_failure(self.job_name, index)
+                stats["queries"] += 1
+                if index < start:
+                    continue
+
+                # Checkpoint = plus petit index dont tous les prédécesseurs sont traités
+                completed.add(index)
+                while watermark in completed:
+                    completed.discard(watermark)
+                    watermark += 1
+                if stats["queries"] % self.checkpoint_every == 0:
+                    await self.repo.set_job_checkpoint(self.job_name, watermark, total)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        await self.repo.set_job_checkpoint(self.job_name, watermark, total)
+        logger.info(f"🟢 [Catalog] Job '{self.job_name}' done: {stats}")
+        return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pré‐chauffe le catalogue explorer depuis Pinterest")
+    parser.add_argument("--sets", nargs="+", default=["fr", "en"], choices=[*KEYWORD_SETS, "styles"])
+    parser.add_argument("--sample", type=int, default=None, help="Nombre de queries tirées au hasard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2, help="Requêtes Pinterest par seconde")
+    parser.add_argument("--pages", type=int, default=1, help="Pages Pinterest par query")
+    parser.add_argument("--job-name", default=None)
+    parser.add_argument("--restart", action="store_true", help="Ignore le checkpoint existant")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    searches = build_queries(args.sets, sample=args.sample, seed=args.seed)
+    job_name = args.job_name or f"{'-'.join(args.sets)}:{args.sample or 'all'}:{args.seed}"
+
+    await MongoDB.connect(db_url=settings.MONGODB_URI, db_name=settings.MONGODB_DB)
+    await HttpClients.connect({
+        "pinterest": ClientProfile(
+            limit_per_host=args.concurrency,
+            total_timeout=settings.PINTEREST_REQUEST_TIMEOUT,
+        ),
+    })
+    # Le scoring fashion de la transformation a besoin du modèle partagé
+    await ModelRegistry.load(settings.EXPLORER_MODEL_NAME)
+    try:
+        repo = ExplorerRepository(MongoDB.get_database())
+        await repo.ensure_catalog_indexes()
+        if args.restart:
+            await repo.reset_job(job_name, len(searches))
+
+        job = CatalogJob(
+            repo,
+            AsyncPinterestScraper(),
+            job_name=job_name,
+            transform=ExplorerService(repo).transform_as_clothe_query,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            nb_pages=args.pages,
+        )
+        await job.run(searches)
+    finally:
+        await csrf_token_cache.close()
+        await fashion_batcher.close()
+        await ModelRegistry.close()
+        await HttpClients.close()
+        await MongoDB.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -37,4 +37,11 @@ PINTEREST_BASE_HEADERS = {
     "Sec-Fetch-Dest": "empty",
     "Sec-Fetch-Mode": "cors",
     "Sec-Fetch-Site": "same-origin",
-}
\ No newline at end of file
+}
+
+FASHION_CONCEPTS = [
+    "clothing", "outfit", "apparel", "clothing style",
+    "fashion", "t-shirt", "dress", "hoodie",
+    "model outfit", "runway look", "tshirt",
+    "hoodie outfit", "pants",
+]
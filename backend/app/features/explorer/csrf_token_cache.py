@@ -0,0 +1,104 @@
+# app/features/explorer/csrf_token_cache.py
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.metrics import metrics
+
+TokenFetcher = Callable[[], Awaitable[str]]
+
+
+class CsrfTokenCache:
+    """
+    Token CSRF Pinterest partagé par le process.
+
+    - TTL : le token est réutilisé jusqu'à expiration au lieu d'un GET de la home à chaque recherche.
+    - Refresh-ahead : une tâche de fond le renouvelle `refresh_ahead` secondes avant l'expiration.
+    - Single-flight : les appelants concurrents partagent un seul refresh en cours.
+    """
+
+    def __init__(self, ttl: float, refresh_ahead: float, retry_delay: float = 30):
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.retry_delay = retry_delay
+        self._token: Optional[str] = None
+        self._expires_at: float = 0
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    async def get(self, fetch: TokenFetcher) -> str:
+        """ Retourne le token courant, ou le récupère s'il est absent/expiré """
+        if self._is_fresh():
+            metrics.inc("explorer.csrf_token.hits")
+            return self._token
+        metrics.inc("explorer.csrf_token.misses")
+        return await self._refresh(fetch)
+
+    async def refresh(self, fetch: TokenFetcher, stale_token: Optional[str] = None) -> str:
+        """
+        Force un refresh (ex. après un 403). Si un autre appelant a déjà remplacé
+        `stale_token`, le nouveau token est renvoyé sans nouvel appel.
+        """
+        if stale_token is not None and self._token not in (None, stale_token) and self._is_fresh():
+            return self._token
+        return await self._refresh(fetch)
+
+    async def _refresh(self, fetch: TokenFetcher) -> str:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._fetch(fetch))
+        # shield : l'annulation d'un appelant ne doit pas annuler le refresh des autres
+        return await asyncio.shield(self._inflight)
+
+    async def _fetch(self, fetch: TokenFetcher) -> str:
+        try:
+            token = await fetch()
+            self._token = token
+            self._expires_at = time.monotonic() + self.ttl
+            metrics.inc("explorer.csrf_token.refreshes")
+            logger.info("🔑 [Pinterest] CSRF token refreshed")
+            return token
+        except Exception:
+            metrics.inc("explorer.csrf_token.refresh_errors")
+            raise
+        finally:
+            self._inflight = None
+
+    def start(self, fetch: TokenFetcher):
+        """ Lance la tâche de refresh-ahead (appelé par le lifespan) """
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._run_refresher(fetch))
+
+    async def _run_refresher(self, fetch: TokenFetcher):
+        while True:
+            delay = 0
+            if self._token is not None:
+                delay = max(self._expires_at - self.refresh_ahead - time.monotonic(), 0)
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh(fetch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("🔶 [Pinterest] Background CSRF refresh failed, retrying later")
+                await asyncio.sleep(self.retry_delay)
+
+    def invalidate(self):
+        self._token = None
+        self._expires_at = 0
+
+    async def close(self):
+        if self._refresher and not self._refresher.done():
+            self._refresher.cancel()
+        self._refresher = None
+
+
+csrf_token_cache = CsrfTokenCache(
+    ttl=settings.PINTEREST_CSRF_TTL,
+    refresh_ahead=settings.PINTEREST_CSRF_REFRESH_AHEAD,
+)
@@ -0,0 +1,108 @@
+# app/features/explorer/embedding_batcher.py
+
+import asyncio
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.metrics import metrics
+from .model_registry import ModelRegistry
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher asyncio des encodages de queries.
+
+    Les queries concurrentes sont accumulées pendant `window_ms` (ou jusqu'à
+    `max_batch_size`), encodées en un seul forward pass, puis comparées aux
+    concepts en une seule opération matricielle. Chaque appelant récupère
+    via sa future son score fashion (`score`) ou l'embedding lui-même
+    (`embed`, recherche dans l'index local).
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        self._window = window_ms / 1000
+        self._max_batch_size = max(1, max_batch_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def score(self, query: str) -> float:
+        """ Retourne la meilleure similarité cosinus entre la query et les concepts fashion """
+        return await self._submit(query, want_embedding=False)
+
+    async def embed(self, query: str) -> np.ndarray:
+        """ Retourne l'embedding normalisé de la query """
+        return await self._submit(query, want_embedding=True)
+
+    async def _submit(self, query: str, want_embedding: bool):
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((query, future, want_embedding))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self._window
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Les appelants annulés entre-temps ne coûtent pas de forward pass
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                await self._process(batch)
+
+    async def _process(self, batch: List[Tuple[str, asyncio.Future, bool]]):
+        metrics.observe("explorer.embedding_batch_size", len(batch), buckets=BATCH_SIZE_BUCKETS)
+        try:
+            embeddings, scores = await asyncio.to_thread(self._encode_batch, [query for query, _, _ in batch])
+        except Exception as e:
+            logger.exception("🔴 [Explorer] Batched embedding failed")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, want_embedding), embedding, score in zip(batch, embeddings, scores):
+            if not future.done():
+                future.set_result(embedding if want_embedding else float(score))
+
+    @staticmethod
+    def _encode_batch(queries: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        embeddings = ModelRegistry.get_model().encode(
+            queries, convert_to_numpy=True, normalize_embeddings=True
+        )
+        # Embeddings normalisés : la similarité cosinus est un simple produit matriciel
+        similarities = embeddings @ ModelRegistry.get_concept_embeddings().T
+        return embeddings, similarities.max(axis=1)
+
+    async def close(self):
+        """ Arrête le worker (appelé à l'arrêt de l'app) """
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+        self._worker = None
+        self._queue = None
+
+
+fashion_batcher = EmbeddingBatcher(
+    window_ms=settings.EXPLORER_BATCH_WINDOW_MS,
+    max_batch_size=settings.EXPLORER_BATCH_MAX_SIZE,
+)
@@ -5,6 +5,9 @@ from typing import List, Union, Optional
 
 
 class PinterestProduct(BaseModel):
+    pin_id: Optional[str] = Field(
+        default=None, description="Pinterest pin identifier"
+    )
     product_url: Optional[str] = Field(
         default=None, description="URL of the Pinterest product page"
     )
@@ -39,6 +42,10 @@ class ProductsPage(BaseModel):
         default="en",
         description="Language of the Pinterest page, default is French",
     )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Feed session used for cross-page deduplication",
+    )
 
 
 class KeywordsClothingQuery(BaseModel):
@@ -54,3 +61,14 @@ class KeywordsClothingQuery(BaseModel):
         default="en",
         description="Language of the query, default is French",
     )
+
+    def to_query(self) -> str:
+        """Construit la query de recherche : type, couleur, nuance, taille puis genre."""
+        parts = [
+            self.clothing_type,
+            self.color,
+            self.color_adjective,
+            self.size_adjective,
+            self.gender,
+        ]
+        return " ".join(part for part in parts if part)
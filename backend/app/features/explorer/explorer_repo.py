@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+CATALOG_PRODUCT_FIELDS = ("pin_id", "product_url", "description", "image_url", "pinterest_url")
+
+
+class ExplorerRepository:
+    def __init__(self, db: Database):
+        self._query_cache = db["explorer_query_cache"]
+        self._search_cache = db["explorer_search_cache"]
+        self._catalog = db["explorer_catalog"]
+        self._catalog_queries = db["explorer_catalog_queries"]
+        self._catalog_jobs = db["explorer_catalog_jobs"]
+
+    async def ensure_indexes(self, query_cache_ttl: int, search_cache_ttl: int):
+        """ Index TTL : Mongo purge lui-même les entrées expirées """
+        await self._query_cache.create_index("updated_at", expireAfterSeconds=query_cache_ttl)
+        await self._search_cache.create_index("updated_at", expireAfterSeconds=search_cache_ttl)
+
+    async def get_cached_query(self, key: str) -> Optional[dict]:
+        doc = await self._query_cache.find_one(
+            {"_id": key}, {"_id": 0, "score": 1, "transformed_query": 1}
+        )
+        return doc
+
+    async def set_cached_query(self, key: str, score: float, transformed_query: str):
+        await self._query_cache.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "score": score,
+                    "transformed_query": transformed_query,
+                    "updated_at": datetime.now(),
+                }
+            },
+            upsert=True,
+        )
+
+    async def get_cached_page(self, key: str) -> Optional[Tuple[dict, float]]:
+        """ Retourne (page, âge en secondes) """
+        doc = await self._search_cache.find_one({"_id": key}, {"page": 1, "updated_at": 1})
+        if not doc:
+            return None
+        age = (datetime.now() - doc["updated_at"]).total_seconds()
+        return doc["page"], age
+
+    async def set_cached_page(self, key: str, page: dict):
+        await self._search_cache.update_one(
+            {"_id": key},
+            {"$set": {"page": page, "updated_at": datetime.now()}},
+            upsert=True,
+        )
+
+    # ---- Catalogue local (pré‐chauffé par catalog_job) ----
+
+    async def ensure_catalog_indexes(self):
+        await self._catalog.create_index("queries")
+
+    async def upsert_catalog_products(self, query: str, products: List[dict]) -> int:
+        """ Upsert idempotent par pin id ; la query est ajoutée à la liste des queries du produit """
+        now = datetime.now()
+        operations = [
+            UpdateOne(
+                {"_id": product["pin_id"]},
+                {
+                    "$set": {
+                        **{field: product.get(field) for field in CATALOG_PRODUCT_FIELDS},
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                    "$addToSet": {"queries": query},
+                },
+                upsert=True,
+            )
+            for product in products
+            if product.get("pin_id")
+        ]
+        if not operations:
+            return 0
+        result = await self._catalog.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    async def set_catalog_query(self, query: str, next_bookmark: Optional[str], product_count: int):
+        await self._catalog_queries.update_one(
+            {"_id": query},
+            {
+                "$set": {
+                    "next_bookmark": next_bookmark,
+                    "product_count": product_count,
+                    "updated_at": datetime.now(),
+                }
+            },
+            upsert=True,
+        )
+
+    async def get_catalog_page(self, query: str, limit: int) -> Optional[dict]:
+        """ Première page servie depuis le catalogue ; le bookmark permet de continuer sur Pinterest """
+        entry = await self._catalog_queries.find_one({"_id": query})
+        if not entry:
+            return None
+        docs = await self._catalog.find(
+            {"queries": query}, {field: 1 for field in CATALOG_PRODUCT_FIELDS}
+        ).limit(limit).to_list(length=limit)
+        if not docs:
+            return None
+        products = []
+        for doc in docs:
+            doc.pop("_id", None)
+            products.append({**doc, "query": query})
+        return {"products": products, "bookmark": entry.get("next_bookmark")}
+
+    async def get_catalog_products(self) -> List[dict]:
+        """ Tous les produits du catalogue (construction de l'index local) """
+        docs = await self._catalog.find({}, {field: 1 for field in CATALOG_PRODUCT_FIELDS}).to_list(length=None)
+        for doc in docs:
+            doc.pop("_id", None)
+        return docs
+
+    async def get_job_checkpoint(self, job_name: str) -> int:
+        doc = await self._catalog_jobs.find_one({"_id": job_name})
+        return doc.get("next_index", 0) if doc else 0
+
+    async def set_job_checkpoint(self, job_name: str, next_index: int, total: int):
+        await self._catalog_jobs.update_one(
+            {"_id": job_name},
+            {"$set": {"next_index": next_index, "total": total, "updated_at": datetime.now()}},
+            upsert=True,
+        )
+
+    async def reset_job(self, job_name: str, total: int):
+        await self._catalog_jobs.update_one(
+            {"_id": job_name},
+            {"$set": {"next_index": 0, "total": total, "failed": [], "updated_at": datetime.now()}},
+            upsert=True,
+        )
+
+    async def get_job_failures(self, job_name: str) -> List[int]:
+        """ Index des recherches en échec, rejoués à la reprise du job """
+        doc = await self._catalog_jobs.find_one({"_id": job_name}, {"failed": 1})
+        return sorted(doc.get("failed", [])) if doc else []
+
+    async def add_job_failure(self, job_name: str, index: int):
+        await self._catalog_jobs.update_one({"_id": job_name}, {"$addToSet": {"failed": index}}, upsert=True)
+
+    async def remove_job_failure(self, job_name: str, index: int):
+        await self._catalog_jobs.update_one({"_id": job_name}, {"$pull": {"failed": index}})
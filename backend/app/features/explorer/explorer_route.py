@@ -1,14 +1,21 @@
 # src/features/explorer/explorer_router.py
 
+import json
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.core.exception_base import BaseCustomException
+from app.core.logging_config import logger
+from app.infrastructure.database.dependencies import get_current_user, get_db
 from .explorer_service import ExplorerService
+from .explorer_repo import ExplorerRepository
 from .explorer_schema import SearchClothingPayload
 from .explorer_model import ProductsPage
 
 router = APIRouter(prefix="/explorer", tags=["Explorer"])
 
-def get_explorer_service() -> ExplorerService:
-    return ExplorerService()
+def get_explorer_service(db=Depends(get_db)) -> ExplorerService:
+    return ExplorerService(repo=ExplorerRepository(db))
 
 @router.post(
     "/search-clothes",
@@ -17,12 +24,46 @@ def get_explorer_service() -> ExplorerService:
 )
 async def search_clothes(
     payload: SearchClothingPayload,
+    current_user = Depends(get_current_user),
     service: ExplorerService = Depends(get_explorer_service),
 ) -> ProductsPage:
     """
     Recherche de vêtements sur Pinterest, non‐bloquant.
     """
     # On await bien la version async
-    result = await service.search_clothes(payload)
-    print(f"Result keys : {list(result.keys())}")
+    result = await service.search_clothes(payload, current_user.id)
+    logger.debug(f"🟡 [Explorer] Result keys: {list(result.keys())}")
     return result
+
+
+@router.post(
+    "/search-clothes/stream",
+    summary="Search for clothes on Pinterest, streamed as NDJSON",
+    response_class=StreamingResponse,
+)
+async def search_clothes_stream(
+    payload: SearchClothingPayload,
+    current_user = Depends(get_current_user),
+    service: ExplorerService = Depends(get_explorer_service),
+) -> StreamingResponse:
+    """
+    Une ligne JSON par produit dès qu'il est parsé ({"type": "product", "data": ...}),
+    puis une ligne finale {"type": "page", "data": {bookmark, csrf_token, query, session_id}}.
+    En cas d'erreur en cours de flux, une ligne {"type": "error", "error_code", "message"}
+    termine la réponse, avec le même contenu que le gestionnaire d'erreurs global.
+    """
+    async def ndjson():
+        try:
+            async for kind, data in service.stream_clothes(payload, current_user.id):
+                yield json.dumps({"type": kind, "data": data}, ensure_ascii=False) + "\n"
+        except BaseCustomException as e:
+            logger.error(e.trace)
+            error = {"error_code": e.__class__.__name__.lower(), "message": e.message}
+            yield json.dumps({"type": "error", **error}) + "\n"
+        except Exception:
+            # Le détail (URLs, hôtes, messages internes) reste dans les logs
+            logger.exception("🔴 [Explorer] Streaming search failed")
+            error = {"error_code": "internal_error", "message": "Unexpected internal server error"}
+            yield json.dumps({"type": "error", **error}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
@@ -1,7 +1,7 @@
 import json
 
 from pydantic import BaseModel, Field
-from typing import List, Union, Optional
+from typing import List, Literal, Union, Optional
 
 
 class SearchClothingPayload(BaseModel):
@@ -13,3 +13,11 @@ class SearchClothingPayload(BaseModel):
         default=None, description="CSRF token for session validation, if available"
     )
     gender: Optional[str] = Field(default=None,description="")
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Session de feed (renvoyée par l'API) pour dédupliquer entre pages et queries",
+    )
+    mode: Literal["local", "remote", "hybrid"] = Field(
+        default="remote",
+        description="local: index sémantique local seul, remote: Pinterest, hybrid: local puis Pinterest",
+    )
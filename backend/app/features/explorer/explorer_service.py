@@ -1,62 +1,284 @@
 # src/features/explorer/explorer_service.py
 
 import asyncio
-from .pinterest_scraper import PinterestScraper
+import time
+from typing import AsyncIterator, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.metrics import metrics
+from .pinterest_scraper import AsyncPinterestScraper
 from .explorer_schema import SearchClothingPayload
 from .explorer_model import ProductsPage
-from sentence_transformers import SentenceTransformer, util
+from .model_registry import ModelRegistry
+from .embedding_batcher import fashion_batcher
+from .explorer_repo import ExplorerRepository
+from .query_cache import query_cache, normalize_query
+from .search_cache import search_cache, SearchResultCache
+from .page_prefetcher import page_prefetcher
+from .product_index import product_index
+from .feed_dedup import feed_dedup
+from .vocabulary_table import vocabulary_table
 
-fashion_concepts = [
-    "clothing", "outfit", "apparel", "clothing style",
-    "fashion", "t-shirt", "dress", "hoodie",
-    "model outfit", "runway look", "tshirt",
-    "hoodie outfit", "pants",
-]
+LOCAL_SEARCH_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+STREAM_MS_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
 
 class ExplorerService:
-    def __init__(self) -> None:
-        self.pinterest_scraper = PinterestScraper()
-        self.model = SentenceTransformer("paraphrase-MiniLM-L6-v2")
-        # Pré‐encoder les concepts pour le scoring
-        self.fashion_embeddings = self.model.encode(fashion_concepts)
-
-    def _sync_search(self, payload: SearchClothingPayload) -> ProductsPage:
-        """Version synchrone du workflow de recherche."""
+    def __init__(self, repo: ExplorerRepository = None) -> None:
+        self.pinterest_scraper = AsyncPinterestScraper()
+        self.repo = repo
+        # Tier Mongo du cache de queries, seulement si activé
+        self._query_cache_repo = repo if settings.EXPLORER_QUERY_CACHE_PERSIST else None
+        self._search_cache_repo = repo if settings.EXPLORER_SEARCH_CACHE_PERSIST else None
+        self._catalog_repo = repo if settings.EXPLORER_CATALOG_LOOKUP else None
+
+    async def search_clothes(self, payload: SearchClothingPayload, user_id: str) -> ProductsPage:
+        """
+        Service asynchrone : le scoring passe par le micro-batcher partagé,
+        l'appel Pinterest réutilise la session HTTP du process.
+        """
+        # Le modèle est partagé par le process : chargé au démarrage ou ici au premier appel
+        await ModelRegistry.load(settings.EXPLORER_MODEL_NAME)
+
         # 1️⃣ Transformation de la query
-        query = self.transform_as_clothe_query(payload.query, payload.gender)
-        print(f"[sync] Transformed query: {query}")
+        query = await self.transform_as_clothe_query(payload.query, payload.gender)
+        logger.debug(f"🟡 [Explorer] Transformed query: {query}")
+
+        # 2️⃣ Index local, Pinterest, ou les deux (local d'abord)
+        if payload.mode == "local":
+            page = await self._local_page(query, payload)
+        elif payload.mode == "hybrid" and not payload.bookmark:
+            page = await self._hybrid_page(query, payload)
+        else:
+            page = await self._remote_page(query, payload)
+
+        # 3️⃣ Préchargement spéculatif de la page suivante
+        self._prefetch_next_page(query, page)
+
+        # 4️⃣ Doublons déjà servis dans la session retirés avant sérialisation
+        session_id = feed_dedup.resolve_session(user_id, payload.session_id, payload.bookmark)
+        products = feed_dedup.filter(session_id, page["products"])
+        feed_dedup.link_bookmark(user_id, page.get("bookmark"), session_id)
+
+        # Copie : la page en cache est partagée entre requêtes
+        return {**page, "products": products, "query": query, "session_id": session_id}
+
+    async def stream_clothes(
+        self, payload: SearchClothingPayload, user_id: str
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Variante streaming de search_clothes : ("product", produit) dès qu'un
+        produit est disponible, puis ("page", {bookmark, csrf_token, query, session_id}).
+        Le time-to-first-product est mesuré séparément de la latence totale.
+        """
+        start = time.perf_counter()
+        first_product = True
+        session_id = feed_dedup.resolve_session(user_id, payload.session_id, payload.bookmark)
+        served = dropped = 0
+        async for kind, data in self._stream_events(payload):
+            if kind == "page":
+                feed_dedup.record(served, dropped)
+                feed_dedup.link_bookmark(user_id, data.get("bookmark"), session_id)
+                data = {**data, "session_id": session_id}
+            else:
+                served += 1
+                if not feed_dedup.is_new(session_id, data):
+                    dropped += 1
+                    continue
+                if first_product:
+                    first_product = False
+                    metrics.observe(
+                        "explorer.stream.time_to_first_product_ms",
+                        (time.perf_counter() - start) * 1000,
+                        buckets=STREAM_MS_BUCKETS,
+                    )
+            yield kind, data
+        metrics.observe(
+            "explorer.stream.total_ms", (time.perf_counter() - start) * 1000, buckets=STREAM_MS_BUCKETS
+        )
+
+    async def _stream_events(self, payload: SearchClothingPayload) -> AsyncIterator[Tuple[str, dict]]:
+        await ModelRegistry.load(settings.EXPLORER_MODEL_NAME)
+        query = await self.transform_as_clothe_query(payload.query, payload.gender)
+
+        # 1️⃣ Résultats locaux d'abord (local / hybrid)
+        seen = set()
+        if payload.mode == "local" or (payload.mode == "hybrid" and not payload.bookmark):
+            local_page = await self._local_page(query, payload)
+            for product in local_page["products"]:
+                seen.add(product.get("pin_id") or product.get("image_url"))
+                yield "product", product
+            if payload.mode == "local":
+                yield "page", {"bookmark": None, "csrf_token": payload.csrf_token, "query": query}
+                return
+
+        # 2️⃣ Page préchargée ou en cache, sinon Pinterest parsé au fil de l'eau
+        key = SearchResultCache.make_key(query, payload.bookmark, is_buyable=True)
+        page = await page_prefetcher.take(key) if payload.bookmark else None
+        if page is None:
+            page = await search_cache.lookup(
+                key, lambda: self._fetch_page(query, payload), repo=self._search_cache_repo
+            )
+
+        if page is not None:
+            for product in page["products"]:
+                if (product.get("pin_id") or product.get("image_url")) not in seen:
+                    yield "product", product
+        else:
+            products, meta = [], {"bookmark": None, "csrf_token": payload.csrf_token}
+            try:
+                async for kind, data in self._stream_remote(query, payload):
+                    if kind == "page":
+                        meta = data
+                        continue
+                    products.append(data)
+                    if (data.get("pin_id") or data.get("image_url")) not in seen:
+                        yield "product", data
+            except Exception as e:
+                if not seen:
+                    raise
+                # Hybrid : les résultats locaux ont déjà été servis
+                metrics.inc("explorer.hybrid.remote_fallbacks")
+                logger.warning(f"🔶 [Explorer] Pinterest unavailable, serving local results only: {e!r}")
+                yield "page", {"bookmark": None, "csrf_token": payload.csrf_token, "query": query}
+                return
+            page = {"products": products, **meta}
+            await search_cache.store(key, page, repo=self._search_cache_repo)
+
+        # 3️⃣ Préchargement spéculatif de la page suivante
+        self._prefetch_next_page(query, page)
+        yield "page", {"bookmark": page.get("bookmark"), "csrf_token": page.get("csrf_token"), "query": query}
 
-        # 2️⃣ Appel bloquant au scraper
-        page: ProductsPage = self.pinterest_scraper.get_page(
+    async def _stream_remote(self, query: str, payload: SearchClothingPayload) -> AsyncIterator[Tuple[str, dict]]:
+        """Même source que _fetch_page (catalogue puis Pinterest), en streaming."""
+        if self._catalog_repo is not None and not payload.bookmark:
+            page = await self._catalog_repo.get_catalog_page(query, settings.EXPLORER_CATALOG_PAGE_SIZE)
+            if page is not None:
+                metrics.inc("explorer.catalog.hits")
+                for product in page["products"]:
+                    yield "product", product
+                yield "page", {"bookmark": page.get("bookmark"), "csrf_token": payload.csrf_token}
+                return
+            metrics.inc("explorer.catalog.misses")
+
+        async for event in self.pinterest_scraper.stream_page(
             query=query,
             bookmark=payload.bookmark,
             csrf_token=payload.csrf_token,
             is_buyable=True,
-        )
-        # print(f"[sync] Products page: {page}")
-        page["query"] = query
+        ):
+            yield event
+
+    async def _remote_page(self, query: str, payload: SearchClothingPayload) -> dict:
+        """Page préchargée au scroll précédent, sinon cache (stale-while-revalidate) ou Pinterest."""
+        key = SearchResultCache.make_key(query, payload.bookmark, is_buyable=True)
+        page = await page_prefetcher.take(key) if payload.bookmark else None
+        if page is None:
+            page = await search_cache.get_or_fetch(
+                key,
+                lambda: self._fetch_page(query, payload),
+                repo=self._search_cache_repo,
+            )
         return page
 
-    async def search_clothes(self, payload: SearchClothingPayload) -> ProductsPage:
+    async def _local_page(self, query: str, payload: SearchClothingPayload) -> dict:
+        """Top-k de l'index sémantique local, sans appel Pinterest ni pagination."""
+        start = time.perf_counter()
+        results = await product_index.search_text(query, settings.EXPLORER_INDEX_TOP_K)
+        metrics.observe(
+            "explorer.local_search_ms",
+            (time.perf_counter() - start) * 1000,
+            buckets=LOCAL_SEARCH_MS_BUCKETS,
+        )
+        return {
+            "products": [{**product, "query": query} for product, _ in results],
+            "bookmark": None,
+            "csrf_token": payload.csrf_token,
+        }
+
+    async def _hybrid_page(self, query: str, payload: SearchClothingPayload) -> dict:
+        """Résultats locaux en tête, complétés par la page Pinterest si elle arrive à temps."""
+        local_page = await self._local_page(query, payload)
+        try:
+            # Le fetch continue en fond via le cache : il servira au prochain appel
+            remote_page = await asyncio.wait_for(
+                self._remote_page(query, payload), settings.EXPLORER_HYBRID_REMOTE_TIMEOUT
+            )
+        except Exception as e:
+            if not local_page["products"]:
+                raise
+            metrics.inc("explorer.hybrid.remote_fallbacks")
+            logger.warning(f"🔶 [Explorer] Pinterest unavailable, serving local results only: {e!r}")
+            return local_page
+
+        seen = {p.get("pin_id") or p.get("image_url") for p in local_page["products"]}
+        remote_products = [
+            p for p in remote_page["products"] if (p.get("pin_id") or p.get("image_url")) not in seen
+        ]
+        return {**remote_page, "products": local_page["products"] + remote_products}
+
+    async def _fetch_page(self, query: str, payload: SearchClothingPayload) -> dict:
+        """Première page depuis le catalogue pré‐chauffé si possible, sinon Pinterest."""
+        if self._catalog_repo is not None and not payload.bookmark:
+            page = await self._catalog_repo.get_catalog_page(query, settings.EXPLORER_CATALOG_PAGE_SIZE)
+            if page is not None:
+                metrics.inc("explorer.catalog.hits")
+                return {**page, "csrf_token": payload.csrf_token}
+            metrics.inc("explorer.catalog.misses")
+
+        return await self.pinterest_scraper.get_page(
+            query=query,
+            bookmark=payload.bookmark,
+            csrf_token=payload.csrf_token,
+            is_buyable=True,
+        )
+
+    def _prefetch_next_page(self, query: str, page: dict):
+        next_bookmark = page.get("bookmark")
+        if not next_bookmark:
+            return
+        key = SearchResultCache.make_key(query, next_bookmark, is_buyable=True)
+        # Passe par le cache : le préchargement mutualise le fetch avec une
+        # requête concurrente et alimente le cache pour les autres utilisateurs
+        page_prefetcher.schedule(
+            key,
+            lambda: search_cache.get_or_fetch(
+                key,
+                lambda: self.pinterest_scraper.get_page(
+                    query=query,
+                    bookmark=next_bookmark,
+                    csrf_token=page.get("csrf_token"),
+                    is_buyable=True,
+                ),
+                repo=self._search_cache_repo,
+            ),
+        )
+
+    async def best_fashion_score(self, query: str) -> float:
         """
-        Service asynchrone : délègue tout le travail intensif
-        dans un thread pour ne pas bloquer l’event loop.
+        Similarité entre la query et nos concepts : lookup dans la table du
+        vocabulaire si tous les mots sont connus, sinon modèle (encodage groupé).
         """
-        # asyncio.to_thread est disponible dans Python 3.9+
-        return await asyncio.to_thread(self._sync_search, payload)
-
-    def best_fashion_score(self, query: str) -> float:
-        """Calcule la similarité entre la query et nos concepts."""
-        query_emb = self.model.encode([query])
-        scores = util.cos_sim(query_emb, self.fashion_embeddings)
-        return float(scores.max().item())
-
-    def transform_as_clothe_query(self, query: str, gender: str | None = None) -> str:
-        """Pré‐fixe 'outfit' si la query semble hors‐sujet fashion."""
-        score = self.best_fashion_score(query)
+        score = vocabulary_table.score(query)
+        if score is not None:
+            metrics.inc("explorer.vocab.hits")
+            return score
+        metrics.inc("explorer.vocab.misses")
+        return await fashion_batcher.score(query)
+
+    async def transform_as_clothe_query(self, query: str, gender: str | None = None) -> str:
+        """Pré‐fixe 'outfit' si la query semble hors‐sujet fashion (mémoïsé)."""
+        cached = await query_cache.get(query, gender, repo=self._query_cache_repo)
+        if cached is not None:
+            return cached["transformed_query"]
+
+        transformed = normalize_query(query)
+        score = await self.best_fashion_score(transformed)
         if score < 0.5:
-            query = "outfit " + query
+            transformed = "outfit " + transformed
         if gender:
-            query = f"{query} {gender}"
-        return query.strip()
+            transformed = f"{transformed} {gender}"
+        transformed = transformed.strip()
 
+        await query_cache.set(query, gender, score, transformed, repo=self._query_cache_repo)
+        return transformed
@@ -0,0 +1,122 @@
+# app/features/explorer/feed_dedup.py
+
+import uuid
+from typing import List, Optional
+
+from app.core.bloom_filter import BloomFilter
+from app.core.config import settings
+from app.core.lru_cache import LRUCache
+from app.core.metrics import metrics
+
+DEDUP_RATIO_BUCKETS = (0, 0.05, 0.1, 0.25, 0.5, 0.75, 1)
+
+
+class _SeenProducts:
+    """
+    Produits déjà servis dans une session : deux générations de filtres de Bloom.
+    Quand la génération courante est pleine, la précédente est oubliée, ce qui
+    borne la mémoire sans faire exploser le taux de faux positifs.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._current or (self._previous is not None and key in self._previous)
+
+    def add(self, key: str):
+        if self._current.is_full:
+            self._previous = self._current
+            self._current = BloomFilter(self._capacity, self._error_rate)
+        self._current.add(key)
+
+
+class FeedDeduplicator:
+    """
+    Déduplication inter‐pages des feeds explorer.
+
+    Une session de recherche est identifiée par le `session_id` renvoyé au
+    client, ou à défaut retrouvée par la chaîne de bookmarks de l'utilisateur
+    (chaque bookmark servi pointe vers sa session). Le cache de recherche étant
+    partagé, deux utilisateurs reçoivent le même bookmark pour la même query :
+    la chaîne est donc indexée par (user_id, bookmark). Les pin ids et image URLs déjà servis sont
+    retenus dans un filtre de Bloom borné par session, et les doublons sont
+    retirés avant sérialisation.
+    """
+
+    def __init__(self, enabled: bool, max_sessions: int, ttl: float, capacity: int, error_rate: float):
+        self.enabled = enabled
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._sessions = LRUCache("explorer_dedup_sessions", maxsize=max_sessions, ttl=ttl)
+        # (user_id, bookmark) -> session_id, plusieurs bookmarks par session
+        self._bookmarks = LRUCache("explorer_dedup_bookmarks", maxsize=max_sessions * 4, ttl=ttl)
+
+    def resolve_session(
+        self, user_id: str, session_id: Optional[str] = None, bookmark: Optional[str] = None
+    ) -> str:
+        """ Session explicite, sinon celle du bookmark reçu par cet utilisateur, sinon une nouvelle """
+        if session_id:
+            return session_id
+        if bookmark:
+            session_id = self._bookmarks.get((user_id, bookmark))
+        return session_id or uuid.uuid4().hex
+
+    def link_bookmark(self, user_id: str, bookmark: Optional[str], session_id: str):
+        """ Le scroll suivant de l'utilisateur (qui renverra ce bookmark) retrouvera la session """
+        if self.enabled and bookmark:
+            self._bookmarks.set((user_id, bookmark), session_id)
+
+    def _seen(self, session_id: str) -> _SeenProducts:
+        seen = self._sessions.get(session_id)
+        if seen is None:
+            seen = _SeenProducts(self._capacity, self._error_rate)
+        # Réinsertion : une session active n'expire pas en plein scroll
+        self._sessions.set(session_id, seen)
+        return seen
+
+    def is_new(self, session_id: str, product: dict) -> bool:
+        """ True si le produit n'a pas encore été servi dans la session (et le retient) """
+        if not self.enabled:
+            return True
+        seen = self._seen(session_id)
+        keys = [f"pin:{product['pin_id']}"] if product.get("pin_id") else []
+        if product.get("image_url"):
+            keys.append(f"image:{product['image_url']}")
+        if any(key in seen for key in keys):
+            return False
+        for key in keys:
+            seen.add(key)
+        return True
+
+    def record(self, served: int, dropped: int):
+        """ Compteurs + ratio de doublons par page """
+        if not self.enabled or not served:
+            return
+        metrics.inc("explorer.dedup.products", served)
+        metrics.inc("explorer.dedup.dropped", dropped)
+        metrics.observe("explorer.dedup.ratio", dropped / served, buckets=DEDUP_RATIO_BUCKETS)
+
+    def filter(self, session_id: str, products: List[dict]) -> List[dict]:
+        """ Retire les produits déjà servis dans la session (pin id ou image URL) """
+        if not self.enabled:
+            return products
+        unique = [product for product in products if self.is_new(session_id, product)]
+        self.record(len(products), len(products) - len(unique))
+        return unique
+
+    def clear(self):
+        self._sessions.clear()
+        self._bookmarks.clear()
+
+
+feed_dedup = FeedDeduplicator(
+    enabled=settings.EXPLORER_DEDUP_ENABLED,
+    max_sessions=settings.EXPLORER_DEDUP_SESSIONS,
+    ttl=settings.EXPLORER_DEDUP_TTL,
+    capacity=settings.EXPLORER_DEDUP_CAPACITY,
+    error_rate=settings.EXPLORER_DEDUP_ERROR_RATE,
+)
@@ -12,7 +12,7 @@ class KeyWordsSet:
     color_adjectives = []
     language = "en"
 
-    def generate_combinations(self) -> KeywordsClothingQuery:
+    def generate_combinations(self) -> List[KeywordsClothingQuery]:
         clothing_queries: List[KeywordsClothingQuery] = [
             KeywordsClothingQuery(
                 clothing_type=ctype,
@@ -20,6 +20,7 @@ class KeyWordsSet:
                 gender=gender,
                 size_adjective=size,
                 color_adjective=color_adj,
+                language=self.language,
             )
             for ctype, color, gender, size, color_adj in itertools.product(
                 self.clothing_types,
@@ -33,6 +34,7 @@ class KeyWordsSet:
 
 
 class FrenchKeyWordsSet(KeyWordsSet):
+    language = "fr"
     clothing_types = [
         "t-shirt",
         "jeans",
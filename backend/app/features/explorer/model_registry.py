@@ -0,0 +1,140 @@
+# app/features/explorer/model_registry.py
+
+import asyncio
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from .constants import FASHION_CONCEPTS
+
+
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def _load_sentence_transformer(model_name: str, backend: str = "torch", onnx_file: Optional[str] = None):
+    """
+    Import différé : sentence_transformers (et donc torch) n'est importé qu'au
+    premier chargement du modèle, pas à l'import de l'app.
+
+    Backends CPU :
+      - torch      : modèle PyTorch de référence
+      - torch-int8 : quantification dynamique int8 des couches Linear
+      - onnx       : export ONNX Runtime du modèle
+      - onnx-int8  : fichier ONNX quantifié int8 (`onnx_file`), ex. produit par
+                     sentence_transformers.export_dynamic_quantized_onnx_model
+
+    Les backends ONNX demandent `pip install "sentence-transformers[onnx]"`.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": onnx_file})
+
+    model = SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+
+        # Poids des Linear en int8, activations quantifiées à la volée
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+class ModelRegistry:
+    """
+    Modèle d'embedding partagé par tout le process.
+
+    Le modèle est chargé une seule fois (au démarrage via le lifespan, ou
+    paresseusement au premier appel), les concepts fashion sont pré‐encodés
+    une fois, puis chaque requête réutilise les mêmes objets.
+    """
+
+    _model = None
+    _concept_embeddings = None
+    _model_name: Optional[str] = None
+    _backend: Optional[str] = None
+    _lock: Optional[asyncio.Lock] = None
+    _ready: bool = False
+
+    @classmethod
+    async def load(cls, model_name: str, backend: Optional[str] = None):
+        """
+        Charge le modèle une seule fois, pré‐encode les concepts et fait un warm-up.
+        Le backend d'inférence vient de EXPLORER_MODEL_BACKEND si non précisé.
+        """
+        backend = backend or settings.EXPLORER_MODEL_BACKEND
+        if cls._ready:
+            return
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:
+            if cls._ready:
+                return
+            logger.info(f"🟡 [Explorer] Loading embedding model '{model_name}' ({backend})...")
+            model = await asyncio.to_thread(
+                _load_sentence_transformer, model_name, backend, settings.EXPLORER_ONNX_FILE
+            )
+            # Normalisés pour que la similarité cosinus se réduise à un produit scalaire
+            concept_embeddings = await asyncio.to_thread(
+                lambda: model.encode(FASHION_CONCEPTS, convert_to_numpy=True, normalize_embeddings=True)
+            )
+
+            # Warm-up : le premier forward pass paie l'initialisation paresseuse de torch
+            await asyncio.to_thread(model.encode, ["warm-up"])
+
+            cls._model = model
+            cls._concept_embeddings = concept_embeddings
+            cls._model_name = model_name
+            cls._backend = backend
+            cls._ready = True
+            logger.info(f"🟢 [Explorer] Embedding model '{model_name}' ({backend}) ready")
+
+    @classmethod
+    async def warmup(cls, model_name: str):
+        """ Hook de démarrage : charge le modèle sans faire échouer le lifespan """
+        try:
+            await cls.load(model_name)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("🔴 [Explorer] Embedding model warm-up failed")
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        """ Indique si le modèle est chargé et prêt à servir """
+        return cls._ready
+
+    @classmethod
+    def get_model(cls):
+        """ Retourne le modèle chargé """
+        if not cls._ready:
+            logger.error("🔴 [Explorer] Embedding model is not loaded. Call load() first.")
+            raise Exception("Embedding model is not loaded. Call load() first.")
+        return cls._model
+
+    @classmethod
+    def get_concept_embeddings(cls):
+        """ Retourne les embeddings pré‐calculés des concepts fashion """
+        if not cls._ready:
+            logger.error("🔴 [Explorer] Embedding model is not loaded. Call load() first.")
+            raise Exception("Embedding model is not loaded. Call load() first.")
+        return cls._concept_embeddings
+
+    @classmethod
+    async def close(cls):
+        """ Libère le modèle """
+        if cls._model is not None:
+            cls._model = None
+            cls._concept_embeddings = None
+            cls._ready = False
+            logger.info(f"🔴 [Explorer] Embedding model '{cls._model_name}' released")
+
+
+if __name__ == "__main__":
+    # Étape de warm-up dédiée (ex. build Docker) : télécharge et met en cache le modèle
+    asyncio.run(ModelRegistry.load(settings.EXPLORER_MODEL_NAME))
@@ -0,0 +1,84 @@
+# app/features/explorer/page_prefetcher.py
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.lru_cache import LRUCache
+from app.core.metrics import metrics
+
+PageFetcher = Callable[[], Awaitable[dict]]
+
+
+class PagePrefetcher:
+    """
+    Préchargement spéculatif de la page suivante (scroll infini).
+
+    Quand une page est servie, la page du `bookmark` renvoyé est récupérée en
+    tâche de fond, dans la limite de `max_concurrency` préchargements en vol,
+    et gardée `ttl` secondes. Le scroll suivant la consomme via `take()`.
+    """
+
+    def __init__(self, enabled: bool, max_concurrency: int, maxsize: int, ttl: float):
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self._pages = LRUCache("explorer_prefetch", maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, key: str, fetch: PageFetcher):
+        """ Lance le préchargement de `key` si le budget le permet """
+        if not self.enabled or key in self._inflight or key in self._pages:
+            return
+        if len(self._inflight) >= self.max_concurrency:
+            metrics.inc("explorer.prefetch.skipped_budget")
+            return
+
+        metrics.inc("explorer.prefetch.issued")
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._on_done(key, t))
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            metrics.inc("explorer.prefetch.errors")
+            logger.warning(f"🔶 [Explorer] Prefetch failed for '{key}': {task.exception()}")
+            return
+        self._pages.set(key, task.result())
+
+    async def take(self, key: str) -> Optional[dict]:
+        """ Retourne la page préchargée (ou en cours de préchargement) pour `key` """
+        if not self.enabled:
+            return None
+
+        task = self._inflight.get(key)
+        if task is not None:
+            try:
+                page = await asyncio.shield(task)
+            except Exception:
+                metrics.inc("explorer.prefetch.misses")
+                return None
+            metrics.inc("explorer.prefetch.hits")
+            self._pages.pop(key)
+            return page
+
+        page = self._pages.pop(key)
+        metrics.inc("explorer.prefetch.hits" if page is not None else "explorer.prefetch.misses")
+        return page
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+        self._pages.clear()
+
+
+page_prefetcher = PagePrefetcher(
+    enabled=settings.EXPLORER_PREFETCH_ENABLED,
+    max_concurrency=settings.EXPLORER_PREFETCH_CONCURRENCY,
+    maxsize=settings.EXPLORER_PREFETCH_CACHE_SIZE,
+    ttl=settings.EXPLORER_PREFETCH_TTL,
+)
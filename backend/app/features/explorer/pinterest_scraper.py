@@ -1,10 +1,17 @@
+import asyncio
+import copy
 import json
-import random
-from typing import List, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
 from urllib.parse import quote
 
-import requests
-from requests import Session
+import aiohttp
+import ijson
+import orjson
+from ijson.common import ObjectBuilder
+
+from app.core.logging_config import logger
+from app.core.metrics import metrics
+from app.infrastructure.http.http_clients import ClientProfile, HttpClients, build_session
 
 from .constants import (
     BASE_OPTIONS,
@@ -15,66 +22,252 @@ from .explorer_model import (
     PinterestProduct,
     ProductsPage,
 )
+from .csrf_token_cache import CsrfTokenCache, csrf_token_cache
 
+PINTEREST_BASE_URL = "https://fr.pinterest.com"
+RESULT_ITEM_PREFIX = "resource_response.data.results.item"
+BOOKMARK_PREFIX = "resource_response.bookmark"
+STREAM_CHUNK_SIZE = 16 * 1024
 
-class PinterestScraper:
-    def __init__(self):
-        self.base_options = BASE_OPTIONS.copy()
+
+def build_pinterest_session(max_connections: int = 20, request_timeout: float = 5) -> aiohttp.ClientSession:
+    """ Session autonome (scripts, tests) ; l'API utilise HttpClients.get("pinterest") """
+    return build_session("pinterest", ClientProfile(limit_per_host=max_connections, total_timeout=request_timeout))
+
+
+class AsyncPinterestScraper:
+    """Scraper Pinterest non‐bloquant, basé sur la session partagée."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession = None,
+        base_url: str = PINTEREST_BASE_URL,
+        token_cache: CsrfTokenCache = None,
+    ):
+        self._session = session
+        self.token_cache = token_cache or csrf_token_cache
+        self.base_url = base_url
+        self.base_options = BASE_OPTIONS
         self.base_headers = PINTEREST_BASE_HEADERS.copy()
-        self.get_url = "https://fr.pinterest.com/resource/BaseSearchResource/get"
+        self.get_url = f"{base_url}/resource/BaseSearchResource/get"
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self._session or HttpClients.get("pinterest")
+
+    def _extract_product(self, result: dict, query: str = None) -> dict:
+        """Extrait d'un résultat Pinterest brut les seuls champs exposés par l'API."""
+        pin_id = result.get("id")
+        # Pinterest renvoie souvent null pour les objets imbriqués absents
+        rich_metadata = result.get("rich_metadata") or {}
+        original_image = (result.get("images") or {}).get("orig") or {}
+        product_data = {
+            "pin_id": str(pin_id) if pin_id is not None else None,
+            "product_url": result.get("link"),
+            "description": (
+                result.get("description")
+                or result.get("seo_alt_text")
+                or rich_metadata.get("description")
+                or ""
+            ).strip(),
+            "image_url": original_image.get("url", ""),
+            "pinterest_url": f"https://www.pinterest.com/pin/{pin_id}/",
+        }
+        if query:
+            product_data["query"] = query
+        return product_data
 
     def _filter_results(self, data: dict, query: str = None) -> List[dict]:
         """Nettoie les résultats Pinterest en extrayant uniquement les informations nécessaires."""
-        results = data.get("resource_response", {}).get("data", {}).get("results", [])
-        clean_data = []
-
-        for result in results:
-            product_data = {
-                "product_url": result.get("link"),
-                "description": (
-                    result.get("description", "")
-                    or result.get("seo_alt_text", "")
-                    or result.get("rich_metadata", {}).get("description", "")
-                ).strip(),
-                "image_url": result.get("images", {}).get("orig", {}).get("url", ""),
-                "pinterest_url": f"https://www.pinterest.com/pin/{result.get('id')}/",
+        data_node = (data.get("resource_response") or {}).get("data") or {}
+        extract = self._extract_product
+        return [extract(result, query) for result in data_node.get("results") or []]
+
+    def _build_request(
+        self,
+        query: str,
+        bookmark: Optional[str],
+        csrf_token: str,
+        is_buyable: bool,
+    ) -> Tuple[str, dict]:
+        """Construit la méthode HTTP et les paramètres de la requête de recherche."""
+        query_url_encoded = quote(query, safe="")
+        source_url = (
+            f"/search/{'buyable_pins' if is_buyable else 'pins'}/?q={query_url_encoded}"
+        )
+
+        # deepcopy : les options imbriquées ne doivent pas fuiter d'une requête à l'autre
+        options = copy.deepcopy(self.base_options)
+        options["options"].update({"query": query, "source_url": source_url})
+        if is_buyable:
+            options["options"]["scope"] = "buyable_pins"
+        if bookmark:
+            options["options"]["bookmarks"] = [bookmark]
+
+        request_kwargs = {
+            "headers": {
+                **self.base_headers,
+                "X-CSRFToken": csrf_token,
+                "Cookie": f"csrftoken={csrf_token}",
+            },
+        }
+
+        if bookmark:
+            request_kwargs["data"] = {
+                "source_url": query_url_encoded,
+                "data": json.dumps(options, ensure_ascii=False),
+            }
+        else:
+            request_kwargs["params"] = {
+                "source_url": source_url,
+                "data": json.dumps(options),
             }
-            if query:
-                product_data["query"] = query
-            clean_data.append(product_data)
+        return ("POST" if bookmark else "GET"), request_kwargs
 
-        return clean_data
+    def _parse_page(self, body: Union[str, bytes], query: str, csrf_token: str) -> dict:
+        """Décodage orjson (C) puis projection des seuls champs utilisés, directement sur les bytes."""
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Failed to decode JSON for query '{query}': {e}") from e
 
-    def _get_csrf_token(self) -> str:
+        return {
+            "products": self._filter_results(data, query=query),
+            "bookmark": (data.get("resource_response") or {}).get("bookmark"),
+            "csrf_token": csrf_token,
+        }
+
+    async def _get_csrf_token(self) -> str:
         """Récupère le token CSRF depuis Pinterest."""
-        response = requests.get("https://fr.pinterest.com/")
-        response.raise_for_status()
-        token = response.cookies.get("csrftoken")
-        if not token:
+        async with self.session.get(f"{self.base_url}/") as response:
+            response.raise_for_status()
+            cookie = response.cookies.get("csrftoken")
+        if not cookie or not cookie.value:
             raise ValueError("CSRF token not found in cookies.")
-        return token
+        return cookie.value
 
-    def get_products(
+    def start_token_refresh(self):
+        """Lance le renouvellement en tâche de fond du token CSRF partagé."""
+        self.token_cache.start(self._get_csrf_token)
+
+    async def get_page(
+        self,
+        query: str,
+        bookmark: str = None,
+        csrf_token: str = None,
+        is_buyable: bool = False,
+    ) -> Union[ProductsPage, dict]:
+        """Récupère une page de résultats Pinterest pour une requête donnée."""
+        csrf_token = csrf_token or await self.token_cache.get(self._get_csrf_token)
+        try:
+            return await self._fetch_page(query, bookmark, csrf_token, is_buyable)
+        except aiohttp.ClientResponseError as e:
+            if e.status != 403:
+                raise
+            # Token rejeté : un seul refresh forcé (partagé) puis une seule nouvelle tentative
+            metrics.inc("explorer.csrf_token.rejected")
+            csrf_token = await self.token_cache.refresh(self._get_csrf_token, stale_token=csrf_token)
+            return await self._fetch_page(query, bookmark, csrf_token, is_buyable)
+
+    async def _fetch_page(
+        self, query: str, bookmark: Optional[str], csrf_token: str, is_buyable: bool
+    ) -> dict:
+        method, request_kwargs = self._build_request(query, bookmark, csrf_token, is_buyable)
+
+        async with self.session.request(method, self.get_url, **request_kwargs) as response:
+            response.raise_for_status()
+            body = await response.read()
+
+        return self._parse_page(body, query, csrf_token)
+
+    async def stream_page(
+        self,
+        query: str,
+        bookmark: str = None,
+        csrf_token: str = None,
+        is_buyable: bool = False,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Variante streaming de get_page : le corps Pinterest est parsé au fil des
+        chunks reçus et chaque produit est émis dès qu'il est complet.
+
+        Émet ("product", produit) pour chaque résultat, puis un dernier
+        ("page", {"bookmark", "csrf_token"}).
+        """
+        csrf_token = csrf_token or await self.token_cache.get(self._get_csrf_token)
+        try:
+            async for event in self._stream_page(query, bookmark, csrf_token, is_buyable):
+                yield event
+        except aiohttp.ClientResponseError as e:
+            # Le statut est connu avant le premier produit : rien n'a encore été émis
+            if e.status != 403:
+                raise
+            metrics.inc("explorer.csrf_token.rejected")
+            csrf_token = await self.token_cache.refresh(self._get_csrf_token, stale_token=csrf_token)
+            async for event in self._stream_page(query, bookmark, csrf_token, is_buyable):
+                yield event
+
+    async def _stream_page(
+        self, query: str, bookmark: Optional[str], csrf_token: str, is_buyable: bool
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        method, request_kwargs = self._build_request(query, bookmark, csrf_token, is_buyable)
+        next_bookmark = None
+        events = ijson.sendable_list()
+        parser = ijson.parse_coro(events, use_float=True)
+        builder, depth = None, 0
+
+        async with self.session.request(method, self.get_url, **request_kwargs) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                try:
+                    parser.send(chunk)
+                except ijson.JSONError as e:
+                    raise ValueError(f"Failed to decode JSON for query '{query}': {e}") from e
+
+                for prefix, event, value in events:
+                    if builder is not None:
+                        # Reconstruction du résultat courant, événement par événement
+                        builder.event(event, value)
+                        if event in ("start_map", "start_array"):
+                            depth += 1
+                        elif event in ("end_map", "end_array"):
+                            depth -= 1
+                        if depth == 0:
+                            yield "product", self._extract_product(builder.value, query)
+                            builder = None
+                    elif prefix == RESULT_ITEM_PREFIX and event == "start_map":
+                        builder, depth = ObjectBuilder(), 1
+                        builder.event(event, value)
+                    elif prefix == BOOKMARK_PREFIX and event == "string":
+                        next_bookmark = value
+                del events[:]
+
+        try:
+            parser.close()
+        except ijson.JSONError as e:
+            raise ValueError(f"Failed to decode JSON for query '{query}': {e}") from e
+        yield "page", {"bookmark": next_bookmark, "csrf_token": csrf_token}
+
+    async def get_products(
         self, query: str, is_buyable: bool = False, nb_pages: int = 1
     ) -> List[dict]:
         products: List[PinterestProduct] = []
         try:
-            page_data = self.get_page(query=query, is_buyable=is_buyable)
+            page_data = await self.get_page(query=query, is_buyable=is_buyable)
             page = ProductsPage.model_validate(page_data)
         except Exception as e:
-            print(f"Error on query '{query}': {e}")
+            logger.debug(f"🔶 [Pinterest] Error on query '{query}': {e}")
             return []
 
         if not page.products:
-            print(f"No products for query: {query}")
+            logger.debug(f"🟡 [Pinterest] No products for query: {query}")
             return []
 
-        for product in page.products:
-            products.append(PinterestProduct.model_validate(product))
+        products.extend(page.products)
 
         for _ in range(1, nb_pages):
             try:
-                page_data = self.get_page(
+                page_data = await self.get_page(
                     query=query,
                     bookmark=page.bookmark,
                     csrf_token=page.csrf_token,
@@ -82,14 +275,37 @@ class PinterestScraper:
                 )
                 page = ProductsPage.model_validate(page_data)
             except Exception as e:
-                print(f"Pagination error on query '{query}': {e}")
+                logger.debug(f"🔶 [Pinterest] Pagination error on query '{query}': {e}")
                 break
 
-            for product in page.products:
-                products.append(PinterestProduct.model_validate(product))
+            products.extend(page.products)
 
         return [p.model_dump() for p in products]
 
+
+class PinterestScraper:
+    """
+    Wrapper synchrone pour les scripts : chaque appel ouvre sa propre session
+    le temps de la requête (l'API, elle, utilise AsyncPinterestScraper).
+    """
+
+    def __init__(self, base_url: str = PINTEREST_BASE_URL):
+        self.base_url = base_url
+
+    def _run(self, call: Callable[[AsyncPinterestScraper], Awaitable[Any]]) -> Any:
+        async def runner():
+            async with build_pinterest_session() as session:
+                return await call(AsyncPinterestScraper(session, base_url=self.base_url))
+
+        return asyncio.run(runner())
+
+    def get_products(
+        self, query: str, is_buyable: bool = False, nb_pages: int = 1
+    ) -> List[dict]:
+        return self._run(
+            lambda scraper: scraper.get_products(query, is_buyable=is_buyable, nb_pages=nb_pages)
+        )
+
     def get_page(
         self,
         query: str,
@@ -97,49 +313,8 @@ class PinterestScraper:
         csrf_token: str = None,
         is_buyable: bool = False,
     ) -> Union[ProductsPage, dict]:
-        """Récupère une page de résultats Pinterest pour une requête donnée."""
-        session = Session()
-        csrf_token = csrf_token or self._get_csrf_token()
-        query_url_encoded = quote(query, safe="")
-        source_url = (
-            f"/search/{'buyable_pins' if is_buyable else 'pins'}/?q={query_url_encoded}"
+        return self._run(
+            lambda scraper: scraper.get_page(
+                query=query, bookmark=bookmark, csrf_token=csrf_token, is_buyable=is_buyable
+            )
         )
-
-        options = self.base_options.copy()
-        options["options"].update({"query": query, "source_url": source_url})
-        if is_buyable:
-            options["options"]["scope"] = "buyable_pins"
-        if bookmark:
-            options["options"]["bookmarks"] = [bookmark]
-
-        method = session.post if bookmark else session.get
-        request_kwargs = {
-            "headers": {**self.base_headers, "X-CSRFToken": csrf_token},
-            "cookies": {"csrftoken": csrf_token},
-            "timeout": 5,
-        }
-
-        if bookmark:
-            request_kwargs["data"] = {
-                "source_url": query_url_encoded,
-                "data": json.dumps(options, ensure_ascii=False),
-            }
-        else:
-            request_kwargs["params"] = {
-                "source_url": source_url,
-                "data": json.dumps(options),
-            }
-
-        response = method(self.get_url, **request_kwargs)
-        response.raise_for_status()
-
-        try:
-            data = response.json()
-            clean_data = self._filter_results(data, query=query)
-            return {
-                "products": clean_data,
-                "bookmark": data.get("resource_response", {}).get("bookmark"),
-                "csrf_token": csrf_token,
-            }
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to decode JSON for query '{query}': {e}") from e
@@ -0,0 +1,195 @@
+# app/features/explorer/product_index.py
+"""
+Index sémantique local des produits scrapés.
+
+Chaque description de produit est encodée avec le modèle MiniLM partagé ;
+les vecteurs (normalisés) sont stockés dans une matrice contiguë float32 ou
+int8 (quantifiée) mappée en mémoire depuis le disque, et une query se réduit
+à un produit matrice‐vecteur + un top-k.
+
+Construction depuis le catalogue Mongo :
+    python -m app.features.explorer.product_index --dtype int8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.infrastructure.database.mongodb import MongoDB
+from .embedding_batcher import fashion_batcher
+from .explorer_repo import ExplorerRepository
+from .model_registry import ModelRegistry
+
+VECTORS_FILE = "vectors.npy"
+PRODUCTS_FILE = "products.json"
+# Vecteurs normalisés : chaque composante est dans [-1, 1]
+INT8_SCALE = 127.0
+# Lignes int8 converties en float32 à la fois (~24 Mo pour des vecteurs de dimension 384)
+SEARCH_BLOCK_ROWS = 16384
+
+
+def quantize(vectors: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(vectors * INT8_SCALE), -127, 127).astype(np.int8)
+
+
+class ProductIndex:
+    def __init__(self, path: str, dtype: str = "float32", reload_interval: float = 30):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported index dtype '{dtype}'")
+        self.path = path
+        self.dtype = dtype
+        self.reload_interval = reload_interval
+        self._vectors: Optional[np.ndarray] = None
+        self._products: List[dict] = []
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._reload_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, VECTORS_FILE)
+
+    def _products_path(self) -> str:
+        return os.path.join(self.path, PRODUCTS_FILE)
+
+    def load(self) -> bool:
+        """ (Re)charge l'index depuis le disque s'il a changé ; False si absent """
+        vectors_path = self._vectors_path()
+        if not os.path.exists(vectors_path) or not os.path.exists(self._products_path()):
+            return False
+
+        mtime = os.path.getmtime(vectors_path)
+        if self._loaded_mtime == mtime:
+            return True
+
+        vectors = np.load(vectors_path, mmap_mode="r")
+        with open(self._products_path(), "r", encoding="utf-8") as f:
+            products = json.load(f)
+        if len(products) != vectors.shape[0]:
+            # Réécriture en cours : on garde la version précédente
+            logger.warning("🔶 [Explorer] Product index is being rewritten, keeping previous version")
+            return self._vectors is not None
+
+        self._vectors, self._products, self._loaded_mtime = vectors, products, mtime
+        self.dtype = "int8" if vectors.dtype == np.int8 else "float32"
+        logger.info(f"🟢 [Explorer] Product index loaded ({len(products)} products, {self.dtype})")
+        return True
+
+    async def refresh(self) -> bool:
+        """
+        `load()` hors de l'event loop et au plus une fois par `reload_interval` :
+        entre deux vérifications, et pendant un rechargement, la version déjà
+        en mémoire est servie.
+        """
+        if self._checked_recently():
+            return self._vectors is not None
+        if self._reload_lock.locked() and self._vectors is not None:
+            return True
+        async with self._reload_lock:
+            if self._checked_recently():
+                return self._vectors is not None
+            try:
+                return await asyncio.to_thread(self.load)
+            finally:
+                self._checked_at = time.monotonic()
+
+    def _checked_recently(self) -> bool:
+        return self._checked_at is not None and time.monotonic() - self._checked_at < self.reload_interval
+
+    def save(self, products: List[dict], embeddings: np.ndarray):
+        """ Écrit l'index de façon atomique (fichiers temporaires puis rename) """
+        if len(products) != len(embeddings):
+            raise ValueError("products and embeddings must have the same length")
+
+        os.makedirs(self.path, exist_ok=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        vectors = quantize(embeddings) if self.dtype == "int8" else embeddings
+
+        # Le nom temporaire garde l'extension .npy, sinon np.save en ajoute une
+        tmp_vectors = os.path.join(self.path, f"tmp.{VECTORS_FILE}")
+        tmp_products = self._products_path() + ".tmp"
+        np.save(tmp_vectors, vectors)
+        with open(tmp_products, "w", encoding="utf-8") as f:
+            json.dump(products, f, ensure_ascii=False)
+        # Produits d'abord : load() ne relit qu'au changement de vectors.npy
+        os.replace(tmp_products, self._products_path())
+        os.replace(tmp_vectors, self._vectors_path())
+
+    def search(self, query_embedding: np.ndarray, k: int) -> List[Tuple[dict, float]]:
+        """ Top-k cosinus (vecteurs normalisés) ; retourne [(produit, score)] par score décroissant """
+        vectors, products = self._vectors, self._products
+        if vectors is None or not products or k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        if vectors.dtype == np.int8:
+            # Déquantification par blocs : jamais de copie entière de la matrice mappée
+            query = query / INT8_SCALE
+            scores = np.empty(vectors.shape[0], dtype=np.float32)
+            for start in range(0, vectors.shape[0], SEARCH_BLOCK_ROWS):
+                block = vectors[start:start + SEARCH_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+        else:
+            scores = vectors @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(products[i], float(scores[i])) for i in top]
+
+    async def search_text(self, text: str, k: int) -> List[Tuple[dict, float]]:
+        if not await self.refresh():
+            return []
+        # Encodage groupé avec les autres queries concurrentes (scoring fashion compris)
+        embedding = await fashion_batcher.embed(text)
+        # Produit matrice-vecteur sur la matrice mappée : hors de l'event loop
+        return await asyncio.to_thread(self.search, embedding, k)
+
+    async def build(self, products: List[dict], batch_size: int = 256):
+        """ Encode les descriptions et écrit l'index """
+        products = [p for p in products if p.get("description")]
+        model = ModelRegistry.get_model()
+        embeddings = await asyncio.to_thread(
+            lambda: model.encode(
+                [p["description"] for p in products],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+        )
+        await asyncio.to_thread(self.save, products, np.asarray(embeddings).reshape(len(products), -1))
+        logger.info(f"🟢 [Explorer] Product index built ({len(products)} products, {self.dtype})")
+
+
+product_index = ProductIndex(
+    settings.EXPLORER_INDEX_PATH, settings.EXPLORER_INDEX_DTYPE, settings.EXPLORER_INDEX_RELOAD_INTERVAL
+)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construit l'index sémantique local depuis le catalogue")
+    parser.add_argument("--dtype", choices=["float32", "int8"], default=settings.EXPLORER_INDEX_DTYPE)
+    parser.add_argument("--path", default=settings.EXPLORER_INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    await MongoDB.connect(db_url=settings.MONGODB_URI, db_name=settings.MONGODB_DB)
+    try:
+        await ModelRegistry.load(settings.EXPLORER_MODEL_NAME)
+        products = await ExplorerRepository(MongoDB.get_database()).get_catalog_products()
+        await ProductIndex(args.path, args.dtype).build(products)
+    finally:
+        await ModelRegistry.close()
+        await MongoDB.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
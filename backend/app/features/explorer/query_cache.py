@@ -0,0 +1,81 @@
+# app/features/explorer/query_cache.py
+
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.lru_cache import LRUCache
+from app.core.metrics import metrics
+
+
+def normalize_query(query: str) -> str:
+    """ Minuscules et espaces compactés : 'Robe  Noire ' -> 'robe noire' """
+    return " ".join(query.lower().split())
+
+
+class QueryCache:
+    """
+    Mémoïsation de `transform_as_clothe_query`.
+
+    Clé : (query normalisée, genre). Valeur : score fashion + query transformée.
+    Un tier mémoire LRU/TTL par process, et un tier Mongo optionnel
+    (via ExplorerRepository) qui survit aux redémarrages.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._memory = LRUCache("explorer_query", maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def make_key(query: str, gender: Optional[str] = None) -> str:
+        return f"{normalize_query(gender or '')}|{normalize_query(query)}"
+
+    async def get(self, query: str, gender: Optional[str] = None, repo=None) -> Optional[dict]:
+        key = self.make_key(query, gender)
+        entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+
+        if repo is None:
+            return None
+
+        try:
+            entry = await repo.get_cached_query(key)
+        except Exception:
+            logger.exception("🔴 [Explorer] Query cache read failed")
+            return None
+
+        if entry is None:
+            metrics.inc("cache.explorer_query.persistent_misses")
+            return None
+
+        metrics.inc("cache.explorer_query.persistent_hits")
+        self._memory.set(key, entry)
+        return entry
+
+    async def set(
+        self,
+        query: str,
+        gender: Optional[str],
+        score: float,
+        transformed_query: str,
+        repo=None,
+    ):
+        key = self.make_key(query, gender)
+        entry = {"score": score, "transformed_query": transformed_query}
+        self._memory.set(key, entry)
+
+        if repo is None:
+            return
+        try:
+            await repo.set_cached_query(key, score, transformed_query)
+        except Exception:
+            logger.exception("🔴 [Explorer] Query cache write failed")
+
+    def clear(self):
+        self._memory.clear()
+
+
+query_cache = QueryCache(
+    maxsize=settings.EXPLORER_QUERY_CACHE_SIZE,
+    ttl=settings.EXPLORER_QUERY_CACHE_TTL,
+)
@@ -0,0 +1,125 @@
+# app/features/explorer/search_cache.py
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.lru_cache import LRUCache
+from app.core.metrics import metrics
+
+PageFetcher = Callable[[], Awaitable[dict]]
+
+
+class SearchResultCache:
+    """
+    Cache des pages `ProductsPage` de /explorer/search-clothes.
+
+    Clé : (query transformée, bookmark, scope buyable). Une page de moins de
+    `ttl` secondes est servie telle quelle ; entre `ttl` et `ttl + stale_ttl`
+    elle est servie immédiatement et rafraîchie en tâche de fond
+    (stale-while-revalidate). Tier mémoire par process + tier Mongo optionnel
+    partagé entre workers (via ExplorerRepository).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._memory = LRUCache("explorer_search", maxsize=maxsize, ttl=ttl + stale_ttl)
+        # Un seul appel upstream en cours par clé (miss concurrents ou refresh de fond)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def make_key(query: str, bookmark: Optional[str] = None, is_buyable: bool = True) -> str:
+        scope = "buyable_pins" if is_buyable else "pins"
+        return f"{scope}|{bookmark or ''}|{query}"
+
+    async def _read(self, key: str, repo=None):
+        entry = self._memory.get_entry(key)
+        if entry is not None or repo is None:
+            return entry
+
+        try:
+            entry = await repo.get_cached_page(key)
+        except Exception:
+            logger.exception("🔴 [Explorer] Search cache read failed")
+            return None
+
+        if entry is None:
+            metrics.inc("cache.explorer_search.persistent_misses")
+            return None
+
+        page, age = entry
+        if age > self.ttl + self.stale_ttl:
+            return None
+        metrics.inc("cache.explorer_search.persistent_hits")
+        self._memory.set(key, page, age=age)
+        return entry
+
+    async def _fetch_and_store(self, key: str, fetch: PageFetcher, repo=None) -> dict:
+        page = await fetch()
+        await self.store(key, page, repo)
+        return page
+
+    async def store(self, key: str, page: dict, repo=None):
+        """ Enregistre une page obtenue hors de get_or_fetch (ex. streaming) """
+        self._memory.set(key, page)
+        if repo is not None:
+            try:
+                await repo.set_cached_page(key, page)
+            except Exception:
+                logger.exception("🔴 [Explorer] Search cache write failed")
+
+    def _single_flight(self, key: str, fetch: PageFetcher, repo=None) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch, repo))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _revalidate(self, key: str, fetch: PageFetcher, repo=None):
+        if key in self._inflight:
+            return
+        task = self._single_flight(key, fetch, repo)
+        self._background.add(task)
+
+        def _done(t: asyncio.Task):
+            self._background.discard(t)
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning(f"🔶 [Explorer] Background refresh failed for '{key}': {t.exception()}")
+
+        task.add_done_callback(_done)
+
+    async def lookup(self, key: str, fetch: PageFetcher, repo=None) -> Optional[dict]:
+        """ Page en cache (périmée : rafraîchie en fond), None en cas de miss """
+        entry = await self._read(key, repo)
+        if entry is None:
+            return None
+        page, age = entry
+        if age > self.ttl:
+            metrics.inc("cache.explorer_search.stale_served")
+            self._revalidate(key, fetch, repo)
+        return page
+
+    async def get_or_fetch(self, key: str, fetch: PageFetcher, repo=None) -> dict:
+        page = await self.lookup(key, fetch, repo)
+        if page is not None:
+            return page
+        return await asyncio.shield(self._single_flight(key, fetch, repo))
+
+    def clear(self):
+        self._memory.clear()
+
+    async def close(self):
+        for task in list(self._background):
+            task.cancel()
+        self._background.clear()
+
+
+search_cache = SearchResultCache(
+    maxsize=settings.EXPLORER_SEARCH_CACHE_SIZE,
+    ttl=settings.EXPLORER_SEARCH_CACHE_TTL,
+    stale_ttl=settings.EXPLORER_SEARCH_CACHE_STALE_TTL,
+)
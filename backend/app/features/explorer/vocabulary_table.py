@@ -0,0 +1,160 @@
+# app/features/explorer/vocabulary_table.py
+"""
+Table d'embeddings pré‐calculés du vocabulaire de keywordsset.py.
+
+Les queries explorer sont pour la plupart composées de mots connus (types de
+vêtements, couleurs, genres, tailles, styles). Chaque mot est encodé une fois,
+au build, dans une table NumPy sur disque ; une query entièrement connue est
+alors scorée par lookup + mean pooling, sans forward pass. Le modèle ne sert
+plus que pour le texte hors vocabulaire.
+
+Construction (après le téléchargement du modèle) :
+    python -m app.features.explorer.vocabulary_table --check 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from .keywordsset import EnglishKeyWordsSet, EnglishStyleWordsSet, FrenchKeyWordsSet
+from .model_registry import ModelRegistry
+
+KEYWORD_ATTRIBUTES = ("clothing_types", "colors", "genders", "size_adjectives", "color_adjectives")
+
+
+def build_vocabulary() -> List[str]:
+    """ Mots distincts (minuscules) de tous les KeyWordsSet et des mots de style """
+    terms: List[str] = ["outfit"]
+    for keywords in (FrenchKeyWordsSet, EnglishKeyWordsSet):
+        for attribute in KEYWORD_ATTRIBUTES:
+            terms += getattr(keywords, attribute)
+    terms += EnglishStyleWordsSet.style_words
+    tokens = [token for term in terms for token in term.lower().split()]
+    return sorted(set(tokens))
+
+
+class VocabularyTable:
+    def __init__(self, path: str, reload_interval: float = 30):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._index: Optional[Dict[str, int]] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._concepts: Optional[np.ndarray] = None
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+
+    def load(self) -> bool:
+        """
+        (Re)charge la table si le fichier a changé, comme l'index produits ;
+        le disque est consulté au plus une fois par `reload_interval`.
+        False tant que la table n'a pas été construite.
+        """
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+            return self._index is not None
+        first_check, self._checked_at = self._checked_at is None, now
+
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if first_check:
+                logger.info("🟡 [Explorer] No vocabulary table, every query goes through the model")
+            return self._index is not None
+        if mtime == self._loaded_mtime:
+            return self._index is not None
+        self._loaded_mtime = mtime
+
+        with np.load(self.path) as table:
+            if str(table["model_name"]) != settings.EXPLORER_MODEL_NAME:
+                logger.warning("🔶 [Explorer] Vocabulary table built for another model, ignoring it")
+                self._index = None
+                return False
+            tokens = table["tokens"].tolist()
+            embeddings = np.ascontiguousarray(table["embeddings"], dtype=np.float32)
+            concepts = np.ascontiguousarray(table["concepts"], dtype=np.float32)
+        self._embeddings, self._concepts = embeddings, concepts
+        self._index = {token: i for i, token in enumerate(tokens)}
+        logger.info(f"🟢 [Explorer] Vocabulary table loaded ({len(tokens)} tokens)")
+        return True
+
+    def score(self, query: str) -> Optional[float]:
+        """ Score fashion par mean pooling si tous les mots sont connus, sinon None """
+        if not self.load():
+            return None
+        tokens = query.split()
+        if not tokens:
+            return None
+        try:
+            rows = [self._index[token] for token in tokens]
+        except KeyError:
+            return None
+
+        pooled = self._embeddings[rows].mean(axis=0)
+        norm = np.linalg.norm(pooled)
+        if norm == 0:
+            return None
+        return float((self._concepts @ (pooled / norm)).max())
+
+    @staticmethod
+    async def build(path: str, model_name: str):
+        """ Encode le vocabulaire avec le modèle partagé et écrit la table """
+        await ModelRegistry.load(model_name)
+        model = ModelRegistry.get_model()
+        tokens = build_vocabulary()
+        embeddings = await asyncio.to_thread(
+            lambda: model.encode(tokens, convert_to_numpy=True, normalize_embeddings=True)
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            tokens=np.array(tokens),
+            embeddings=np.asarray(embeddings, dtype=np.float32),
+            concepts=np.asarray(ModelRegistry.get_concept_embeddings(), dtype=np.float32),
+            model_name=np.array(model_name),
+        )
+        logger.info(f"🟢 [Explorer] Vocabulary table built ({len(tokens)} tokens) at {path}")
+
+
+vocabulary_table = VocabularyTable(settings.EXPLORER_VOCAB_PATH, settings.EXPLORER_INDEX_RELOAD_INTERVAL)
+
+
+async def check_agreement(table: VocabularyTable, sample: int, threshold: float = 0.5) -> float:
+    """ Part des queries pour lesquelles la table et le modèle prennent la même décision """
+    queries = [combo.to_query() for combo in FrenchKeyWordsSet().generate_combinations()]
+    queries += [combo.to_query() for combo in EnglishKeyWordsSet().generate_combinations()]
+    queries = random.Random(0).sample(queries, min(sample, len(queries)))
+
+    model = ModelRegistry.get_model()
+    embeddings = model.encode(queries, convert_to_numpy=True, normalize_embeddings=True)
+    model_scores = (embeddings @ ModelRegistry.get_concept_embeddings().T).max(axis=1)
+    agree = 0
+    for query, model_score in zip(queries, model_scores):
+        # Query hors table : pas de décision, comptée comme un désaccord
+        table_score = table.score(query)
+        if table_score is not None and (table_score >= threshold) == (model_score >= threshold):
+            agree += 1
+    return agree / len(queries)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construit la table d'embeddings du vocabulaire")
+    parser.add_argument("--path", default=settings.EXPLORER_VOCAB_PATH)
+    parser.add_argument("--check", type=int, default=0, help="Nombre de queries pour vérifier l'accord avec le modèle")
+    args = parser.parse_args(argv)
+
+    await VocabularyTable.build(args.path, settings.EXPLORER_MODEL_NAME)
+    if args.check:
+        agreement = await check_agreement(VocabularyTable(args.path), args.check)
+        print(f"Decision agreement with the model on {args.check} queries: {agreement:.1%}")
+    await ModelRegistry.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
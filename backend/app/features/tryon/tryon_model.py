@@ -13,8 +13,12 @@ class TryonModel(BaseModel):
     clothing_id: PyObjectId
 
     output_url: Optional[str] = None
+    # Déclinaisons WebP de la sortie (clés S3), absentes si leur génération a échoué
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     version: int
-    status: Optional[Literal["pending", "ready"]] = None
+    status: Optional[Literal["pending", "ready", "error"]] = None
+    error_message: Optional[str] = None
 
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -1,54 +1,240 @@
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
 from pymongo.database import Database
+from pymongo.errors import OperationFailure
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
 
-from app.core.errors import NotFoundError
+from app.core.errors import NotFoundError, ValidationError
+from app.core.logging_config import logger
+from app.core.pagination import decode_cursor, encode_cursor
 from .tryon_model import TryonModel
 
+# Champs lus par les listes (TryonItem) : ni message d'erreur ni métadonnées inutiles
+LIST_PROJECTION = {
+    "user_id": 1, "body_id": 1, "clothing_id": 1,
+    "output_url": 1, "thumbnail_url": 1, "medium_url": 1, "status": 1, "version": 1, "created_at": 1,
+}
+RENDITION_FIELDS = ("thumbnail_url", "medium_url")
+# Galerie : dernière version de chaque paire, une fois sa sortie stockée. La requête
+# reprend exactement le filtre de l'index partiel user_gallery, sans quoi il n'est pas utilisé
+GALLERY_FILTER = {"latest": True, "status": "ready", "output_url": {"$type": "string"}}
+
 
 class TryonRepository:
     def __init__(self, db: Database):
         self._col = db["tryons"]
         self._users = db["users"]
+        self._results = db["tryon_results"]
+        self._versions = db["tryon_versions"]
 
-    async def create_tryon(
-        self,
+    async def ensure_indexes(self):
+        """
+        Index des listes paginées (galerie d'un utilisateur, timeline d'un body)
+        et unicité (body, clothing, version), filet de sécurité du compteur de versions.
+        """
+        await self._col.create_index(
+            [("user_id", ASCENDING), ("body_id", ASCENDING), ("clothing_id", ASCENDING), ("version", DESCENDING)],
+            name="user_body_clothing_version",
+        )
+        # Galerie : seule la dernière version de chaque paire porte `latest: True`
+        await self._col.create_index(
+            [("user_id", ASCENDING), ("body_id", ASCENDING), ("clothing_id", ASCENDING)],
+            name="user_gallery",
+            partialFilterExpression=GALLERY_FILTER,
+        )
+        try:
+            # Ancien index de la galerie (filtre sur `latest` seul), remplacé par user_gallery
+            await self._col.drop_index("user_latest")
+        except OperationFailure:
+            pass
+        await self._backfill_latest()
+        await self._col.create_index(
+            [("body_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="body_created_at",
+        )
+        # Sorties partagées entre versions (cache) : comptage avant suppression, déclinaisons
+        await self._col.create_index([("output_url", ASCENDING)], name="output_url", sparse=True)
+        try:
+            await self._col.create_index(
+                [("body_id", ASCENDING), ("clothing_id", ASCENDING), ("version", ASCENDING)],
+                unique=True,
+                name="body_clothing_version_unique",
+            )
+        except Exception as e:
+            # Doublons hérités de l'ancien calcul len(existing) + 1 : à dédoublonner à la main
+            logger.error(f"🔴 [Tryon] Unique version index not created: {e}")
+
+    async def _backfill_latest(self):
+        """
+        Paires dont un document n'a pas encore de flag `latest` (antérieur au flag,
+        ou écrit par une ancienne instance pendant un déploiement) : à chaque
+        démarrage, leur dernière version reçoit `latest: True` et les autres `False`.
+        """
+        cursor = self._col.aggregate([
+            {"$match": {"latest": {"$exists": False}}},
+            {"$group": {"_id": {"b": "$body_id", "c": "$clothing_id"}}},
+            {"$lookup": {
+                "from": self._col.name,
+                "let": {"b": "$_id.b", "c": "$_id.c"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": [{"$eq": ["$body_id", "$$b"]}, {"$eq": ["$clothing_id", "$$c"]}]}}},
+                    {"$sort": {"version": -1}},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "versions",
+            }},
+        ])
+        latest_ids, older_ids = [], []
+        async for pair in cursor:
+            ids = [version["_id"] for version in pair["versions"]]
+            latest_ids.append(ids[0])
+            older_ids.extend(ids[1:])
+        if not latest_ids:
+            return
+        await self._col.update_many({"_id": {"$in": latest_ids}}, {"$set": {"latest": True}})
+        if older_ids:
+            await self._col.update_many({"_id": {"$in": older_ids}}, {"$set": {"latest": False}})
+        logger.info(f"🟢 [Tryon] Flagged latest version of {len(latest_ids)} pairs")
+
+    async def _mark_latest(self, docs: List[dict]):
+        """
+        Un try-on est inséré avec `latest: True` : les versions antérieures de sa
+        paire passent à False, et lui-même aussi si une version plus récente existe
+        déjà (créations concurrentes). Chaque paire garde ainsi un seul document
+        marqué ; le flag n'est jamais retiré, son absence signale un document à rattraper.
+        """
+        for doc in docs:
+            pair = {"body_id": doc["body_id"], "clothing_id": doc["clothing_id"]}
+            await self._col.update_many(
+                {**pair, "version": {"$lt": doc["version"]}, "latest": {"$ne": False}}, {"$set": {"latest": False}}
+            )
+            if await self._col.find_one({**pair, "version": {"$gt": doc["version"]}}, {"_id": 1}):
+                await self._col.update_one({"_id": doc["_id"]}, {"$set": {"latest": False}})
+
+    async def next_version(self, body_id: str, clothing_id: str) -> int:
+        """ Version suivante pour la paire (body, clothing), en O(1) et sans course """
+        key = f"{body_id}:{clothing_id}"
+        doc = await self._versions.find_one_and_update(
+            {"_id": key}, {"$inc": {"seq": 1}}, return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            return doc["seq"]
+
+        # Premier try-on depuis l'introduction du compteur : on repart de la dernière version
+        # existante. $ifNull garde le compteur si une requête concurrente l'a créé entre-temps.
+        latest = await self._col.find_one(
+            {"body_id": ObjectId(body_id), "clothing_id": ObjectId(clothing_id)},
+            {"version": 1},
+            sort=[("version", DESCENDING)],
+        )
+        seed = latest["version"] if latest else 0
+        doc = await self._versions.find_one_and_update(
+            {"_id": key},
+            [{"$set": {"seq": {"$add": [{"$ifNull": ["$seq", seed]}, 1]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["seq"]
+
+    @staticmethod
+    def _tryon_doc(
         tryon_id: ObjectId,
         user_id: str,
         body_id: str,
         clothing_id: str,
         version: int,
-        created_at: datetime
-    ) -> TryonModel:
-        result = await self._users.find_one_and_update(
-            {"_id": ObjectId(user_id), "credits": {"$gt": 0}},
-            {"$inc": {"credits": -1}},
-        )
-
-        if not result:
-            raise Exception("User has no credits left")
-        
+        created_at: datetime,
+        status: str = "pending",
+        output_url: Optional[str] = None,
+        renditions: Optional[Dict[str, str]] = None,
+    ) -> dict:
         doc = {
             "_id": tryon_id,
             "user_id": ObjectId(user_id),
             "body_id": ObjectId(body_id),
             "clothing_id": ObjectId(clothing_id),
             "version": version,
-            "status": "pending",
+            "status": status,
+            "latest": True,
             "created_at": created_at,
             "updated_at": created_at,
         }
+        if output_url:
+            doc["output_url"] = output_url
+        doc.update(renditions or {})
+        return doc
+
+    async def create_tryon(
+        self,
+        tryon_id: ObjectId,
+        user_id: str,
+        body_id: str,
+        clothing_id: str,
+        version: int,
+        created_at: datetime,
+        status: str = "pending",
+        output_url: Optional[str] = None,
+        charge: bool = True,
+        renditions: Optional[Dict[str, str]] = None,
+    ) -> TryonModel:
+        # Un résultat servi depuis le cache ne consomme pas de crédit
+        if charge:
+            result = await self._users.find_one_and_update(
+                {"_id": ObjectId(user_id), "credits": {"$gt": 0}},
+                {"$inc": {"credits": -1}},
+            )
+
+            if not result:
+                raise Exception("User has no credits left")
+        
+        doc = self._tryon_doc(tryon_id, user_id, body_id, clothing_id, version, created_at, status, output_url, renditions)
         await self._col.insert_one(doc)
+        await self._mark_latest([doc])
         return TryonModel(**doc)
-        
-    async def set_tryon(self, tryon_id: str, s3_key: str):
+
+    async def reserve_credits(self, user_id: str, count: int) -> bool:
+        """ Débite `count` crédits d'un coup, ou rien si le solde ne suffit pas """
+        result = await self._users.find_one_and_update(
+            {"_id": ObjectId(user_id), "credits": {"$gte": count}},
+            {"$inc": {"credits": -count}},
+        )
+        return result is not None
+
+    async def release_credits(self, user_id: str, count: int):
+        await self._users.update_one({"_id": ObjectId(user_id)}, {"$inc": {"credits": count}})
+
+    async def create_tryons(self, items: List[dict]) -> List[TryonModel]:
+        """ Insère un lot de try-ons (arguments de _tryon_doc), crédits déjà réservés """
+        docs = [self._tryon_doc(**item) for item in items]
+        if docs:
+            await self._col.insert_many(docs)
+            await self._mark_latest(docs)
+        return [TryonModel(**doc) for doc in docs]
+
+    async def set_tryon(self, tryon_id: str, s3_key: str, renditions: Optional[Dict[str, str]] = None):
         result = await self._col.update_one(
             {"_id": ObjectId(tryon_id)},
             {
                 "$set": {
                     "status": "ready",
                     "output_url": s3_key,
+                    **(renditions or {}),
+                    "updated_at": datetime.now()
+                }
+            }
+        )
+        if result.matched_count == 0:
+            raise NotFoundError("Tryon to update not found")
+
+    async def set_error(self, tryon_id: str, error_message: str):
+        result = await self._col.update_one(
+            {"_id": ObjectId(tryon_id)},
+            {
+                "$set": {
+                    "status": "error",
+                    "error_message": error_message,
                     "updated_at": datetime.now()
                 }
             }
@@ -56,33 +242,42 @@ class TryonRepository:
         if result.matched_count == 0:
             raise NotFoundError("Tryon to update not found")
         
-    async def get_all_by_user(self, user_id: str) -> List[TryonModel]:
+    async def get_all_by_user(
+        self, user_id: str, limit: int, after: Optional[str] = None
+    ) -> Tuple[List[TryonModel], Optional[str]]:
         """
         Renvoie, pour chaque paire (body_id, clothing_id), 
-        uniquement le document ayant la version la plus élevée.
+        uniquement le document ayant la version la plus élevée, page par page.
+
+        Seule cette version porte `latest` : l'index partiel user_gallery rend
+        exactement les documents de la page, par paire croissante. Une paire dont
+        la dernière version n'est pas encore prête n'apparaît pas.
         """
-        pipeline = [
-            # 1) Ne garder que l'user
-            {"$match": {"user_id": ObjectId(user_id)}},
-            # 2) Trier version décroissante, fallback created_at
-            {"$sort": {"version": -1, "created_at": -1}},
-            # 3) Grouper par body+clothing et prendre le premier (max version)
-            {"$group": {
-                "_id": {
-                    "body_id":     "$body_id",
-                    "clothing_id": "$clothing_id",
-                },
-                "doc": {"$first": "$$ROOT"}
-            }},
-            # 4) Remplacer la racine par le document complet
-            {"$replaceRoot": {"newRoot": "$doc"}}
-        ]
+        query = {"user_id": ObjectId(user_id), **GALLERY_FILTER}
+        if after:
+            position = decode_cursor(after)
+            try:
+                body_id, clothing_id = ObjectId(position["b"]), ObjectId(position["c"])
+            except (KeyError, TypeError, InvalidId):
+                raise ValidationError("Invalid pagination cursor")
+            query["$or"] = [
+                {"body_id": {"$gt": body_id}},
+                {"body_id": body_id, "clothing_id": {"$gt": clothing_id}},
+            ]
+
+        cursor = self._col.find(query, LIST_PROJECTION).sort(
+            [("body_id", ASCENDING), ("clothing_id", ASCENDING)]
+        ).limit(limit + 1)
+        docs = await cursor.to_list(length=limit + 1)
 
-        docs = await self._col.aggregate(pipeline).to_list(length=None)
-        # Si ton TryonModel attend un champ output_url, assure son existence
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor({"b": str(last["body_id"]), "c": str(last["clothing_id"])})
         for doc in docs:
             doc.setdefault("output_url", None)
-        return [TryonModel(**doc) for doc in docs]
+        return [TryonModel(**doc) for doc in docs], next_cursor
 
     async def get_all_by_body_and_clothing(
         self,
@@ -101,21 +296,87 @@ class TryonRepository:
     
     async def get_all_by_body(
         self,
-        body_id: str
-    ) -> List[TryonModel]:
-        cursor = self._col.find({"body_id": ObjectId(body_id)}).sort("created_at", 1)
+        body_id: str,
+        limit: int,
+        after: Optional[str] = None,
+    ) -> Tuple[List[TryonModel], Optional[str]]:
+        """ Try-ons d'un body par date de création, page par page (index body_created_at) """
+        query = {"body_id": ObjectId(body_id)}
+        if after:
+            position = decode_cursor(after)
+            try:
+                created_at, last_id = datetime.fromisoformat(position["t"]), ObjectId(position["i"])
+            except (KeyError, TypeError, ValueError, InvalidId):
+                raise ValidationError("Invalid pagination cursor")
+            query["$or"] = [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "_id": {"$gt": last_id}},
+            ]
 
-        docs = await cursor.to_list(length=None)
+        cursor = self._col.find(query, LIST_PROJECTION).sort(
+            [("created_at", ASCENDING), ("_id", ASCENDING)]
+        ).limit(limit + 1)
+        docs = await cursor.to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor({"t": last["created_at"].isoformat(), "i": str(last["_id"])})
         for doc in docs:
             doc.setdefault("output_url", None)
-        return [TryonModel(**doc) for doc in docs]
+        return [TryonModel(**doc) for doc in docs], next_cursor
+
+
+    async def count_by_output_url(self, output_url: str) -> int:
+        return await self._col.count_documents({"output_url": output_url})
+
+    async def get_renditions(self, output_urls: List[str]) -> Dict[str, Dict[str, str]]:
+        """ Déclinaisons connues de chaque sortie (partagées par les versions servies depuis le cache) """
+        docs = await self._col.find(
+            {"output_url": {"$in": output_urls}, "thumbnail_url": {"$exists": True}},
+            {"output_url": 1, **{field: 1 for field in RENDITION_FIELDS}},
+        ).to_list(length=None)
+        return {
+            doc["output_url"]: {field: doc[field] for field in RENDITION_FIELDS if doc.get(field)}
+            for doc in docs
+        }
+
+    # ---- Cache des résultats (clé = empreinte des entrées de l'inférence) ----
+
+    async def get_cached_result(self, key: str) -> Optional[str]:
+        doc = await self._results.find_one({"_id": key}, {"output_url": 1})
+        return doc["output_url"] if doc else None
+
+    async def get_cached_results(self, keys: List[str]) -> Dict[str, str]:
+        docs = await self._results.find({"_id": {"$in": keys}}, {"output_url": 1}).to_list(length=None)
+        return {doc["_id"]: doc["output_url"] for doc in docs}
+
+    async def set_cached_result(self, key: str, output_url: str):
+        await self._results.update_one(
+            {"_id": key},
+            {"$set": {"output_url": output_url, "updated_at": datetime.now()}},
+            upsert=True,
+        )
 
+    async def delete_cached_results(self, output_url: str):
+        """ L'objet de sortie va être supprimé : plus aucune entrée ne doit y mener """
+        await self._results.delete_many({"output_url": output_url})
 
     async def get_tryon_by_id(self, tryon_id: str) -> Optional[TryonModel]:
         doc = await self._col.find_one({"_id": ObjectId(tryon_id)})
         return TryonModel(**doc) if doc else None
 
     async def delete_tryon(self, tryon_id: str) -> None:
-        result = await self._col.delete_one({"_id": ObjectId(tryon_id)})
-        if result.deleted_count == 0:
-            raise NotFoundError("Tryon not found")
\ No newline at end of file
+        doc = await self._col.find_one_and_delete({"_id": ObjectId(tryon_id)}, {"body_id": 1, "clothing_id": 1, "latest": 1})
+        if doc is None:
+            raise NotFoundError("Tryon not found")
+        if doc.get("latest"):
+            # La version précédente de la paire redevient celle de la galerie
+            previous = await self._col.find_one(
+                {"body_id": doc["body_id"], "clothing_id": doc["clothing_id"]},
+                {"_id": 1},
+                sort=[("version", DESCENDING)],
+            )
+            if previous:
+                await self._col.update_one({"_id": previous["_id"]}, {"$set": {"latest": True}})
\ No newline at end of file
@@ -1,10 +1,13 @@
 # app/features/tryon/tryon_route.py
 
-from fastapi import APIRouter, Depends, WebSocket
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, WebSocket
+from app.core.config import settings
 from app.core.logging_config import logger
 from app.infrastructure.database.dependencies import get_current_user, get_db, get_user_from_token
 from app.features.tryon.tryon_schema import (
     TryonCreateRequest, TryonCreateResponse,
+    TryonBatchRequest, TryonBatchResponse,
     TryonListResponse, TryonDetailResponse,
     TryonDeleteResponse
 )
@@ -13,6 +16,7 @@ from app.features.tryon.tryon_repo import TryonRepository
 from app.infrastructure.storage.storage_repo import StorageRepository
 from app.features.body.body_repo import BodyRepository
 from app.features.clothing.clothing_repo import ClothingRepository
+from app.infrastructure.queue.job_repo import JobRepository
 
 router = APIRouter(prefix="/tryon", tags=["Tryon"])
 
@@ -21,7 +25,8 @@ def get_service(db=Depends(get_db)):
         repo=TryonRepository(db),
         storage=StorageRepository(),
         body_repo=BodyRepository(db),
-        clothing_repo=ClothingRepository(db)
+        clothing_repo=ClothingRepository(db),
+        jobs=JobRepository(db),
     )
 @router.websocket("/ws")
 async def tryon_ws(
@@ -48,24 +53,38 @@ async def create_tryon(
     logger.info(f"🧪 Create tryon for user {current_user.id}")
     return await service.create_tryon(user=current_user, payload=payload)
 
+# ✅ Créer un lot de tryons (un body × plusieurs vêtements)
+@router.post("/batch", response_model=TryonBatchResponse)
+async def create_tryon_batch(
+    payload: TryonBatchRequest,
+    current_user=Depends(get_current_user),
+    service: TryonService = Depends(get_service)
+):
+    logger.info(f"🧺 Create tryon batch of {len(payload.clothing_ids)} for user {current_user.id}")
+    return await service.create_tryon_batch(user=current_user, payload=payload)
+
 # ✅ Obtenir tous les tryons de l'utilisateur
 @router.get("", response_model=TryonListResponse)
 async def get_all_tryons(
+    limit: int = Query(settings.TRYON_PAGE_SIZE, ge=1, le=settings.TRYON_PAGE_SIZE_MAX, description="Page size"),
+    after: Optional[str] = Query(None, description="next_cursor of the previous page"),
     current_user=Depends(get_current_user),
     service: TryonService = Depends(get_service)
 ):
     logger.info(f"📦 List tryons for user {current_user.id}")
-    return await service.get_all_tryons(current_user.id)
+    return await service.get_all_tryons(current_user.id, limit=limit, after=after)
 
 # ✅ Obtenir tous les tryons d'un body spécifique
 @router.get("/body/{body_id}", response_model=TryonListResponse)
 async def get_tryons_by_body(
     body_id: str,
+    limit: int = Query(settings.TRYON_PAGE_SIZE, ge=1, le=settings.TRYON_PAGE_SIZE_MAX, description="Page size"),
+    after: Optional[str] = Query(None, description="next_cursor of the previous page"),
     current_user=Depends(get_current_user),
     service: TryonService = Depends(get_service)
 ):
     logger.info(f"📦 List tryons for body {body_id} for user {current_user.id}")
-    return await service.get_tryons_by_body(body_id, current_user)
+    return await service.get_tryons_by_body(body_id, current_user, limit=limit, after=after)
 
 # ✅ Obtenir un tryon par ID
 @router.get("/{tryon_id}", response_model=TryonDetailResponse)
@@ -1,6 +1,6 @@
 # app/features/tryon/tryon_schema.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 from datetime import datetime
 
@@ -8,6 +8,8 @@ from datetime import datetime
 class TryonCreateRequest(BaseModel):
     body_id: str
     clothing_id: str
+    # Ignore le cache de résultats et relance une génération (payante)
+    force_regenerate: bool = False
 
 class TryonCreateResponse(BaseModel):
     tryon_id: str
@@ -15,12 +17,33 @@ class TryonCreateResponse(BaseModel):
     message: str
     version: int
 
+# ---- Batch : un body × plusieurs vêtements ----
+class TryonBatchRequest(BaseModel):
+    body_id: str
+    clothing_ids: List[str] = Field(min_length=1)
+    force_regenerate: bool = False
+
+class TryonBatchItem(BaseModel):
+    tryon_id: str
+    clothing_id: str
+    status: str
+    version: int
+
+class TryonBatchResponse(BaseModel):
+    batch_id: str
+    message: str
+    credits_used: int
+    items: List[TryonBatchItem]
+
 # ---- Item ----
 class TryonItem(BaseModel):
     id: str
     body_id: str
     clothing_id: str
     output_url: Optional[str] = None
+    # Versions WebP légères pour les galeries ; None si indisponibles (utiliser output_url)
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     status: str
     created_at: datetime
     version: int
@@ -33,6 +56,8 @@ class TryonDetailResponse(TryonItem):
 # ---- List ----
 class TryonListResponse(BaseModel):
     tryons: List[TryonItem]
+    # À renvoyer dans `after` pour obtenir la page suivante ; None sur la dernière page
+    next_cursor: Optional[str] = None
 
 # ---- Delete ----
 class TryonDeleteResponse(BaseModel):
@@ -1,36 +1,68 @@
 from bson import ObjectId
 import asyncio
+import hashlib
+import json
+import time
 from datetime import datetime
+from typing import Dict, List, Optional
 from app.core.logging_config import logger
-import replicate
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.features.tryon.tryon_repo import TryonRepository
 from app.infrastructure.storage.storage_repo import StorageRepository
 from app.infrastructure.storage.storage_path_builder import StoragePathBuilder
 from app.features.tryon.tryon_schema import (
     TryonCreateRequest, TryonCreateResponse,
+    TryonBatchRequest, TryonBatchResponse, TryonBatchItem,
     TryonListResponse, TryonDetailResponse,
     TryonItem, TryonDeleteResponse
 )
-import aiohttp
 from app.features.body.body_repo import BodyRepository
 from app.features.clothing.clothing_repo import ClothingRepository
-from app.core.errors import NotFoundError, UnauthorizedError, InternalServerError
+from app.core.errors import NotFoundError, UnauthorizedError, InternalServerError, ValidationError
 from app.core.pubsub_manager import pubsub_manager
+from app.infrastructure.queue.job_repo import JobRepository, PermanentJobError
+from app.infrastructure.images.image_pool import ImagePool, SourceSpool
+from app.infrastructure.replicate.replicate_client import ReplicatePredictions
 from fastapi import WebSocket, WebSocketDisconnect
 
+TRYON_JOB = "tryon"
+# Paramètres d'inférence : ils font partie de la clé du cache de résultats
+TRYON_STEPS = 50
+TRYON_GUIDANCE_SCALE = 2
+# Déclinaisons WebP de chaque sortie : nom → plus grand côté en pixels
+TRYON_RENDITIONS = {
+    "thumbnail": settings.TRYON_THUMBNAIL_SIZE,
+    "medium": settings.TRYON_MEDIUM_SIZE,
+}
+MASK_FIELDS = {
+    "upper": "mask_upper",
+    "lower": "mask_lower",
+    "dress": "mask_dress",
+}
+
 class TryonService:
     def __init__(
         self,
         repo: TryonRepository,
         storage: StorageRepository,
         body_repo: BodyRepository,
-        clothing_repo: ClothingRepository
+        clothing_repo: ClothingRepository,
+        jobs: JobRepository = None,
+        publisher=None,
+        predictions: ReplicatePredictions = None,
+        images=ImagePool,
     ):
         self.repo = repo
         self.storage = storage
         self.body_repo = body_repo
         self.clothing_repo = clothing_repo
+        self.jobs = jobs
+        # pubsub local côté API, relais Mongo côté worker
+        self.publisher = publisher or pubsub_manager
+        # Par défaut polling ; build_worker passe le webhook quand le worker tourne dans l'API
+        self.predictions = predictions or ReplicatePredictions()
+        self.images = images
 
     async def create_tryon(self, user, payload: TryonCreateRequest) -> TryonCreateResponse:
         if user.credits <= 0:
@@ -47,12 +79,23 @@ class TryonService:
         if not cloth or str(cloth.user_id) != str(user.id):
             raise UnauthorizedError("Invalid clothing")
 
-        existing = await self.repo.get_all_by_body_and_clothing(body_id, clothing_id)
-        version = len(existing) + 1
+        cache_key = await self._result_cache_key(user.id, body, cloth)
+        cached_output = None
+        if cache_key:
+            if payload.force_regenerate:
+                metrics.inc("tryon.result_cache.bypassed")
+            else:
+                cached_output = await self.repo.get_cached_result(cache_key)
+                metrics.inc("tryon.result_cache.hits" if cached_output else "tryon.result_cache.misses")
+
+        version = await self.repo.next_version(body_id, clothing_id)
 
         tryon_id = ObjectId()
         now = datetime.now()
 
+        if cached_output:
+            return await self._create_from_cache(user, body, cloth, tryon_id, version, now, cached_output)
+
         record = await self.repo.create_tryon(
             tryon_id=tryon_id,
             user_id=user.id,
@@ -62,7 +105,23 @@ class TryonService:
             created_at=now
         )
 
-        asyncio.create_task(self._call_ia(user.id, body, tryon_id, cloth))
+        # L'API ne fait qu'enfiler : la génération tourne dans `python -m app.worker`
+        try:
+            await self.jobs.enqueue(
+                TRYON_JOB,
+                {
+                    "user_id": str(user.id),
+                    "tryon_id": str(tryon_id),
+                    "body_id": str(body.id),
+                    "clothing_id": str(cloth.id),
+                    "version": version,
+                    "cache_key": cache_key,
+                },
+                max_attempts=settings.TRYON_JOB_MAX_ATTEMPTS,
+            )
+        except Exception:
+            await self._abort_tryons(user.id, [tryon_id], "Tryon could not be queued")
+            raise
 
         return TryonCreateResponse(
             tryon_id=str(record.id),
@@ -72,56 +131,340 @@ class TryonService:
             version=version
         )
 
-    async def _publish_error(self, user_id: str, tryon_id: str, msg: str):
-        await pubsub_manager.publish(
-            user_id,
-            {
-                "type":     "tryon_update",
-                "tryon_id": str(tryon_id),
-                "status":   "failed",
-                "error":    msg,
-            }
+    async def create_tryon_batch(self, user, payload: TryonBatchRequest) -> TryonBatchResponse:
+        """
+        Un body × plusieurs vêtements : le body est validé une fois, les vêtements
+        chargés en une requête, les crédits réservés d'un coup et les jobs enfilés
+        en lot avec des URLs d'entrée déjà signées. Chaque try-on publie ensuite
+        ses événements, marqués du `batch_id`, sur le canal habituel.
+        """
+        if not all(ObjectId.is_valid(cid) for cid in payload.clothing_ids):
+            raise ValidationError("Invalid clothing id")
+        clothing_ids = list(dict.fromkeys(str(ObjectId(cid)) for cid in payload.clothing_ids))
+        if len(clothing_ids) > settings.TRYON_BATCH_MAX_ITEMS:
+            raise ValidationError(f"A batch is limited to {settings.TRYON_BATCH_MAX_ITEMS} clothes")
+
+        body = await self.body_repo.get_body_by_id(payload.body_id)
+        if not body or str(body.user_id) != str(user.id):
+            raise UnauthorizedError("Invalid body")
+
+        clothes = {str(c.id): c for c in await self.clothing_repo.get_clothes_by_ids(user.id, clothing_ids)}
+        if len(clothes) != len(clothing_ids):
+            raise UnauthorizedError("Invalid clothing")
+        # Sans masque le job échouerait après débit : refusé avant toute réservation
+        try:
+            mask_keys = {cid: self._mask_key(body, clothes[cid]) for cid in clothing_ids}
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        cache_keys = await self._batch_cache_keys(user.id, body, [clothes[cid] for cid in clothing_ids], mask_keys)
+        cached_outputs: Dict[str, str] = {}
+        known_keys = [key for key in cache_keys.values() if key]
+        if payload.force_regenerate:
+            metrics.inc("tryon.result_cache.bypassed", len(known_keys))
+        elif known_keys:
+            results = await self.repo.get_cached_results(known_keys)
+            cached_outputs = {cid: results[key] for cid, key in cache_keys.items() if key in results}
+            metrics.inc("tryon.result_cache.hits", len(cached_outputs))
+            metrics.inc("tryon.result_cache.misses", len(known_keys) - len(cached_outputs))
+
+        to_generate = [cid for cid in clothing_ids if cid not in cached_outputs]
+        if to_generate and not await self.repo.reserve_credits(user.id, len(to_generate)):
+            raise UnauthorizedError("Insufficient credits to create this batch")
+
+        renditions = await self.repo.get_renditions(list(set(cached_outputs.values()))) if cached_outputs else {}
+        batch_id = str(ObjectId())
+        now = datetime.now()
+        records_by_clothing = {}
+        try:
+            versions = await asyncio.gather(*(self.repo.next_version(body.id, cid) for cid in clothing_ids))
+            items = [
+                {
+                    "tryon_id": ObjectId(),
+                    "user_id": user.id,
+                    "body_id": body.id,
+                    "clothing_id": cid,
+                    "version": version,
+                    "created_at": now,
+                    "status": "ready" if cid in cached_outputs else "pending",
+                    "output_url": cached_outputs.get(cid),
+                    "renditions": renditions.get(cached_outputs.get(cid)),
+                }
+                for cid, version in zip(clothing_ids, versions)
+            ]
+            records_by_clothing = {str(r.clothing_id): r for r in await self.repo.create_tryons(items)}
+
+            if to_generate:
+                # Body et masques signés une seule fois pour tout le lot
+                urls = await self.storage.presign_many(
+                    [body.image_url, *(mask_keys[cid] for cid in to_generate), *(clothes[cid].image_url for cid in to_generate)],
+                    expires_in=settings.TRYON_BATCH_URL_EXPIRES,
+                )
+                inputs_expire_at = time.time() + settings.TRYON_BATCH_URL_EXPIRES
+                await self.jobs.enqueue_many(
+                    TRYON_JOB,
+                    [
+                        {
+                            "user_id": str(user.id),
+                            "tryon_id": str(records_by_clothing[cid].id),
+                            "body_id": str(body.id),
+                            "clothing_id": cid,
+                            "version": records_by_clothing[cid].version,
+                            "cache_key": cache_keys[cid],
+                            "batch_id": batch_id,
+                            "inputs": {
+                                "person": urls[body.image_url],
+                                "cloth": urls[clothes[cid].image_url],
+                                "mask": urls[mask_keys[cid]],
+                            },
+                            "inputs_expire_at": inputs_expire_at,
+                        }
+                        for cid in to_generate
+                    ],
+                    max_attempts=settings.TRYON_JOB_MAX_ATTEMPTS,
+                )
+        except Exception:
+            if to_generate:
+                # Records insérés ou non, aucun job n'est parti : tout le lot est compensé
+                pending = [records_by_clothing[cid].id for cid in to_generate if cid in records_by_clothing]
+                await self._abort_tryons(user.id, pending, "Tryon could not be queued")
+                if len(pending) < len(to_generate):
+                    await self.repo.release_credits(user.id, len(to_generate) - len(pending))
+            raise
+
+        for cid, output_url in cached_outputs.items():
+            record = records_by_clothing[cid]
+            await self._publish_ready(
+                user.id, record.id, body.id, cid, record.version, output_url,
+                batch_id=batch_id, renditions=renditions.get(output_url),
+            )
+
+        metrics.inc("tryon.batch.created")
+        metrics.inc("tryon.batch.items", len(clothing_ids))
+        logger.info(
+            f"🧺 [Tryon] Batch {batch_id}: {len(to_generate)} queued, {len(cached_outputs)} from cache "
+            f"for body {body.id}"
+        )
+        return TryonBatchResponse(
+            batch_id=batch_id,
+            message="Tryon batch created",
+            credits_used=len(to_generate),
+            items=[
+                TryonBatchItem(
+                    tryon_id=str(records_by_clothing[cid].id),
+                    clothing_id=cid,
+                    status=records_by_clothing[cid].status,
+                    version=records_by_clothing[cid].version,
+                )
+                for cid in clothing_ids
+            ],
         )
 
-    async def _call_ia(self, user_id: str, body, tryon_id: str, clothing):
-        logger.info(f"🤖 [IA] Starting virtual try-on for body={body.id} × clothing={clothing.id}")
-        body_url = await self.storage.get_presigned_url(body.image_url)
-        clothing_url = await self.storage.get_presigned_url(clothing.image_url)
+    async def _abort_tryons(self, user_id, tryon_ids: List, reason: str):
+        """
+        Compensation quand l'enfilage échoue après débit : les try-ons passent en
+        erreur et leurs crédits sont rendus. Best effort, l'erreur d'origine prime.
+        """
+        results = await asyncio.gather(
+            *(self.repo.set_error(str(tryon_id), reason) for tryon_id in tryon_ids),
+            self.repo.release_credits(user_id, len(tryon_ids)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"🔴 [Tryon] Compensation failed for user {user_id}: {result!r}")
+        metrics.inc("tryon.enqueue_failures", len(tryon_ids))
 
-        mask_field_map = {
-            "upper": "mask_upper",
-            "lower": "mask_lower",
-            "dress": "mask_dress",
-        }
-        mask_attr = mask_field_map.get(clothing.cloth_type)
+    async def _create_from_cache(self, user, body, cloth, tryon_id, version: int, now: datetime, output_url: str):
+        """ Même entrées, même sortie : nouvelle version pointant sur l'objet existant, sans GPU ni crédit """
+        renditions = (await self.repo.get_renditions([output_url])).get(output_url)
+        record = await self.repo.create_tryon(
+            tryon_id=tryon_id,
+            user_id=user.id,
+            body_id=body.id,
+            clothing_id=cloth.id,
+            version=version,
+            created_at=now,
+            status="ready",
+            output_url=output_url,
+            charge=False,
+            renditions=renditions,
+        )
+        logger.info(f"♻️ [IA] Tryon {tryon_id} served from result cache ({output_url})")
+        await self._publish_ready(user.id, tryon_id, body.id, cloth.id, version, output_url, renditions=renditions)
+        return TryonCreateResponse(
+            tryon_id=str(record.id),
+            created_at=record.created_at,
+            message="Tryon served from cache",
+            status=record.status,
+            version=version
+        )
+
+    @staticmethod
+    def _mask_key(body, clothing) -> str:
+        mask_attr = MASK_FIELDS.get(getattr(clothing, "cloth_type", None))
         if not mask_attr:
-            raise ValueError(f"No mask defined for cloth_type '{clothing.cloth_type}'")
-        
+            raise ValueError(f"No mask defined for cloth_type '{getattr(clothing, 'cloth_type', None)}'")
+
         mask_key = getattr(body, mask_attr, None)
         if not mask_key:
             raise ValueError(f"Body has no attribute '{mask_attr}' or it's empty")
-        
-        mask_url = await self.storage.get_presigned_url(mask_key)
+        return mask_key
+
+    async def _result_cache_key(self, user_id: str, body, clothing) -> Optional[str]:
+        """
+        Empreinte des entrées de l'inférence : contenu des images (ETag S3),
+        masque, modèle et paramètres. None si le try-on ne peut pas être mis en cache.
+        """
+        try:
+            mask_key = self._mask_key(body, clothing)
+        except ValueError:
+            return None
+        try:
+            body_etag, cloth_etag, mask_etag = await asyncio.gather(
+                self.storage.get_etag(body.image_url),
+                self.storage.get_etag(clothing.image_url),
+                self.storage.get_etag(mask_key),
+            )
+        except Exception as e:
+            logger.warning(f"🔶 [IA] Result cache skipped: {e}")
+            return None
+
+        return self._cache_fingerprint(user_id, body_etag, cloth_etag, mask_etag)
+
+    async def _batch_cache_keys(self, user_id: str, body, clothes: List, mask_keys: Dict[str, str]) -> Dict[str, Optional[str]]:
+        """ Clés de cache d'un batch : l'ETag du body et de chaque masque n'est lu qu'une fois """
+        object_keys = list(dict.fromkeys([body.image_url, *mask_keys.values(), *(c.image_url for c in clothes)]))
+        results = await asyncio.gather(*(self.storage.get_etag(key) for key in object_keys), return_exceptions=True)
+        etags = {key: etag for key, etag in zip(object_keys, results) if not isinstance(etag, Exception)}
+        if len(etags) < len(object_keys):
+            logger.warning(f"🔶 [IA] Result cache skipped for {len(object_keys) - len(etags)} batch input(s)")
+
+        keys = {}
+        for clothing in clothes:
+            clothing_id = str(clothing.id)
+            parts = (etags.get(body.image_url), etags.get(clothing.image_url), etags.get(mask_keys[clothing_id]))
+            keys[clothing_id] = self._cache_fingerprint(user_id, *parts) if all(parts) else None
+        return keys
+
+    @staticmethod
+    def _cache_fingerprint(user_id: str, body_etag: str, cloth_etag: str, mask_etag: str) -> str:
+        fingerprint = {
+            # Par utilisateur : un résultat n'est jamais partagé entre comptes
+            "user_id": str(user_id),
+            "body": body_etag,
+            "cloth": cloth_etag,
+            "mask": mask_etag,
+            "model": settings.REPLICATE_MODEL_REF,
+            "steps": TRYON_STEPS,
+            "guidance_scale": TRYON_GUIDANCE_SCALE,
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+    async def run_job(self, payload: dict):
+        """ Handler du job `tryon` exécuté par le worker """
+        body = await self.body_repo.get_body_by_id(payload["body_id"])
+        cloth = await self.clothing_repo.get_clothing_by_id(payload["clothing_id"])
+        if not body or not cloth:
+            raise PermanentJobError("Body or clothing no longer exists")
+        # URLs signées à la création du batch, si elles survivent encore à la prédiction
+        inputs = payload.get("inputs")
+        if inputs and payload.get("inputs_expire_at", 0) < time.time() + settings.REPLICATE_PREDICTION_TIMEOUT:
+            inputs = None
+        try:
+            await self._call_ia(
+                payload["user_id"], body, payload["tryon_id"], cloth,
+                version=payload.get("version", 1),
+                cache_key=payload.get("cache_key"),
+                inputs=inputs,
+                batch_id=payload.get("batch_id"),
+            )
+        except ValueError as e:
+            # Masque manquant : une nouvelle tentative n'y changera rien
+            raise PermanentJobError(str(e)) from e
+
+    async def fail_job(self, payload: dict, error: str):
+        """ Échec définitif du job : le try-on passe en erreur et le client est notifié """
+        msg = "Échec de la génération IA"
+        logger.error(f"🔴 [IA] Tryon {payload['tryon_id']} failed: {error}")
+        await self.repo.set_error(payload["tryon_id"], msg)
+        await self._publish_error(payload["user_id"], payload["tryon_id"], msg, batch_id=payload.get("batch_id"))
+
+    async def _publish_error(self, user_id: str, tryon_id: str, msg: str, batch_id: Optional[str] = None):
+        event = {
+            "type":     "tryon_update",
+            "tryon_id": str(tryon_id),
+            "status":   "failed",
+            "error":    msg,
+        }
+        if batch_id:
+            event["batch_id"] = batch_id
+        await self.publisher.publish(user_id, event)
+
+    async def _publish_ready(
+        self,
+        user_id: str,
+        tryon_id,
+        body_id,
+        clothing_id,
+        version: int,
+        s3_key: str,
+        batch_id: Optional[str] = None,
+        renditions: Optional[Dict[str, str]] = None,
+    ):
+        renditions = renditions or {}
+        urls = await self.storage.presign_many([s3_key, *renditions.values()])
+        public_url = urls[s3_key]
+        event = {
+            "type":       "tryon_update",
+            "tryon_id":   str(tryon_id),
+            "body_id":    str(body_id),
+            "clothing_id": str(clothing_id),
+            "created_at": datetime.now().isoformat(),
+            "version":    version,
+            "output_url": public_url,
+            **{field: urls.get(key) for field, key in renditions.items()},
+            "status":     "ready",
+        }
+        if batch_id:
+            event["batch_id"] = batch_id
+        await self.publisher.publish(user_id, event)
+
+    async def _call_ia(
+        self,
+        user_id: str,
+        body,
+        tryon_id: str,
+        clothing,
+        version: int = 1,
+        cache_key: Optional[str] = None,
+        inputs: Optional[dict] = None,
+        batch_id: Optional[str] = None,
+    ):
+        logger.info(f"🤖 [IA] Starting virtual try-on for body={body.id} × clothing={clothing.id}")
+        mask_key = self._mask_key(body, clothing)
+        if inputs:
+            body_url, clothing_url, mask_url = inputs["person"], inputs["cloth"], inputs["mask"]
+        else:
+            urls = await self.storage.presign_many([body.image_url, clothing.image_url, mask_key])
+            body_url, clothing_url, mask_url = urls[body.image_url], urls[clothing.image_url], urls[mask_key]
                 
         try:
-            raw_output = await asyncio.to_thread(
-                lambda: replicate.run(
-                    settings.REPLICATE_MODEL_REF,
-                    input={
-                        "person":        body_url,
-                        "cloth":         clothing_url,
-                        "mask":          mask_url,
-                        "steps":         50,
-                        "guidance_scale":2,
-                        "return_dict":   False,
-                    },
-                )
+            raw_output = await self.predictions.run(
+                settings.REPLICATE_MODEL_REF,
+                input={
+                    "person":        body_url,
+                    "cloth":         clothing_url,
+                    "mask":          mask_url,
+                    "steps":         TRYON_STEPS,
+                    "guidance_scale":TRYON_GUIDANCE_SCALE,
+                    "return_dict":   False,
+                },
             )
         except Exception as e:
+            # Pas de set_error ici : le worker décide entre retry et échec définitif
             msg = "Échec de la génération IA"
             logger.exception(msg)
-            await self.repo.set_error(tryon_id, msg)
-            await self._publish_error(user_id, tryon_id, msg)
             raise InternalServerError(msg)
         
         output_url = raw_output[0] if isinstance(raw_output, list) else raw_output
@@ -129,52 +472,71 @@ class TryonService:
             output_url = str(output_url)
         logger.info(f"✅ [IA] Replicate returned: {output_url}")
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(output_url) as resp:
-                    resp.raise_for_status()
-                    img_bytes = await resp.read()
-        except Exception as e:
-            msg = "Échec du téléchargement de l’image IA"
-            logger.exception(msg)
-            await self.repo.set_error(tryon_id, msg)
-            await self._publish_error(user_id, tryon_id, msg)
-            raise InternalServerError(msg)
-
+        # Réponse HTTP → parties multipart S3 : mémoire bornée quelle que soit la résolution.
+        # Copie disque au passage pour les déclinaisons : le pool d'images ne relit rien sur le réseau
         s3_key = StoragePathBuilder.tryon(user_id, body.id, tryon_id)
-        await self.storage.upload_image(s3_key, img_bytes)
+        with SourceSpool(settings.TRYON_RENDITION_MAX_SOURCE_BYTES) as source:
+            try:
+                async with self.predictions.stream(output_url) as output:
+                    await self.storage.upload_stream(
+                        s3_key,
+                        source.tee(output.iter_chunks()),
+                        content_type=output.content_type,
+                        expected_length=output.content_length,
+                        expected_md5=output.md5,
+                    )
+            except Exception as e:
+                msg = "Échec du transfert de l’image IA"
+                logger.exception(msg)
+                raise InternalServerError(msg)
 
-        await self.repo.set_tryon(tryon_id, s3_key)
+            renditions = await self._store_renditions(s3_key, source)
+        await self.repo.set_tryon(tryon_id, s3_key, renditions)
+        if cache_key:
+            await self.repo.set_cached_result(cache_key, s3_key)
         logger.info(f"✅ [IA] Output stored at {s3_key}")
-        
-        public_url = await self.storage.get_presigned_url(s3_key)
 
         logger.info(f"✅ [IA] Replicate OK")
-        
-        await pubsub_manager.publish(
-            user_id,
-            {
-                "type":       "tryon_update",
-                "tryon_id":   str(tryon_id),
-                "body_id":    str(body.id),
-                "clothing_id": str(clothing.id),
-                "created_at": datetime.now().isoformat(),
-                "version":    1,  # TODO: gérer les versions
-                "output_url": public_url,
-                "status":     "ready",
-            }
+
+        await self._publish_ready(
+            user_id, tryon_id, body.id, clothing.id, version, s3_key, batch_id=batch_id, renditions=renditions
         )
         logger.info(f"✅ [IA] SSE published for user {user_id} with tryon {tryon_id}")
 
-    async def get_all_tryons(self, user_id: str) -> TryonListResponse:
-        docs = await self.repo.get_all_by_user(user_id)
+    async def _store_renditions(self, s3_key: str, source: SourceSpool) -> Dict[str, str]:
+        """
+        Miniature et taille moyenne en WebP, rangées à côté de la sortie.
+        Le pool d'images relit la copie disque de la sortie : le job n'en garde pas de copie.
+        Best effort : en cas d'échec le try-on reste servi par sa sortie pleine taille.
+        """
+        if not source.complete:
+            logger.warning(f"🔶 [IA] No renditions for {s3_key}: {source.size} bytes not spooled (cap {source.max_bytes})")
+            metrics.inc("tryon.renditions.skipped")
+            return {}
+        try:
+            images = await self.images.render_webp_renditions_from_file(
+                source.path, TRYON_RENDITIONS, settings.TRYON_WEBP_QUALITY,
+            )
+            keys = {name: StoragePathBuilder.tryon_rendition(s3_key, name) for name in images}
+            await asyncio.gather(*(
+                self.storage.upload_image(keys[name], data, content_type="image/webp")
+                for name, data in images.items()
+            ))
+        except Exception as e:
+            logger.warning(f"🔶 [IA] Renditions failed for {s3_key}: {e}")
+            metrics.inc("tryon.renditions.failed")
+            return {}
+        metrics.inc("tryon.renditions.created")
+        return {f"{name}_url": key for name, key in keys.items()}
+
+    async def _list_items(self, docs) -> List[TryonItem]:
+        """ Items de liste : sortie et déclinaisons signées en un seul lot """
+        urls = await self.storage.presign_many(
+            key for doc in docs for key in (doc.output_url, doc.thumbnail_url, doc.medium_url)
+        )
         tryons = []
         for doc in docs:
-            if doc.output_url:
-                url = await self.storage.get_presigned_url(doc.output_url)
-            else:
-                url = None
-
+            url = urls.get(doc.output_url) if doc.output_url else None
             if not url:
                 logger.warning(f"🔴 [Tryon] No output URL for tryon {doc.id}, skipping")
                 continue
@@ -182,23 +544,33 @@ class TryonService:
             tryons.append(TryonItem(
                 id=str(doc.id),
                 output_url=url,
+                thumbnail_url=urls.get(doc.thumbnail_url) if doc.thumbnail_url else None,
+                medium_url=urls.get(doc.medium_url) if doc.medium_url else None,
                 body_id=str(doc.body_id),
                 clothing_id=str(doc.clothing_id),
                 status=doc.status,
                 created_at=doc.created_at,
                 version=doc.version
             ))
-        return TryonListResponse(tryons=tryons)
+        return tryons
+
+    async def get_all_tryons(
+        self, user_id: str, limit: int = settings.TRYON_PAGE_SIZE, after: Optional[str] = None
+    ) -> TryonListResponse:
+        docs, next_cursor = await self.repo.get_all_by_user(user_id, limit, after)
+        return TryonListResponse(tryons=await self._list_items(docs), next_cursor=next_cursor)
 
     async def get_tryon_by_id(self, tryon_id: str, user) -> TryonDetailResponse:
         doc = await self.repo.get_tryon_by_id(tryon_id)
         if not doc or str(doc.user_id) != str(user.id):
             raise NotFoundError("Tryon not found")
 
-        url = await self.storage.get_presigned_url(doc.output_url)
+        urls = await self.storage.presign_many([doc.output_url, doc.thumbnail_url, doc.medium_url])
         return TryonDetailResponse(
             id=str(doc.id),
-            output_url=url,
+            output_url=urls.get(doc.output_url),
+            thumbnail_url=urls.get(doc.thumbnail_url) if doc.thumbnail_url else None,
+            medium_url=urls.get(doc.medium_url) if doc.medium_url else None,
             body_id=str(doc.body_id),
             clothing_id=str(doc.clothing_id),
             status=doc.status,
@@ -212,7 +584,12 @@ class TryonService:
         if not doc or str(doc.user_id) != str(user.id):
             raise UnauthorizedError("You do not own this tryon")
 
-        await self.storage.delete_image(doc.output_url)
+        # La sortie peut être partagée par plusieurs versions servies depuis le cache
+        if doc.output_url and await self.repo.count_by_output_url(doc.output_url) <= 1:
+            await self.repo.delete_cached_results(doc.output_url)
+            for key in (doc.output_url, doc.thumbnail_url, doc.medium_url):
+                if key:
+                    await self.storage.delete_image(key)
         await self.repo.delete_tryon(tryon_id)
         logger.info(f"🗑️ Deleted tryon {tryon_id}")
         return TryonDeleteResponse(message="Tryon deleted")
@@ -237,7 +614,7 @@ class TryonService:
             pubsub_manager.unsubscribe(user_id, queue)
 
     async def get_tryons_by_body(
-        self, body_id: str, user
+        self, body_id: str, user, limit: int = settings.TRYON_PAGE_SIZE, after: Optional[str] = None
     ) -> TryonListResponse:
         """
         Récupère tous les try-ons pour un body spécifique.
@@ -246,25 +623,5 @@ class TryonService:
         if not body or str(body.user_id) != str(user.id):
             raise UnauthorizedError("You do not own this body")
 
-        docs = await self.repo.get_all_by_body(body_id)
-        tryons = []
-        for doc in docs:
-            if doc.output_url:
-                url = await self.storage.get_presigned_url(doc.output_url)
-            else:
-                url = None
-
-            if not url:
-                logger.warning(f"🔴 [Tryon] No output URL for tryon {doc.id}, skipping")
-                continue
-
-            tryons.append(TryonItem(
-                id=str(doc.id),
-                output_url=url,
-                body_id=str(doc.body_id),
-                clothing_id=str(doc.clothing_id),
-                status=doc.status,
-                created_at=doc.created_at,
-                version=doc.version
-            ))
-        return TryonListResponse(tryons=tryons)
\ No newline at end of file
+        docs, next_cursor = await self.repo.get_all_by_body(body_id, limit, after)
+        return TryonListResponse(tryons=await self._list_items(docs), next_cursor=next_cursor)
\ No newline at end of file
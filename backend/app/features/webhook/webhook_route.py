@@ -0,0 +1,34 @@
+import json
+
+from fastapi import APIRouter, Request
+from app.core.config import settings
+from app.core.errors import UnauthorizedError, ValidationError
+from app.core.logging_config import logger
+from app.infrastructure.replicate.replicate_client import prediction_waiters, verify_webhook_signature
+from .webhook_schema import ReplicateWebhookResponse
+
+router = APIRouter(prefix="/webhook", tags=["Webhook"])
+
+# ✅ Replicate : fin de prédiction (webhook_events_filter=["completed"])
+@router.post("/replicate", response_model=ReplicateWebhookResponse)
+async def replicate_webhook(request: Request):
+    # Sans secret, impossible d'authentifier l'appel : les prédictions sont suivies par polling
+    if not settings.REPLICATE_WEBHOOK_SECRET:
+        raise UnauthorizedError("Replicate webhooks are disabled.")
+    payload = await request.body()
+    if not verify_webhook_signature(settings.REPLICATE_WEBHOOK_SECRET, request.headers, payload):
+        raise ValidationError("Invalid Replicate signature.")
+    try:
+        prediction = json.loads(payload)
+    except ValueError:
+        prediction = None
+    if not isinstance(prediction, dict):
+        raise ValidationError("Invalid Replicate payload.")
+
+    # Attente dans un autre process (son polling prendra le relais), ou pas encore
+    # enregistrée ici : la prédiction est gardée un moment pour register()
+    if not prediction_waiters.resolve(prediction):
+        logger.info(f"🟡 [Replicate] No local waiter for prediction {prediction.get('id')}")
+        return ReplicateWebhookResponse(message="Prediction not awaited here.")
+    logger.info(f"✅ [Replicate] Prediction {prediction.get('id')} {prediction.get('status')}")
+    return ReplicateWebhookResponse(message="Prediction resolved.")
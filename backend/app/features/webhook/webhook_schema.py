@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+
+# -----------------------------
+# Webhook: Réponse après traitement Replicate
+# -----------------------------
+
+class ReplicateWebhookResponse(BaseModel):
+    message: str = Field(..., description="Message indiquant le résultat du traitement du webhook")
@@ -1,4 +1,6 @@
-from fastapi import Depends, HTTPException, status, Query
+import hmac
+
+from fastapi import Depends, Header, HTTPException, status, Query
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from app.core.config import settings
@@ -59,4 +61,19 @@ async def get_user_from_token(
     user = await repo.get_user_by_email(email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+async def require_metrics_token(authorization: str = Header(default="")):
+    """
+    Pour /metrics : jeton Bearer partagé avec le scraper (METRICS_TOKEN).
+    Sans jeton configuré, l'endpoint répond 404 comme s'il n'existait pas.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,209 @@
+# app/infrastructure/http/http_clients.py
+"""
+Registre des clients HTTP sortants, ouvert et fermé par le lifespan (et par
+les process annexes : worker, jobs).
+
+Chaque profil (pinterest, replicate, downloads) a sa session aiohttp longue
+durée : pool de connexions borné par hôte, keep-alive, cache DNS, timeouts
+et politique de retry propres. Les features récupèrent leur session par nom
+au lieu d'ouvrir la leur, et les compteurs `http.<profil>.*` exposés sur
+/metrics montrent la réutilisation des connexions.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.metrics import metrics
+
+
+class RetryPolicy:
+    """ Retry des requêtes idempotentes sur erreur réseau ou statut transitoire """
+
+    def __init__(
+        self,
+        attempts: int = 1,
+        backoff: float = 0.5,
+        backoff_max: float = 5,
+        statuses: Tuple[int, ...] = (429, 502, 503, 504),
+        methods: Tuple[str, ...] = ("GET", "HEAD"),
+    ):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.statuses = statuses
+        self.methods = methods
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # Retry-After : un nombre de secondes ou une date HTTP
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0), self.backoff_max)
+            except ValueError:
+                pass
+            try:
+                wait = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                return min(max(wait, 0), self.backoff_max)
+            except (TypeError, ValueError):
+                pass
+        return min(self.backoff * 2 ** (attempt - 1), self.backoff_max)
+
+
+class ClientProfile:
+    def __init__(
+        self,
+        limit_per_host: int = 20,
+        limit: int = 100,
+        total_timeout: Optional[float] = None,
+        connect_timeout: float = 5,
+        read_timeout: Optional[float] = None,
+        keepalive_timeout: float = 30,
+        dns_ttl: int = 300,
+        cookies: bool = False,
+        retry: RetryPolicy = None,
+    ):
+        self.limit_per_host = limit_per_host
+        self.limit = limit
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.cookies = cookies
+        self.retry = retry or RetryPolicy()
+
+
+def default_profiles() -> Dict[str, ClientProfile]:
+    keepalive, dns_ttl = settings.HTTP_KEEPALIVE_TIMEOUT, settings.HTTP_DNS_CACHE_TTL
+    return {
+        # Le scraper gère lui-même le 403 (token CSRF expiré) : pas de retry générique
+        "pinterest": ClientProfile(
+            limit_per_host=settings.PINTEREST_MAX_CONNECTIONS,
+            total_timeout=settings.PINTEREST_REQUEST_TIMEOUT,
+            keepalive_timeout=keepalive,
+            dns_ttl=dns_ttl,
+        ),
+        "replicate": ClientProfile(
+            limit_per_host=settings.REPLICATE_MAX_CONNECTIONS,
+            total_timeout=settings.REPLICATE_REQUEST_TIMEOUT,
+            keepalive_timeout=keepalive,
+            dns_ttl=dns_ttl,
+            retry=RetryPolicy(attempts=settings.HTTP_RETRY_ATTEMPTS),
+        ),
+        # Fichiers de sortie lus en flux : pas de timeout total, seulement entre deux lectures
+        "downloads": ClientProfile(
+            limit_per_host=settings.DOWNLOAD_MAX_CONNECTIONS,
+            read_timeout=settings.DOWNLOAD_READ_TIMEOUT,
+            keepalive_timeout=keepalive,
+            dns_ttl=dns_ttl,
+            retry=RetryPolicy(attempts=settings.HTTP_RETRY_ATTEMPTS),
+        ),
+    }
+
+
+def _trace_config(name: str) -> aiohttp.TraceConfig:
+    """ Compteurs de réutilisation : connexions créées vs reprises du pool, cache DNS """
+    trace = aiohttp.TraceConfig()
+
+    def counter(metric: str):
+        async def on_event(session, context, params):
+            metrics.inc(f"http.{name}.{metric}")
+        return on_event
+
+    trace.on_request_start.append(counter("requests"))
+    trace.on_request_exception.append(counter("errors"))
+    trace.on_connection_create_end.append(counter("connections.created"))
+    trace.on_connection_reuseconn.append(counter("connections.reused"))
+    trace.on_dns_cache_hit.append(counter("dns_cache.hits"))
+    trace.on_dns_cache_miss.append(counter("dns_cache.misses"))
+    return trace
+
+
+def build_session(name: str, profile: ClientProfile) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=profile.limit,
+        limit_per_host=profile.limit_per_host,
+        keepalive_timeout=profile.keepalive_timeout,
+        ttl_dns_cache=profile.dns_ttl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=profile.timeout,
+        # Pas de cookies partagés entre utilisateurs par défaut
+        cookie_jar=None if profile.cookies else aiohttp.DummyCookieJar(),
+        trace_configs=[_trace_config(name)],
+    )
+
+
+class HttpClients:
+    _sessions: Dict[str, aiohttp.ClientSession] = {}
+    _profiles: Dict[str, ClientProfile] = {}
+
+    @classmethod
+    async def connect(cls, profiles: Dict[str, ClientProfile] = None):
+        """ Ouvre une session par profil (les profils déjà ouverts sont conservés) """
+        profiles = profiles or default_profiles()
+        logger.info("🟡 [HTTP] Opening outbound HTTP clients...")
+        for name, profile in profiles.items():
+            if name not in cls._sessions:
+                cls._sessions[name] = build_session(name, profile)
+                cls._profiles[name] = profile
+        logger.info(f"🟢 [HTTP] Outbound HTTP clients ready ({', '.join(cls._sessions)})")
+
+    @classmethod
+    def get(cls, name: str) -> aiohttp.ClientSession:
+        """ Retourne la session partagée du profil """
+        session = cls._sessions.get(name)
+        if session is None:
+            logger.error(f"🔴 [HTTP] Client '{name}' is not connected. Call HttpClients.connect() first.")
+            raise Exception(f"HTTP client '{name}' is not connected. Call HttpClients.connect() first.")
+        return session
+
+    @classmethod
+    def retry_policy(cls, name: str) -> RetryPolicy:
+        profile = cls._profiles.get(name)
+        return profile.retry if profile else RetryPolicy()
+
+    @classmethod
+    async def close(cls):
+        """ Ferme les sessions et leurs connexions keep-alive """
+        for session in cls._sessions.values():
+            await session.close()
+        if cls._sessions:
+            logger.info("🔴 [HTTP] Outbound HTTP clients closed")
+        cls._sessions, cls._profiles = {}, {}
+
+
+@asynccontextmanager
+async def request(session: aiohttp.ClientSession, method: str, url: str, retry: RetryPolicy = None, name: str = "http", **kwargs):
+    """
+    Requête avec la politique de retry du profil : seules les méthodes
+    idempotentes sont rejouées, sur erreur réseau ou statut transitoire.
+    """
+    retry = retry or RetryPolicy()
+    attempts = retry.attempts if method.upper() in retry.methods else 1
+    for attempt in range(1, attempts + 1):
+        last = attempt == attempts
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if last:
+                raise
+            delay = retry.delay(attempt)
+            logger.warning(f"🔶 [HTTP] {method} {url} failed ({e!r}), retrying in {delay}s")
+        else:
+            if response.status not in retry.statuses or last:
+                try:
+                    yield response
+                finally:
+                    response.release()
+                return
+            delay = retry.delay(attempt, response.headers.get("Retry-After"))
+            response.release()
+            logger.warning(f"🔶 [HTTP] {method} {url} returned {response.status}, retrying in {delay}s")
+        metrics.inc(f"http.{name}.retries")
+        await asyncio.sleep(delay)
@@ -0,0 +1,125 @@
+# app/infrastructure/images/image_pool.py
+"""
+Pool de process pour le travail d'image lié au CPU (décodage, redimension,
+encodage WebP). Dans un thread il tiendrait le GIL et ralentirait l'event
+loop ; ici il tourne à côté, borné à IMAGE_POOL_WORKERS process.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.infrastructure.images.renditions import render_webp_renditions_from_file
+
+
+class ImagePool:
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        """ Pool partagé, démarré au premier usage """
+        if cls._executor is None:
+            # spawn : pas de fork d'un process qui porte une event loop et des threads
+            cls._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"🟢 [Images] Process pool started ({settings.IMAGE_POOL_WORKERS} workers)")
+        return cls._executor
+
+    @classmethod
+    async def render_webp_renditions_from_file(cls, path: str, sizes: Dict[str, int], quality: int) -> Dict[str, bytes]:
+        """ La source est lue sur disque par le process du pool : mémoire bornée par IMAGE_POOL_WORKERS """
+        return await cls._run(partial(render_webp_renditions_from_file, path, sizes, quality))
+
+    @classmethod
+    async def _run(cls, fn):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(cls.get_executor(), fn)
+        except BrokenProcessPool:
+            # Un process tué (OOM...) casse tout le pool : le suivant repartira d'un pool neuf
+            logger.error("🔴 [Images] Process pool broken, restarting on next use")
+            cls._executor = None
+            raise
+
+    @classmethod
+    async def close(cls):
+        if cls._executor:
+            executor, cls._executor = cls._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, partial(executor.shutdown, cancel_futures=True))
+            logger.info("🔴 [Images] Process pool closed")
+
+
+class SourceSpool:
+    """
+    Copie disque d'une image reçue en flux, pour le pool d'images : le job
+    n'en garde pas de copie en mémoire et le process du pool n'a pas besoin
+    du réseau pour la relire. Au-delà de `max_bytes` la copie est abandonnée.
+
+        with SourceSpool(max_bytes) as spool:
+            await storage.upload_stream(key, spool.tee(chunks))
+            if spool.complete:
+                await ImagePool.render_webp_renditions_from_file(spool.path, ...)
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.path: Optional[str] = None
+        self.size = 0
+        self.overflowed = False
+        self._file = None
+        self._done = False
+
+    @property
+    def complete(self) -> bool:
+        """ Flux lu jusqu'au bout et copié en entier """
+        return self._done and not self.overflowed and self.path is not None
+
+    async def tee(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """ Relaie les chunks tels quels en les copiant au passage """
+        async for chunk in chunks:
+            self._write(chunk)
+            yield chunk
+        self._close()
+        self._done = True
+
+    def _write(self, chunk: bytes):
+        if self.overflowed:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.overflowed = True
+            self.discard()
+            return
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(prefix="image-spool-")
+            self._file = os.fdopen(fd, "wb")
+        self._file.write(chunk)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        self._close()
+        if self.path is not None:
+            path, self.path = self.path, None
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "SourceSpool":
+        return self
+
+    def __exit__(self, *exc):
+        self.discard()
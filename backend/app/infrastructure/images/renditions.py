@@ -0,0 +1,46 @@
+# app/infrastructure/images/renditions.py
+"""
+Déclinaisons WebP d'une image (miniature, taille moyenne).
+
+Fonctions pures, sans dépendance au reste de l'app : elles sont exécutées
+dans les process de l'ImagePool, le décodage et l'encodage étant liés au CPU.
+"""
+
+from io import BytesIO
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def render_webp_renditions(data: bytes, sizes: Dict[str, int], quality: int = 80) -> Dict[str, bytes]:
+    """
+    Une WebP par entrée de `sizes` (nom → plus grand côté en pixels), sans
+    jamais agrandir. Les tailles sont produites de la plus grande à la plus
+    petite, chacune à partir de la précédente.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+
+    renditions = {}
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        out = BytesIO()
+        image.save(out, format="WEBP", quality=quality, method=4)
+        renditions[name] = out.getvalue()
+    return renditions
+
+
+def render_webp_renditions_from_file(path: str, sizes: Dict[str, int], quality: int = 80) -> Dict[str, bytes]:
+    """
+    Même rendu, la source étant lue sur disque dans le process du pool
+    (copie locale de la sortie, voir SourceSpool) : aucun accès réseau ici.
+    """
+    with open(path, "rb") as source:
+        data = source.read()
+    return render_webp_renditions(data, sizes, quality)
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict
+
+from pymongo import CursorType
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid
+
+from app.core.logging_config import logger
+
+
+class MongoEventRelay:
+    """
+    Relais pubsub entre process via une collection Mongo capped.
+
+    Le worker publie ses événements (tryon_update…) dans la collection ;
+    chaque process API la suit avec un curseur tailable et les republie sur
+    son pubsub local, vers les WebSockets de l'utilisateur.
+    """
+
+    def __init__(self, db: Database, collection: str = "pubsub_events", size_bytes: int = 16 * 1024 * 1024):
+        self._db = db
+        self._name = collection
+        self._size_bytes = size_bytes
+        self._col = db[collection]
+
+    async def ensure_collection(self):
+        try:
+            await self._db.create_collection(self._name, capped=True, size=self._size_bytes)
+        except CollectionInvalid:
+            pass
+
+    async def publish(self, user_id: str, event: Dict[str, Any]):
+        await self._col.insert_one({"user_id": str(user_id), "event": event, "created_at": datetime.now()})
+
+    async def forward(self, pubsub, retry_delay: float = 1.0):
+        """ Republie en continu les nouveaux événements sur `pubsub` (tâche de fond) """
+        last_id = None
+        started = False
+        while True:
+            try:
+                if not started:
+                    await self.ensure_collection()
+                    last = await self._col.find_one({}, sort=[("$natural", -1)])
+                    last_id = last["_id"] if last else None
+                    started = True
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = self._col.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                try:
+                    async for doc in cursor:
+                        last_id = doc["_id"]
+                        await pubsub.publish(doc["user_id"], doc["event"])
+                finally:
+                    await cursor.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("🔴 [PubSub] Event relay failed")
+            # Curseur mort (collection vide ou erreur) : on le rouvre
+            await asyncio.sleep(retry_delay)
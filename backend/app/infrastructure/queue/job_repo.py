@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.database import Database
+
+
+class PermanentJobError(Exception):
+    """ Erreur non récupérable : le job échoue sans nouvelle tentative """
+
+
+class JobRepository:
+    """
+    File de jobs durable sur la collection Mongo `jobs`.
+
+    Un worker réclame un job de façon atomique (find_one_and_update) et le
+    garde sous bail (`lease_expires_at`) qu'il renouvelle par heartbeat. Un
+    job dont le bail a expiré (worker mort) redevient réclamable, jusqu'à
+    `max_attempts` tentatives.
+    """
+
+    def __init__(self, db: Database):
+        self._col = db["jobs"]
+
+    async def ensure_indexes(self):
+        await self._col.create_index([("status", 1), ("run_at", 1)])
+        await self._col.create_index([("status", 1), ("lease_expires_at", 1)])
+
+    @staticmethod
+    def _job_doc(kind: str, payload: Dict[str, Any], max_attempts: int, now: datetime) -> dict:
+        return {
+            "_id": ObjectId(),
+            "kind": kind,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int) -> ObjectId:
+        doc = self._job_doc(kind, payload, max_attempts, datetime.now())
+        await self._col.insert_one(doc)
+        return doc["_id"]
+
+    async def enqueue_many(self, kind: str, payloads: List[Dict[str, Any]], max_attempts: int) -> List[ObjectId]:
+        """ Enfile un lot de jobs en un seul aller-retour (insert_many) """
+        if not payloads:
+            return []
+        now = datetime.now()
+        docs = [self._job_doc(kind, payload, max_attempts, now) for payload in payloads]
+        await self._col.insert_many(docs)
+        return [doc["_id"] for doc in docs]
+
+    async def claim(self, worker_id: str, lease_seconds: float, kinds: List[str]) -> Optional[dict]:
+        """ Réclame le plus ancien job prêt, ou un job dont le bail a expiré """
+        now = datetime.now()
+        return await self._col.find_one_and_update(
+            {
+                "kind": {"$in": kinds},
+                "$or": [
+                    {"status": "queued", "run_at": {"$lte": now}},
+                    {
+                        "status": "running",
+                        "lease_expires_at": {"$lt": now},
+                        "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                    },
+                ],
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def heartbeat(self, job_id: ObjectId, worker_id: str, lease_seconds: float) -> bool:
+        """ Prolonge le bail ; False si le job a été repris par un autre worker """
+        now = datetime.now()
+        result = await self._col.update_one(
+            {"_id": job_id, "status": "running", "lease_owner": worker_id},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds), "updated_at": now}},
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id: ObjectId, worker_id: str):
+        await self._finish(job_id, worker_id, {"status": "done"})
+
+    async def retry(self, job_id: ObjectId, worker_id: str, error: str, delay: float):
+        await self._finish(job_id, worker_id, {
+            "status": "queued",
+            "run_at": datetime.now() + timedelta(seconds=delay),
+            "last_error": error,
+        })
+
+    async def fail(self, job_id: ObjectId, worker_id: str, error: str):
+        await self._finish(job_id, worker_id, {"status": "failed", "last_error": error})
+
+    async def _finish(self, job_id: ObjectId, worker_id: str, update: dict):
+        await self._col.update_one(
+            {"_id": job_id, "lease_owner": worker_id},
+            {"$set": {**update, "lease_owner": None, "lease_expires_at": None, "updated_at": datetime.now()}},
+        )
+
+    async def fail_expired(self) -> List[dict]:
+        """ Jobs abandonnés (bail expiré) qui ont épuisé leurs tentatives """
+        now = datetime.now()
+        query = {
+            "status": "running",
+            "lease_expires_at": {"$lt": now},
+            "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+        }
+        jobs = await self._col.find(query).to_list(length=None)
+        failed = []
+        for job in jobs:
+            result = await self._col.update_one(
+                {"_id": job["_id"], "status": "running", "lease_expires_at": job["lease_expires_at"]},
+                {"$set": {
+                    "status": "failed",
+                    "last_error": "Lease expired after the last attempt",
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "updated_at": now,
+                }},
+            )
+            if result.modified_count:
+                failed.append(job)
+        return failed
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.core.logging_config import logger
+from app.core.metrics import metrics
+from .job_repo import JobRepository, PermanentJobError
+
+JobHandler = Callable[[dict], Awaitable[None]]
+FailureHandler = Callable[[dict, str], Awaitable[None]]
+
+
+class JobWorker:
+    """
+    Boucle de consommation de la file `jobs`.
+
+    Au plus `concurrency` jobs en parallèle ; chaque job en cours renouvelle
+    son bail toutes les `heartbeat_seconds` (bail perdu : le job est annulé
+    localement, un autre worker l'a repris). Un échec est retenté avec un
+    backoff exponentiel, jusqu'à `max_attempts` ; au‐delà (ou sur
+    PermanentJobError), le handler `on_failure` du type de job est appelé.
+    """
+
+    def __init__(
+        self,
+        jobs: JobRepository,
+        handlers: Dict[str, JobHandler],
+        on_failure: Optional[Dict[str, FailureHandler]] = None,
+        concurrency: int = 4,
+        lease_seconds: float = 120,
+        heartbeat_seconds: float = 30,
+        poll_interval: float = 1,
+        backoff_seconds: float = 10,
+        backoff_max_seconds: float = 300,
+    ):
+        self.jobs = jobs
+        self.handlers = handlers
+        self.on_failure = on_failure or {}
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_interval = poll_interval
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._running: Set[asyncio.Task] = set()
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.backoff_max_seconds, self.backoff_seconds * 2 ** max(0, attempts - 1))
+
+    async def run(self, stop: asyncio.Event):
+        """ Réclame et exécute des jobs jusqu'à `stop`, puis attend les jobs en cours """
+        logger.info(f"🟢 [Worker] {self.worker_id} started (concurrency={self.concurrency})")
+        slots = asyncio.Semaphore(self.concurrency)
+        kinds = list(self.handlers)
+        while not stop.is_set():
+            await slots.acquire()
+            try:
+                await self._fail_exhausted()
+                job = await self.jobs.claim(self.worker_id, self.lease_seconds, kinds)
+            except Exception:
+                logger.exception("🔴 [Worker] Failed to claim a job")
+                job = None
+
+            if job is None:
+                slots.release()
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(lambda t: (self._running.discard(t), slots.release()))
+
+        if self._running:
+            logger.info(f"🟡 [Worker] Waiting for {len(self._running)} running job(s)...")
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info(f"🔴 [Worker] {self.worker_id} stopped")
+
+    async def _heartbeat(self, job_id, execution: asyncio.Task):
+        """ Renouvelle le bail ; s'il est perdu (job repris par un autre worker), l'exécution est annulée """
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                renewed = await self.jobs.heartbeat(job_id, self.worker_id, self.lease_seconds)
+            except Exception:
+                # Le bail court encore : nouvel essai à l'intervalle suivant
+                logger.exception(f"🔴 [Worker] Heartbeat failed for job {job_id}, retrying")
+                continue
+            if not renewed:
+                logger.warning(f"🔶 [Worker] Lost lease on job {job_id}, cancelling it")
+                execution.cancel()
+                return
+
+    async def _execute(self, job: dict):
+        job_id, kind = job["_id"], job["kind"]
+        execution = asyncio.create_task(self.handlers[kind](job["payload"]))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, execution))
+        try:
+            await execution
+        except asyncio.CancelledError:
+            # Annulation venue d'ailleurs que du heartbeat : on la propage
+            if not heartbeat.done() or heartbeat.cancelled():
+                raise
+            # Le job appartient désormais à un autre worker : rien à écrire
+            metrics.inc(f"jobs.{kind}.lease_lost")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if isinstance(e, PermanentJobError) or job["attempts"] >= job["max_attempts"]:
+                metrics.inc(f"jobs.{kind}.failed")
+                logger.error(f"🔴 [Worker] Job {job_id} ({kind}) failed: {error}")
+                await self.jobs.fail(job_id, self.worker_id, error)
+                await self._notify_failure(job, error)
+            else:
+                delay = self.backoff(job["attempts"])
+                metrics.inc(f"jobs.{kind}.retried")
+                logger.warning(f"🔶 [Worker] Job {job_id} ({kind}) attempt {job['attempts']} failed, retry in {delay:.0f}s: {error}")
+                await self.jobs.retry(job_id, self.worker_id, error, delay)
+        else:
+            metrics.inc(f"jobs.{kind}.done")
+            await self.jobs.complete(job_id, self.worker_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _fail_exhausted(self):
+        """ Jobs dont le worker est mort pendant la dernière tentative """
+        for job in await self.jobs.fail_expired():
+            metrics.inc(f"jobs.{job['kind']}.failed")
+            await self._notify_failure(job, "Lease expired after the last attempt")
+
+    async def _notify_failure(self, job: dict, error: str):
+        handler = self.on_failure.get(job["kind"])
+        if handler is None:
+            return
+        try:
+            await handler(job["payload"], error)
+        except Exception:
+            logger.exception(f"🔴 [Worker] Failure handler for job {job['_id']} failed")
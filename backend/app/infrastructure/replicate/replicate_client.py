@@ -0,0 +1,281 @@
+# app/infrastructure/replicate/replicate_client.py
+"""
+Client asynchrone des prédictions Replicate.
+
+Une prédiction est créée par un POST puis suivie sur l'event loop : polling
+avec backoff exponentiel, ou réveil immédiat par le webhook
+`POST /webhook/replicate` quand REPLICATE_WEBHOOK_URL est configuré (le
+polling, ralenti, reste alors un filet de sécurité si le webhook arrive sur
+un autre process). Aucune prédiction n'occupe de thread, même en attente
+pendant toute la durée du run GPU.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.lru_cache import LRUCache
+from app.core.metrics import metrics
+from app.infrastructure.http.http_clients import HttpClients, RetryPolicy, request
+
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+PREDICTION_SECONDS_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MD5_ETAG = re.compile(r'^"?([0-9a-f]{32})"?$')
+
+
+class OutputStream:
+    """ Corps d'un fichier de sortie lu par chunks, avec ce qu'il faut pour le vérifier """
+
+    def __init__(self, response: aiohttp.ClientResponse, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        self._response = response
+        self.chunk_size = chunk_size
+        self.content_type = response.content_type or "application/octet-stream"
+        self.content_length: Optional[int] = response.content_length
+        # Un ETag fort de 32 hex (sans W/ ni suffixe -N) est le MD5 du contenu
+        match = MD5_ETAG.match(response.headers.get("ETag", ""))
+        self.md5: Optional[str] = match.group(1) if match else None
+
+    def iter_chunks(self) -> AsyncIterator[bytes]:
+        return self._response.content.iter_chunked(self.chunk_size)
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+
+class ReplicateError(Exception):
+    """ Prédiction en échec, annulée, expirée ou refusée par l'API """
+
+
+class PredictionWaiters:
+    """
+    Futures en attente d'un webhook, indexées par id de prédiction (propres au process).
+
+    L'id n'est connu qu'au retour de create() : un webhook arrivé avant
+    l'enregistrement de l'attente est gardé `early_ttl` secondes, et
+    register() le retrouve.
+    """
+
+    def __init__(self, early_maxsize: int = 256, early_ttl: float = 60):
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._early = LRUCache("replicate_early_webhooks", maxsize=early_maxsize, ttl=early_ttl)
+
+    def register(self, prediction_id: str) -> asyncio.Future:
+        future = self._futures.get(prediction_id)
+        if future is None:
+            future = self._futures[prediction_id] = asyncio.get_running_loop().create_future()
+            early = self._early.pop(prediction_id)
+            if early is not None:
+                future.set_result(early)
+        return future
+
+    def discard(self, prediction_id: str):
+        self._futures.pop(prediction_id, None)
+
+    def resolve(self, prediction: dict) -> bool:
+        """ Réveille l'attente de la prédiction ; False si personne ne l'attend ici """
+        future = self._futures.pop(prediction.get("id"), None)
+        if future is None or future.done():
+            # Peut précéder le retour de create() : gardé pour un register() imminent
+            self._early.set(prediction.get("id"), prediction)
+            return False
+        future.set_result(prediction)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+
+prediction_waiters = PredictionWaiters()
+
+
+def configured_webhook_url() -> Optional[str]:
+    """
+    URL de webhook à transmettre à Replicate : seulement si le secret de
+    signature est configuré, sinon la route refuserait les appels et on suit
+    les prédictions par polling.
+    """
+    if not settings.REPLICATE_WEBHOOK_URL:
+        return None
+    if not settings.REPLICATE_WEBHOOK_SECRET:
+        logger.warning("🔶 [Replicate] REPLICATE_WEBHOOK_URL set without REPLICATE_WEBHOOK_SECRET, polling instead")
+        return None
+    return settings.REPLICATE_WEBHOOK_URL
+
+
+def verify_webhook_signature(secret: str, headers, body: bytes, tolerance: float = 300) -> bool:
+    """
+    Signature des webhooks Replicate : HMAC-SHA256 de "{id}.{timestamp}.{body}"
+    avec le secret "whsec_..." décodé en base64, en-tête "v1,<sig> [v1,<sig>...]".
+    """
+    webhook_id = headers.get("webhook-id")
+    timestamp = headers.get("webhook-timestamp")
+    signatures = headers.get("webhook-signature")
+    if not webhook_id or not timestamp or not signatures:
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+        key = base64.b64decode(secret.split("_", 1)[-1])
+    except ValueError:
+        return False
+
+    signed = f"{webhook_id}.{timestamp}.".encode() + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+    return any(
+        hmac.compare_digest(expected, candidate.split(",", 1)[-1])
+        for candidate in signatures.split()
+    )
+
+
+class ReplicatePredictions:
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        api_token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        webhook_url: Optional[str] = None,
+        waiters: PredictionWaiters = prediction_waiters,
+        poll_initial: Optional[float] = None,
+        poll_max: Optional[float] = None,
+        webhook_poll_max: Optional[float] = None,
+        timeout: Optional[float] = None,
+        create_attempts: int = 3,
+    ):
+        self._session = session
+        self.api_token = api_token or settings.REPLICATE_API_TOKEN
+        self.base_url = (base_url or settings.REPLICATE_API_BASE_URL).rstrip("/")
+        self.webhook_url = webhook_url
+        self.waiters = waiters
+        self.poll_initial = poll_initial or settings.REPLICATE_POLL_INITIAL
+        self.poll_max = poll_max or settings.REPLICATE_POLL_MAX
+        self.webhook_poll_max = webhook_poll_max or settings.REPLICATE_WEBHOOK_POLL_MAX
+        self.timeout = timeout or settings.REPLICATE_PREDICTION_TIMEOUT
+        self.create_attempts = max(1, create_attempts)
+        self.create_retry = RetryPolicy(
+            attempts=self.create_attempts, backoff=self.poll_initial * 2, backoff_max=self.poll_max,
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self._session or HttpClients.get("replicate")
+
+    @property
+    def download_session(self) -> aiohttp.ClientSession:
+        return self._session or HttpClients.get("downloads")
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_token}", "Content-Type": "application/json"}
+
+    def _create_request(self, ref: str, input: dict):
+        """ "owner/name:version" (ou un id de version seul) → /predictions, "owner/name" → /models/... """
+        body: Dict[str, Any] = {"input": input}
+        if self.webhook_url:
+            body["webhook"] = self.webhook_url
+            body["webhook_events_filter"] = ["completed"]
+        if ":" in ref or "/" not in ref:
+            body["version"] = ref.rsplit(":", 1)[-1]
+            return f"{self.base_url}/predictions", body
+        return f"{self.base_url}/models/{ref}/predictions", body
+
+    async def create(self, ref: str, input: dict) -> dict:
+        url, body = self._create_request(ref, input)
+        for attempt in range(1, self.create_attempts + 1):
+            async with self.session.post(url, json=body, headers=self._headers()) as resp:
+                # 429 / 5xx : on respecte Retry-After avant de réessayer
+                if (resp.status == 429 or resp.status >= 500) and attempt < self.create_attempts:
+                    delay = self.create_retry.delay(attempt, resp.headers.get("Retry-After"))
+                    logger.warning(f"🔶 [Replicate] Create returned {resp.status}, retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    continue
+                if resp.status >= 400:
+                    raise ReplicateError(f"Create prediction failed ({resp.status}): {await resp.text()}")
+                prediction = await resp.json()
+                metrics.inc("replicate.predictions.created")
+                return prediction
+
+    async def get(self, prediction_id: str) -> dict:
+        async with request(
+            self.session, "GET", f"{self.base_url}/predictions/{prediction_id}",
+            retry=HttpClients.retry_policy("replicate"), name="replicate", headers=self._headers(),
+        ) as resp:
+            if resp.status >= 400:
+                raise ReplicateError(f"Get prediction failed ({resp.status}): {await resp.text()}")
+            return await resp.json()
+
+    async def cancel(self, prediction_id: str):
+        try:
+            async with self.session.post(
+                f"{self.base_url}/predictions/{prediction_id}/cancel", headers=self._headers()
+            ) as resp:
+                resp.raise_for_status()
+        except Exception as e:
+            logger.warning(f"🔶 [Replicate] Cancel of {prediction_id} failed: {e}")
+
+    async def wait(self, prediction: dict) -> dict:
+        """ Attend un statut terminal : webhook si configuré, sinon polling avec backoff """
+        prediction_id = prediction["id"]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        # Le webhook a pu arriver pendant create() : register() le retrouve alors aussitôt
+        future = self.waiters.register(prediction_id) if self.webhook_url else None
+        delay, delay_max = self.poll_initial, (self.webhook_poll_max if future else self.poll_max)
+        try:
+            while prediction.get("status") not in TERMINAL_STATUSES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    await self.cancel(prediction_id)
+                    raise ReplicateError(f"Prediction {prediction_id} timed out after {self.timeout}s")
+
+                if future is not None:
+                    done, _ = await asyncio.wait({future}, timeout=min(delay, remaining))
+                    if done:
+                        # Une seule livraison attendue : si elle n'est pas terminale, le polling prend le relais
+                        prediction, future = future.result(), None
+                        continue
+                else:
+                    await asyncio.sleep(min(delay, remaining))
+
+                metrics.inc("replicate.polls")
+                prediction = await self.get(prediction_id)
+                delay = min(delay * 2, delay_max)
+        finally:
+            if self.webhook_url:
+                self.waiters.discard(prediction_id)
+        return prediction
+
+    async def run(self, ref: str, input: dict) -> Any:
+        """ Équivalent non bloquant de replicate.run : retourne l'output de la prédiction """
+        start = time.perf_counter()
+        prediction = await self.wait(await self.create(ref, input))
+        metrics.observe(
+            "replicate.prediction_seconds", time.perf_counter() - start, buckets=PREDICTION_SECONDS_BUCKETS
+        )
+        status = prediction.get("status")
+        metrics.inc(f"replicate.predictions.{status}")
+        if status != "succeeded":
+            raise ReplicateError(f"Prediction {prediction.get('id')} {status}: {prediction.get('error')}")
+        return prediction.get("output")
+
+    @asynccontextmanager
+    async def stream(self, url: str):
+        """ Ouvre un fichier de sortie en flux, sans le charger en mémoire """
+        async with request(
+            self.download_session, "GET", url, retry=HttpClients.retry_policy("downloads"), name="downloads"
+        ) as resp:
+            resp.raise_for_status()
+            yield OutputStream(resp)
+
+    async def download(self, url: str) -> bytes:
+        """ Télécharge un fichier de sortie avec la session partagée """
+        async with self.stream(url) as output:
+            return await output.read()
@@ -1,10 +1,12 @@
 import boto3
 from botocore.exceptions import NoCredentialsError
 from app.core.logging_config import logger
+from app.infrastructure.storage.s3_presigner import S3Presigner
 
 class S3Client:
     _client = None
     _bucket_name = None
+    _presigner = None
 
     @classmethod
     async def connect(cls, region: str = None, bucket_name: str = None, access_key: str = None, secret_key: str = None):
@@ -41,9 +43,17 @@ class S3Client:
             raise Exception("S3 bucket name is not configured")
         return cls._bucket_name
 
+    @classmethod
+    def get_presigner(cls):
+        """ Presigner local partagé (clé de signature en cache), construit au premier usage """
+        if cls._presigner is None:
+            cls._presigner = S3Presigner(cls.get_client(), cls.get_bucket_name())
+        return cls._presigner
+
     @classmethod
     async def close(cls):
         """ Close the S3 connection (not needed for boto3 but keeps the structure clean) """
         if cls._client:
             cls._client = None
+            cls._presigner = None
             logger.info("🔴 [S3] S3 connection closed")
\ No newline at end of file
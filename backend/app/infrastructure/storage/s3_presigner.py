@@ -0,0 +1,86 @@
+# app/infrastructure/storage/s3_presigner.py
+"""
+URLs présignées GET (SigV4, query string) calculées localement.
+
+boto3 reconstruit une requête complète et redérive la clé de signature à
+chaque generate_presigned_url. Ici la clé de signature (HMAC date/région/
+service) est calculée une fois par jour et par jeu de credentials ; une URL
+ne coûte plus qu'un SHA-256 et un HMAC. L'hôte et le préfixe de chemin
+(virtual-host ou path-style) sont repris d'une URL boto3 de référence, pour
+rester alignés sur la configuration du client.
+"""
+
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+PROBE_KEY = "presign-probe"
+UNRESERVED = "-_.~"
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+class S3Presigner:
+    def __init__(self, client, bucket: str):
+        self._credentials = client._request_signer._credentials
+        if self._credentials is None:
+            raise ValueError("S3 client has no credentials")
+        self.region = client.meta.region_name or "us-east-1"
+
+        probe = urlsplit(client.generate_presigned_url(
+            ClientMethod="get_object", Params={"Bucket": bucket, "Key": PROBE_KEY}, ExpiresIn=60,
+        ))
+        self.scheme, self.host = probe.scheme, probe.netloc
+        self.path_prefix = probe.path[: -len(PROBE_KEY)]
+        self._signing_key: Optional[Tuple[str, str, bytes]] = None
+
+    def _get_signing_key(self, secret_key: str, date: str) -> bytes:
+        cached = self._signing_key
+        if cached and cached[0] == secret_key and cached[1] == date:
+            return cached[2]
+        key = _hmac(("AWS4" + secret_key).encode("utf-8"), date)
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        self._signing_key = (secret_key, date, key)
+        return key
+
+    def presign_many(self, keys, expires_in: int = 3600, now: Optional[datetime] = None) -> Dict[str, str]:
+        """ Une URL par clé non vide ; credentials et clé de signature lus une fois pour le lot """
+        credentials = self._credentials.get_frozen_credentials()
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        signing_key = self._get_signing_key(credentials.secret_key, amz_date[:8])
+
+        params = {
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": f"{credentials.access_key}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": "host",
+        }
+        if credentials.token:
+            params["X-Amz-Security-Token"] = credentials.token
+        encoded = [(quote(name, safe=UNRESERVED), quote(value, safe=UNRESERVED)) for name, value in params.items()]
+        # Requête canonique triée ; l'URL garde l'ordre d'insertion, comme boto3
+        canonical_query = "&".join(f"{name}={value}" for name, value in sorted(encoded))
+        query = "&".join(f"{name}={value}" for name, value in encoded)
+        base = f"{self.scheme}://{self.host}"
+        string_prefix = f"{ALGORITHM}\n{amz_date}\n{scope}\n"
+        canonical_suffix = f"\n{canonical_query}\nhost:{self.host}\n\nhost\nUNSIGNED-PAYLOAD"
+
+        urls = {}
+        for key in keys:
+            if not key or key in urls:
+                continue
+            path = self.path_prefix + quote(key, safe="/~")
+            canonical = f"GET\n{path}{canonical_suffix}"
+            string_to_sign = string_prefix + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+            signature = hmac.new(signing_key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+            urls[key] = f"{base}{path}?{query}&X-Amz-Signature={signature}"
+        return urls
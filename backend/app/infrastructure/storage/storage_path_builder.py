@@ -16,6 +16,8 @@ class StoragePathBuilder:
     └── tryons/
         └── {body_id}/
             ├── {tryon_id}.jpg
+            ├── {tryon_id}_thumbnail.webp
+            ├── {tryon_id}_medium.webp
             └── ...
     """
         
@@ -39,3 +41,10 @@ class StoragePathBuilder:
     @staticmethod
     def tryon(user_id: str, body_id: str, tryon_id: str) -> str:
         return f"{user_id}/tryons/{body_id}/{tryon_id}.png"
+
+
+    @staticmethod
+    def tryon_rendition(output_key: str, rendition: str) -> str:
+        """ Déclinaison rangée à côté de la sortie : {tryon_id}_{rendition}.webp """
+        assert rendition in ["thumbnail", "medium"], "Invalid rendition"
+        return f"{output_key.rsplit('.', 1)[0]}_{rendition}.webp"
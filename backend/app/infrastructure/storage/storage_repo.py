@@ -1,20 +1,31 @@
 import asyncio
+import base64
+import hashlib
 from functools import partial
 from fastapi import UploadFile
 from botocore.exceptions import NoCredentialsError, BotoCoreError
-from typing import Union
+from typing import AsyncIterator, Dict, Iterable, Optional, Union
 
 from app.core.logging_config import logger
 from app.core.errors import InternalServerError
 from app.infrastructure.storage.s3_client import S3Client
+from app.infrastructure.storage.s3_presigner import S3Presigner
 from io import BytesIO
 
+# Taille d'une partie multipart (S3 impose au moins 5 Mo, sauf pour la dernière)
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+
 class StorageRepository:
     def __init__(self, bucket_name: str = None, s3_client=None):
         self._bucket = bucket_name or S3Client.get_bucket_name()
         self._client = s3_client or S3Client.get_client()
+        self._shared_client = s3_client is None
+        self._presigner = None
 
-    async def upload_image(self, object_key: str, file: Union[UploadFile, bytes, bytearray]) -> str:
+    async def upload_image(
+        self, object_key: str, file: Union[UploadFile, bytes, bytearray], content_type: Optional[str] = None
+    ) -> str:
         """
         Upload a file to S3 at the specified object_key. Returns the key (not URL).
         """
@@ -23,12 +34,12 @@ class StorageRepository:
             # Prépare le stream et le content type
             if isinstance(file, (bytes, bytearray)):
                 stream = BytesIO(file)
-                content_type = "image/png"
+                content_type = content_type or "image/png"
             else:
                 # fichier FastAPI UploadFile
                 await file.seek(0)
                 stream = file.file
-                content_type = file.content_type or "application/octet-stream"
+                content_type = content_type or file.content_type or "application/octet-stream"
 
             # Lance l'upload en thread pool pour ne pas bloquer l'event loop
             upload_fn = partial(
@@ -48,24 +59,164 @@ class StorageRepository:
         logger.info("🟢 [S3] Uploaded: %s", object_key)
         return object_key
 
+    async def upload_stream(
+        self,
+        object_key: str,
+        chunks: AsyncIterator[bytes],
+        content_type: str = "image/png",
+        expected_length: Optional[int] = None,
+        expected_md5: Optional[str] = None,
+        part_size: int = MULTIPART_PART_SIZE,
+    ) -> str:
+        """
+        Upload S3 en flux : les chunks sont regroupés en parties multipart
+        envoyées au fil de l'eau, la mémoire reste bornée à une partie.
+        Chaque partie porte son Content-MD5 (vérifié par S3) et la longueur
+        reçue est contrôlée avant de valider l'objet ; un écart avec l'ETag
+        source ou l'ETag final n'est que signalé.
+        """
+        loop = asyncio.get_running_loop()
+
+        def run(fn, **kwargs):
+            return loop.run_in_executor(None, partial(fn, **kwargs))
+
+        buffer = bytearray()
+        parts, part_digests = [], []
+        source_md5 = hashlib.md5()
+        total = 0
+        upload_id = None
+
+        async def flush():
+            nonlocal upload_id, buffer
+            if upload_id is None:
+                created = await run(
+                    self._client.create_multipart_upload,
+                    Bucket=self._bucket, Key=object_key, ContentType=content_type,
+                )
+                upload_id = created["UploadId"]
+            # La partie est envoyée telle quelle (boto3 accepte un bytearray, pas une memoryview) :
+            # les chunks suivants vont dans un buffer neuf plutôt que dans une copie
+            part, buffer = buffer, bytearray()
+            digest = hashlib.md5(part).digest()
+            part_number = len(parts) + 1
+            response = await run(
+                self._client.upload_part,
+                Bucket=self._bucket, Key=object_key, UploadId=upload_id, PartNumber=part_number,
+                Body=part, ContentMD5=base64.b64encode(digest).decode(),
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            part_digests.append(digest)
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                source_md5.update(chunk)
+                total += len(chunk)
+                if len(buffer) >= part_size:
+                    await flush()
+
+            if expected_length is not None and total != expected_length:
+                raise ValueError(f"received {total} bytes, expected {expected_length}")
+            if expected_md5 and source_md5.hexdigest() != expected_md5:
+                # Un ETag de 32 hex n'est pas garanti être un MD5 (CDN, chiffrement) : simple signal
+                logger.warning(f"🔶 [S3] {object_key}: content MD5 differs from the source ETag")
+
+            if upload_id is None:
+                # Objet plus petit qu'une partie : un seul PUT suffit
+                digest = hashlib.md5(buffer).digest()
+                response = await run(
+                    self._client.put_object,
+                    Bucket=self._bucket, Key=object_key, Body=buffer, ContentType=content_type,
+                    ContentMD5=base64.b64encode(digest).decode(),
+                )
+                expected_etag = digest.hex()
+            else:
+                if buffer:
+                    await flush()
+                response = await run(
+                    self._client.complete_multipart_upload,
+                    Bucket=self._bucket, Key=object_key, UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+                expected_etag = f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(parts)}"
+            if response.get("ETag", "").strip('"') != expected_etag:
+                # Parties déjà vérifiées par S3 via Content-MD5 ; l'ETag dépend du chiffrement (SSE-KMS)
+                logger.warning(f"🔶 [S3] {object_key}: S3 ETag differs from the uploaded content MD5")
+        except Exception as e:
+            if upload_id is not None:
+                try:
+                    await run(self._client.abort_multipart_upload, Bucket=self._bucket, Key=object_key, UploadId=upload_id)
+                except Exception:
+                    logger.exception("🔴 [S3] Failed to abort multipart upload")
+            logger.exception(f"🔴 [S3] Streaming upload error: {e}")
+            raise InternalServerError("Failed to upload image")
+        logger.info("🟢 [S3] Streamed %s (%d bytes, %d parts)", object_key, total, max(1, len(parts)))
+        return object_key
+
     async def get_presigned_url(self, object_key: str, expires_in: int = 3600) -> str:
         """
         Generate a presigned URL for secure access to S3 object.
         """
-        logger.info("🔑 [S3] Generating presigned URL for %s", object_key)
+        url = (await self.presign_many([object_key], expires_in)).get(object_key)
+        if not url:
+            raise InternalServerError("Failed to generate presigned URL")
+        return url
+
+    async def get_etag(self, object_key: str) -> str:
+        """
+        ETag S3 de l'objet : empreinte de son contenu (MD5 des octets pour un
+        upload en une partie), obtenue sans télécharger l'objet.
+        """
+        loop = asyncio.get_running_loop()
         try:
-            url = self._client.generate_presigned_url(
-                ClientMethod="get_object",
-                Params={"Bucket": self._bucket, "Key": object_key},
-                ExpiresIn=expires_in
-            )
+            head_fn = partial(self._client.head_object, Bucket=self._bucket, Key=object_key)
+            head = await loop.run_in_executor(None, head_fn)
+        except (NoCredentialsError, BotoCoreError) as e:
+            logger.exception(f"🔴 [S3] Head error: {e}")
+            raise InternalServerError("Failed to read image metadata")
+        except Exception:
+            logger.exception("🔴 [S3] Unexpected error during head")
+            raise InternalServerError("Failed to read image metadata")
+        return head["ETag"].strip('"')
+
+    def _get_presigner(self) -> Optional[S3Presigner]:
+        """ Presigner local, ou None si le client ne s'y prête pas (credentials non statiques...) """
+        if self._presigner is None:
+            try:
+                self._presigner = (
+                    S3Client.get_presigner() if self._shared_client else S3Presigner(self._client, self._bucket)
+                )
+            except Exception as e:
+                logger.warning(f"🔶 [S3] Local presigner unavailable, falling back to boto3: {e}")
+                self._presigner = False
+        return self._presigner or None
+
+    async def presign_many(self, object_keys: Iterable[Optional[str]], expires_in: int = 3600) -> Dict[str, str]:
+        """
+        URLs présignées d'un lot de clés (les clés vides sont ignorées), signées
+        localement avec la clé de signature en cache, sans log par clé.
+        """
+        keys = list(dict.fromkeys(key for key in object_keys if key))
+        if not keys:
+            return {}
+        try:
+            presigner = self._get_presigner()
+            if presigner is not None:
+                return presigner.presign_many(keys, expires_in)
+            return {
+                key: self._client.generate_presigned_url(
+                    ClientMethod="get_object",
+                    Params={"Bucket": self._bucket, "Key": key},
+                    ExpiresIn=expires_in,
+                )
+                for key in keys
+            }
         except (NoCredentialsError, BotoCoreError) as e:
             logger.exception(f"🔴 [S3] Presign error: {e}")
             raise InternalServerError("Failed to generate presigned URL")
         except Exception:
             logger.exception("🔴 [S3] Unexpected error during presign")
             raise InternalServerError("Failed to generate presigned URL")
-        return url
 
     async def delete_image(self, object_key: str) -> None:
         """
@@ -1,5 +1,6 @@
 # app/main.py
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from app.features.auth import auth_route
 from app.features.user import user_route
@@ -9,8 +10,9 @@ from app.features.tryon import tryon_route
 from app.features.favorite import favorite_route
 from app.features.payment import payment_route
 from app.features.explorer import explorer_route
+from app.features.webhook import webhook_route
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,6 +24,23 @@ from app.core.config import settings
 from app.core.errors import AppError
 from app.infrastructure.database.mongodb import MongoDB
 from app.infrastructure.storage.s3_client import S3Client
+from app.core.metrics import metrics
+from app.infrastructure.database.dependencies import require_metrics_token
+from app.features.explorer.model_registry import ModelRegistry
+from app.features.explorer.embedding_batcher import fashion_batcher
+from app.features.explorer.explorer_repo import ExplorerRepository
+from app.features.explorer.pinterest_scraper import AsyncPinterestScraper
+from app.features.explorer.csrf_token_cache import csrf_token_cache
+from app.features.explorer.search_cache import search_cache
+from app.features.explorer.page_prefetcher import page_prefetcher
+from app.core.pubsub_manager import pubsub_manager
+from app.infrastructure.queue.event_relay import MongoEventRelay
+from app.infrastructure.queue.job_repo import JobRepository
+from app.features.tryon.tryon_repo import TryonRepository
+from app.infrastructure.http.http_clients import HttpClients
+from app.infrastructure.images.image_pool import ImagePool
+from app.infrastructure.replicate.replicate_client import configured_webhook_url
+from app.worker import build_worker
 
 from app.core.exception_handler import global_exception_handler
 from fastapi.exceptions import RequestValidationError
@@ -36,9 +55,51 @@ async def lifespan(app: FastAPI):
         access_key=settings.AWS_ACCESS_KEY_ID,
         secret_key=settings.AWS_SECRET_ACCESS_KEY,
     )
+    await HttpClients.connect()
+    # Token CSRF récupéré dès le démarrage puis renouvelé avant expiration
+    if settings.PINTEREST_CSRF_BACKGROUND_REFRESH:
+        AsyncPinterestScraper().start_token_refresh()
+    if settings.EXPLORER_QUERY_CACHE_PERSIST or settings.EXPLORER_SEARCH_CACHE_PERSIST:
+        await ExplorerRepository(MongoDB.get_database()).ensure_indexes(
+            query_cache_ttl=settings.EXPLORER_QUERY_CACHE_TTL,
+            search_cache_ttl=settings.EXPLORER_SEARCH_CACHE_TTL + settings.EXPLORER_SEARCH_CACHE_STALE_TTL,
+        )
+    # Try-ons : relais des événements publiés par le worker vers les WebSockets locaux
+    db = MongoDB.get_database()
+    relay = MongoEventRelay(db)
+    relay_task = None
+    if settings.TRYON_EVENTS_RELAY:
+        relay_task = asyncio.create_task(relay.forward(pubsub_manager))
+    # Index des listes paginées (galerie, timeline d'un body) et unicité des versions
+    await TryonRepository(db).ensure_indexes()
+    worker_stop, worker_task = asyncio.Event(), None
+    if settings.TRYON_EMBEDDED_WORKER:
+        await JobRepository(db).ensure_indexes()
+        worker_task = asyncio.create_task(build_worker(db, publisher=pubsub_manager, webhook_url=configured_webhook_url()).run(worker_stop))
+    # Warm-up du modèle en tâche de fond : /health/ready reste en 503 tant qu'il n'est pas chargé
+    warmup_task = None
+    if settings.EXPLORER_PRELOAD_MODEL:
+        warmup_task = asyncio.create_task(ModelRegistry.warmup(settings.EXPLORER_MODEL_NAME))
     yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if worker_task:
+        worker_stop.set()
+        await worker_task
+    await ImagePool.close()
+    if relay_task:
+        # Le relais suit un curseur tailable : il doit être arrêté avant la fermeture du client Mongo
+        relay_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await relay_task
     await MongoDB.close()
     await S3Client.close()
+    await csrf_token_cache.close()
+    await search_cache.close()
+    await page_prefetcher.close()
+    await HttpClients.close()
+    await fashion_batcher.close()
+    await ModelRegistry.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -82,6 +143,23 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 
+# Sondes pour l'orchestrateur : pas de trafic tant que le worker n'est pas prêt
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    if settings.EXPLORER_PRELOAD_MODEL and not ModelRegistry.is_ready():
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready"}
+
+# Compteurs internes (routes, caches, files) : réservés au scraper qui détient METRICS_TOKEN
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    return metrics.snapshot()
+
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -102,3 +180,4 @@ app.include_router(tryon_route.router, prefix=API_V1)
 app.include_router(favorite_route.router, prefix=API_V1)
 app.include_router(payment_route.router, prefix=API_V1)
 app.include_router(explorer_route.router, prefix=API_V1)
+app.include_router(webhook_route.router, prefix=API_V1)
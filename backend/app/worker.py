@@ -0,0 +1,93 @@
+# app/worker.py
+"""
+Worker des jobs asynchrones (génération des try-ons) :
+    python -m app.worker
+
+L'API ne fait qu'enfiler dans la collection `jobs` ; ce process réclame les
+jobs, appelle l'IA avec une concurrence bornée et publie les mises à jour
+via le relais Mongo, que chaque process API republie sur ses WebSockets.
+"""
+
+import asyncio
+import signal
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.features.body.body_repo import BodyRepository
+from app.features.clothing.clothing_repo import ClothingRepository
+from app.features.tryon.tryon_repo import TryonRepository
+from app.features.tryon.tryon_service import TRYON_JOB, TryonService
+from app.infrastructure.database.mongodb import MongoDB
+from app.infrastructure.queue.event_relay import MongoEventRelay
+from app.infrastructure.queue.job_repo import JobRepository
+from app.infrastructure.queue.job_worker import JobWorker
+from app.infrastructure.http.http_clients import HttpClients
+from app.infrastructure.images.image_pool import ImagePool
+from app.infrastructure.replicate.replicate_client import ReplicatePredictions
+from app.infrastructure.storage.s3_client import S3Client
+from app.infrastructure.storage.storage_repo import StorageRepository
+
+
+def build_worker(db, publisher, webhook_url: Optional[str] = None) -> JobWorker:
+    """
+    `webhook_url` n'a de sens que pour le worker embarqué dans l'API : le
+    webhook réveille alors l'attente dans le même process. Le worker autonome
+    n'expose pas de route et suit ses prédictions par polling.
+    """
+    jobs = JobRepository(db)
+    tryon_service = TryonService(
+        repo=TryonRepository(db),
+        storage=StorageRepository(),
+        body_repo=BodyRepository(db),
+        clothing_repo=ClothingRepository(db),
+        jobs=jobs,
+        publisher=publisher,
+        predictions=ReplicatePredictions(webhook_url=webhook_url),
+    )
+    return JobWorker(
+        jobs,
+        handlers={TRYON_JOB: tryon_service.run_job},
+        on_failure={TRYON_JOB: tryon_service.fail_job},
+        concurrency=settings.TRYON_WORKER_CONCURRENCY,
+        lease_seconds=settings.TRYON_JOB_LEASE_SECONDS,
+        heartbeat_seconds=settings.TRYON_JOB_HEARTBEAT_SECONDS,
+        poll_interval=settings.WORKER_POLL_INTERVAL,
+        backoff_seconds=settings.TRYON_JOB_BACKOFF_SECONDS,
+        backoff_max_seconds=settings.TRYON_JOB_BACKOFF_MAX_SECONDS,
+    )
+
+
+async def main():
+    await MongoDB.connect(db_url=settings.MONGODB_URI, db_name=settings.MONGODB_DB)
+    await S3Client.connect(
+        region=settings.AWS_REGION_NAME,
+        bucket_name=settings.AWS_BUCKET_NAME,
+        access_key=settings.AWS_ACCESS_KEY_ID,
+        secret_key=settings.AWS_SECRET_ACCESS_KEY,
+    )
+    await HttpClients.connect()
+    db = MongoDB.get_database()
+    relay = MongoEventRelay(db)
+    await relay.ensure_collection()
+    await JobRepository(db).ensure_indexes()
+    await TryonRepository(db).ensure_indexes()
+
+    # SIGTERM / SIGINT : on arrête de réclamer et on termine les jobs en cours
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await build_worker(db, publisher=relay).run(stop)
+    finally:
+        await ImagePool.close()
+        await HttpClients.close()
+        await S3Client.close()
+        await MongoDB.close()
+        logger.info("🔴 [Worker] Shutdown complete")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+# benchmarks/embedding_backends.py
+"""
+Backends d'inférence du modèle explorer : accord des décisions + latence + mémoire.
+
+    python benchmarks/embedding_backends.py --backends torch torch-int8 onnx onnx-int8 \\
+        --queries 500 --min-agreement 0.98
+
+Chaque backend est chargé dans un interpréteur neuf (RSS mesuré isolément).
+L'accord compare, query par query, la décision de best_fashion_score
+(score >= 0.5 ou non) à celle du backend de référence `torch`. Avec
+--min-agreement, sort en erreur si un backend est en dessous du seuil (CI).
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+REFERENCE_BACKEND = "torch"
+THRESHOLD = 0.5
+# Queries hors‐sujet : celles qui doivent être préfixées par "outfit"
+OFF_TOPIC_QUERIES = [
+    "voiture rouge", "recette de crêpes", "chaton mignon", "plage au coucher du soleil",
+    "bureau moderne", "red car", "pancake recipe", "cute kitten", "sunset beach",
+    "modern office", "mountain hiking trail", "coffee shop interior", "birthday cake",
+    "football stadium", "jardin zen", "salon scandinave", "tatouage minimaliste",
+    "summer", "paris", "wedding",
+]
+
+
+def build_test_set(size: int):
+    from app.features.explorer.keywordsset import EnglishKeyWordsSet, EnglishStyleWordsSet, FrenchKeyWordsSet
+
+    fashion = [combo.to_query() for combo in FrenchKeyWordsSet().generate_combinations()]
+    fashion += [combo.to_query() for combo in EnglishKeyWordsSet().generate_combinations()]
+    fashion += [f"{style} outfit" for style in EnglishStyleWordsSet.style_words]
+    sample = random.Random(0).sample(fashion, max(0, min(size - len(OFF_TOPIC_QUERIES), len(fashion))))
+    return sample + OFF_TOPIC_QUERIES
+
+
+def run_backend(backend: str, size: int) -> dict:
+    """ Exécuté dans le sous‐processus : charge le backend et mesure """
+    import numpy as np
+    from app.core.config import settings
+    from app.features.explorer.constants import FASHION_CONCEPTS
+    from app.features.explorer.model_registry import _load_sentence_transformer
+
+    queries = build_test_set(size)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    model = _load_sentence_transformer(settings.EXPLORER_MODEL_NAME, backend, settings.EXPLORER_ONNX_FILE)
+    load_seconds = time.perf_counter() - start
+
+    def encode(texts):
+        return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    concepts = encode(FASHION_CONCEPTS)
+    encode(["warm-up"])
+
+    # Latence unitaire (requête isolée) et débit par batch de 32 (micro-batcher)
+    single = []
+    for query in queries[:100]:
+        start = time.perf_counter()
+        encode([query])
+        single.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    embeddings = np.concatenate([encode(queries[i:i + 32]) for i in range(0, len(queries), 32)])
+    batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    scores = (embeddings @ concepts.T).max(axis=1)
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        "p50_ms": statistics.median(single),
+        "p95_ms": statistics.quantiles(single, n=20)[-1],
+        "batched_ms_per_query": batch_ms,
+        "scores": [float(score) for score in scores],
+    }
+
+
+def measure(backend: str, size: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", backend, "--queries", str(size)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if output.returncode != 0:
+        return {"backend": backend, "error": output.stderr.strip().splitlines()[-1]}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare les backends d'embedding explorer")
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx", "onnx-int8"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--min-agreement", type=float, default=None)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.queries)))
+        return 0
+
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends if b != REFERENCE_BACKEND]
+    results = [measure(backend, args.queries) for backend in backends]
+    reference = results[0]
+    if "error" in reference:
+        print(f"Reference backend failed: {reference['error']}")
+        return 1
+
+    failed = False
+    print(f"{'backend':<11} {'agree':>7} {'max|Δ|':>7} {'p50 ms':>7} {'p95 ms':>7} {'batch ms/q':>10} {'load s':>7} {'RSS MB':>7}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<11} unavailable: {result['error']}")
+            continue
+        pairs = list(zip(reference["scores"], result["scores"]))
+        agreement = sum((ref >= THRESHOLD) == (score >= THRESHOLD) for ref, score in pairs) / len(pairs)
+        max_delta = max(abs(ref - score) for ref, score in pairs)
+        print(
+            f"{result['backend']:<11} {agreement:7.1%} {max_delta:7.3f} {result['p50_ms']:7.2f} "
+            f"{result['p95_ms']:7.2f} {result['batched_ms_per_query']:10.2f} "
+            f"{result['load_seconds']:7.1f} {result['rss_mb']:7.0f}"
+        )
+        if args.min_agreement is not None and agreement < args.min_agreement:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
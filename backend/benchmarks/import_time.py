@@ -0,0 +1,75 @@
+# benchmarks/import_time.py
+"""
+Temps d'import de l'API (démarrage d'un worker / d'un run de tests).
+
+Chaque mesure lance un interpréteur neuf, pour ne pas profiter des modules
+déjà importés :
+    python benchmarks/import_time.py --runs 5 --max-seconds 3
+
+Affiche le temps médian, le RSS max et les modules lourds chargés ; avec
+--max-seconds, sort en erreur si la médiane dépasse le seuil (CI).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "onnxruntime")
+
+PROBE = f"""
+import json, resource, sys, time
+start = time.perf_counter()
+import {{module}}
+elapsed = time.perf_counter() - start
+print(json.dumps({{{{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}}}))
+"""
+
+
+def measure(module: str) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "EXPLORER_PRELOAD_MODEL": "false",
+        "PINTEREST_CSRF_BACKGROUND_REFRESH": "false",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mesure le temps d'import de l'API")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    samples = [measure(args.module) for _ in range(args.runs)]
+    seconds = [s["seconds"] for s in samples]
+    median = statistics.median(seconds)
+    print(f"import {args.module}: median {median:.3f}s, min {min(seconds):.3f}s, max {max(seconds):.3f}s over {args.runs} runs")
+    print(f"max RSS: {max(s['max_rss_mb'] for s in samples):.0f} MB")
+    print(f"heavy modules loaded: {samples[-1]['heavy_modules'] or 'none'}")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"FAIL: median import time above {args.max_seconds}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
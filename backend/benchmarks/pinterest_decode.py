@@ -0,0 +1,97 @@
+# benchmarks/pinterest_decode.py
+"""
+Microbenchmark du décodage des réponses de recherche Pinterest.
+
+Compare, sur les fixtures de benchmarks/fixtures/pinterest_*.json :
+  - legacy : json.loads + l'ancien _filter_results (arbre complet en dicts Python)
+  - orjson : AsyncPinterestScraper._parse_page (orjson + projection des champs utilisés)
+
+    python benchmarks/pinterest_decode.py --iterations 2000
+
+Temps CPU par page (time.process_time) et pic mémoire Python (tracemalloc).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.features.explorer.pinterest_scraper import AsyncPinterestScraper  # noqa: E402
+
+FIXTURES = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "pinterest_*.json")
+
+
+def legacy_parse(body: bytes, query: str, csrf_token: str) -> dict:
+    """ Chemin d'origine, conservé ici comme référence (rich_metadata null toléré pour les fixtures) """
+    data = json.loads(body)
+    results = data.get("resource_response", {}).get("data", {}).get("results", [])
+    products = []
+    for result in results:
+        product_data = {
+            "pin_id": str(result.get("id")) if result.get("id") is not None else None,
+            "product_url": result.get("link"),
+            "description": (
+                result.get("description", "")
+                or result.get("seo_alt_text", "")
+                or (result.get("rich_metadata") or {}).get("description", "")
+            ).strip(),
+            "image_url": result.get("images", {}).get("orig", {}).get("url", ""),
+            "pinterest_url": f"https://www.pinterest.com/pin/{result.get('id')}/",
+        }
+        if query:
+            product_data["query"] = query
+        products.append(product_data)
+    return {
+        "products": products,
+        "bookmark": data.get("resource_response", {}).get("bookmark"),
+        "csrf_token": csrf_token,
+    }
+
+
+def cpu_ms_per_call(parse, body: bytes, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        parse(body, "robe", "tok")
+    return (time.process_time() - start) * 1000 / iterations
+
+
+def peak_kb(parse, body: bytes) -> float:
+    tracemalloc.start()
+    parse(body, "robe", "tok")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare les chemins de décodage Pinterest")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    scraper = AsyncPinterestScraper(session=object())
+    paths = {"legacy": legacy_parse, "orjson": scraper._parse_page}
+
+    for fixture in sorted(glob.glob(FIXTURES)):
+        with open(fixture, "rb") as f:
+            body = f.read()
+        # Les deux chemins doivent produire exactement la même page
+        assert legacy_parse(body, "robe", "tok") == scraper._parse_page(body, "robe", "tok")
+
+        print(f"{os.path.basename(fixture)} ({len(body) / 1024:.0f} KB)")
+        baseline = None
+        for name, parse in paths.items():
+            cpu = cpu_ms_per_call(parse, body, args.iterations)
+            peak = peak_kb(parse, body)
+            baseline = baseline or cpu
+            print(f"  {name:<8} {cpu:7.3f} ms CPU/page  x{baseline / cpu:4.1f}  peak {peak:7.0f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
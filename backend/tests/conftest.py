@@ -1,9 +1,15 @@
 # tests/conftest.py
 
+import os
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, MagicMock
 
+# Pas de chargement du modèle d'embedding ni d'appel à Pinterest pendant les tests
+os.environ.setdefault("EXPLORER_PRELOAD_MODEL", "false")
+os.environ.setdefault("PINTEREST_CSRF_BACKGROUND_REFRESH", "false")
+os.environ.setdefault("TRYON_EVENTS_RELAY", "false")
+
 # On importe notre app et les dépendances à override
 from app.main import app
 from app.infrastructure.database.dependencies import get_db
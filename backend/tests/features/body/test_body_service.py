@@ -31,6 +31,7 @@ def fake_storage():
     storage = MagicMock()
     storage.upload_image = AsyncMock()
     storage.get_presigned_url = AsyncMock(return_value="https://signed.url/fake.png")
+    storage.presign_many = AsyncMock(side_effect=lambda keys, expires_in=3600: {k: f"https://signed.url/{k}" for k in keys if k})
     storage.delete_image = AsyncMock()
     return storage
 
@@ -60,7 +61,7 @@ async def test_get_all_bodies(body_service, fake_repo, fake_storage, fake_user):
     result = await body_service.get_all_bodies(fake_user)
     assert isinstance(result, BodyListResponse)
     assert len(result.bodies) == 2
-    fake_storage.get_presigned_url.assert_called()
+    fake_storage.presign_many.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -87,7 +88,7 @@ async def test_get_masks_success(body_service, fake_repo, fake_storage, fake_use
     )
     result = await body_service.get_masks("bodyid", fake_user)
     assert isinstance(result, BodyMasksResponse)
-    fake_storage.get_presigned_url.assert_called()
+    fake_storage.presign_many.assert_called_once()
 
 
 @pytest.mark.asyncio
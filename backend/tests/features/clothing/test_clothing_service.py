@@ -34,6 +34,7 @@ def fake_storage():
     storage = MagicMock()
     storage.upload_image = AsyncMock(return_value="path/to/uploaded.png")
     storage.get_presigned_url = AsyncMock(return_value="https://signed.url/fake.png")
+    storage.presign_many = AsyncMock(side_effect=lambda keys, expires_in=3600: {k: f"https://signed.url/{k}" for k in keys if k})
     storage.delete_image_from_url = AsyncMock()
     return storage
 
@@ -77,7 +78,7 @@ async def test_get_clothes(clothing_service, fake_repo, fake_storage, fake_user)
     result = await clothing_service.get_clothes(fake_user)
     assert isinstance(result, ClothingListResponse)
     assert len(result.clothes) == 1
-    fake_storage.get_presigned_url.assert_called()
+    fake_storage.presign_many.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.features.explorer.catalog_job import CatalogJob, build_queries
+
+
+@pytest.fixture
+def fake_repo():
+    repo = MagicMock()
+    repo.get_job_checkpoint = AsyncMock(return_value=0)
+    repo.set_job_checkpoint = AsyncMock()
+    repo.upsert_catalog_products = AsyncMock()
+    repo.set_catalog_query = AsyncMock()
+    repo.get_job_failures = AsyncMock(return_value=[])
+    repo.add_job_failure = AsyncMock()
+    repo.remove_job_failure = AsyncMock()
+    return repo
+
+
+@pytest.fixture
+def fake_scraper():
+    scraper = MagicMock()
+
+    async def get_page(query, bookmark=None, csrf_token=None, is_buyable=True):
+        if query == "boom":
+            raise RuntimeError("upstream down")
+        return {"products": [{"pin_id": f"{query}-{bookmark}"}], "bookmark": "next", "csrf_token": "tok"}
+
+    scraper.get_page = AsyncMock(side_effect=get_page)
+    return scraper
+
+
+def test_build_queries_is_deterministic():
+    queries = build_queries(["fr"], sample=50, seed=1)
+    assert len(queries) == 50
+    assert queries == build_queries(["fr"], sample=50, seed=1)
+    assert ("t-shirt blanc clair oversize", "femme") in build_queries(["fr"])
+    assert ("casual outfit", "women") in build_queries(["styles"])
+
+
+@pytest.mark.asyncio
+async def test_job_resumes_from_checkpoint(fake_repo, fake_scraper):
+    fake_repo.get_job_checkpoint.return_value = 2
+    job = CatalogJob(fake_repo, fake_scraper, job_name="test", concurrency=2, rate=0, nb_pages=2)
+
+    stats = await job.run([("a", None), ("b", None), ("c", None), ("boom", None), ("d", None)])
+
+    assert stats == {"queries": 3, "products": 4, "errors": 1}
+    scraped = {call.kwargs["query"] for call in fake_scraper.get_page.call_args_list}
+    assert scraped == {"c", "boom", "d"}
+    fake_repo.set_job_checkpoint.assert_awaited_with("test", 5, 5)
+    fake_repo.set_catalog_query.assert_any_await("c", "next", 2)
+    fake_repo.add_job_failure.assert_awaited_once_with("test", 3)
+
+
+@pytest.mark.asyncio
+async def test_job_keys_catalog_by_transformed_query_and_retries_failures(fake_repo, fake_scraper):
+    # Run précédent : checkpoint à la fin, la recherche 1 en échec
+    fake_repo.get_job_checkpoint.return_value = 3
+    fake_repo.get_job_failures.return_value = [1]
+
+    async def transform(query, gender=None):
+        return f"outfit {query} {gender}"
+
+    job = CatalogJob(fake_repo, fake_scraper, job_name="test", transform=transform, rate=0)
+    stats = await job.run([("robe", "femme"), ("pull", "homme"), ("jupe", "femme")])
+
+    assert stats == {"queries": 1, "products": 1, "errors": 0}
+    fake_scraper.get_page.assert_awaited_once()
+    fake_repo.upsert_catalog_products.assert_awaited_once_with("outfit pull homme", [{"pin_id": "outfit pull homme-None"}])
+    fake_repo.set_catalog_query.assert_awaited_once_with("outfit pull homme", "next", 1)
+    fake_repo.remove_job_failure.assert_awaited_once_with("test", 1)
+    fake_repo.set_job_checkpoint.assert_awaited_with("test", 3, 3)
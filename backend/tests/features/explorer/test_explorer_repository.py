@@ -0,0 +1,52 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from app.features.explorer.explorer_repo import ExplorerRepository
+
+
+@pytest.fixture
+def fake_collection():
+    col = MagicMock()
+    col.find_one = AsyncMock()
+    col.update_one = AsyncMock()
+    col.create_index = AsyncMock()
+    return col
+
+
+@pytest.fixture
+def explorer_repo(fake_collection):
+    db = MagicMock()
+    db.__getitem__.return_value = fake_collection
+    return ExplorerRepository(db=db)
+
+
+@pytest.mark.asyncio
+async def test_get_cached_query(explorer_repo, fake_collection):
+    fake_collection.find_one.return_value = {"score": 0.8, "transformed_query": "robe noire"}
+    entry = await explorer_repo.get_cached_query("|robe noire")
+    assert entry["transformed_query"] == "robe noire"
+    assert fake_collection.find_one.call_args.args[0] == {"_id": "|robe noire"}
+
+
+@pytest.mark.asyncio
+async def test_set_cached_query_upserts(explorer_repo, fake_collection):
+    await explorer_repo.set_cached_query("|robe noire", 0.8, "robe noire")
+    _, kwargs = fake_collection.update_one.call_args
+    assert kwargs["upsert"] is True
+
+
+@pytest.mark.asyncio
+async def test_get_cached_page_returns_age(explorer_repo, fake_collection):
+    fake_collection.find_one.return_value = {
+        "page": {"products": []}, "updated_at": datetime.now() - timedelta(seconds=30)
+    }
+    page, age = await explorer_repo.get_cached_page("buyable_pins||robe")
+    assert page == {"products": []}
+    assert 29 <= age < 60
+
+
+@pytest.mark.asyncio
+async def test_get_cached_page_missing(explorer_repo, fake_collection):
+    fake_collection.find_one.return_value = None
+    assert await explorer_repo.get_cached_page("buyable_pins||robe") is None
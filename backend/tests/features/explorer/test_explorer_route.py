@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.errors import ValidationError
+from app.features.explorer.explorer_route import get_explorer_service
+from app.infrastructure.database.dependencies import get_current_user
+from app.main import app
+
+
+class FailingStreamService:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.user_ids = []
+
+    async def stream_clothes(self, payload, user_id):
+        self.user_ids.append(user_id)
+        yield "product", {"pin_id": "1"}
+        raise self.error
+
+
+@pytest.fixture
+def signed_in(fake_user):
+    app.dependency_overrides[get_current_user] = lambda: fake_user
+    return fake_user
+
+
+def stream_lines(error: Exception):
+    service = FailingStreamService(error)
+    app.dependency_overrides[get_explorer_service] = lambda: service
+    client = TestClient(app, raise_server_exceptions=False)
+    response = client.post("/api/v1/explorer/search-clothes/stream", json={"query": "robe"})
+    assert response.status_code == 200
+    return service, [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_error_line_hides_internal_details(signed_in):
+    service, lines = stream_lines(RuntimeError("connect to mongodb://admin:secret@db failed"))
+
+    assert lines[0] == {"type": "product", "data": {"pin_id": "1"}}
+    assert lines[-1] == {
+        "type": "error", "error_code": "internal_error", "message": "Unexpected internal server error",
+    }
+    assert "secret" not in json.dumps(lines)
+    assert service.user_ids == [signed_in.id]
+
+    # Erreur applicative : même contenu que le gestionnaire global
+    _, lines = stream_lines(ValidationError("Invalid bookmark"))
+    assert lines[-1] == {"type": "error", "error_code": "validationerror", "message": "Invalid bookmark"}
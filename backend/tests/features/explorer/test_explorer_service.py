@@ -0,0 +1,412 @@
+import asyncio
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.lru_cache import LRUCache
+from app.core.metrics import metrics
+from app.features.explorer.embedding_batcher import EmbeddingBatcher
+from app.features.explorer.explorer_service import ExplorerService
+from app.features.explorer.model_registry import ModelRegistry
+from app.features.explorer.query_cache import query_cache, QueryCache
+from app.features.explorer.search_cache import SearchResultCache
+from app.features.explorer.page_prefetcher import PagePrefetcher
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """
+    Modèle factice : "robe" est alignée sur le concept, tout le reste est orthogonal.
+    """
+    model = MagicMock()
+
+    def encode(texts, **kwargs):
+        return np.array([[1.0, 0.0] if "robe" in t else [0.0, 1.0] for t in texts], dtype=np.float32)
+
+    model.encode.side_effect = encode
+    monkeypatch.setattr(ModelRegistry, "_model", model)
+    monkeypatch.setattr(ModelRegistry, "_concept_embeddings", np.array([[1.0, 0.0]], dtype=np.float32))
+    monkeypatch.setattr(ModelRegistry, "_ready", True)
+    metrics.reset()
+    return model
+
+
+@pytest.mark.asyncio
+async def test_batcher_groups_concurrent_queries(fake_model):
+    batcher = EmbeddingBatcher(window_ms=20, max_batch_size=8)
+    scores = await asyncio.gather(*(batcher.score(q) for q in ["robe noire", "voiture", "robe", "chien"]))
+    await batcher.close()
+
+    assert scores == [1.0, 0.0, 1.0, 0.0]
+    fake_model.encode.assert_called_once()
+    histogram = metrics.snapshot()["histograms"]["explorer.embedding_batch_size"]
+    assert histogram["count"] == 1
+    assert histogram["sum"] == 4
+
+
+@pytest.mark.asyncio
+async def test_batcher_respects_max_batch_size(fake_model):
+    batcher = EmbeddingBatcher(window_ms=20, max_batch_size=2)
+    await asyncio.gather(*(batcher.score(q) for q in ["a", "b", "c", "d", "e"]))
+    await batcher.close()
+
+    assert fake_model.encode.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors(fake_model):
+    fake_model.encode.side_effect = RuntimeError("boom")
+    batcher = EmbeddingBatcher(window_ms=1, max_batch_size=8)
+    with pytest.raises(RuntimeError):
+        await batcher.score("robe")
+    await batcher.close()
+
+
+@pytest.fixture
+def explorer_service(fake_model):
+    query_cache.clear()
+    service = ExplorerService()
+    service.best_fashion_score = AsyncMock(side_effect=lambda q: 1.0 if "robe" in q else 0.0)
+    yield service
+    query_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_transform_prefixes_non_fashion_query(explorer_service):
+    assert await explorer_service.transform_as_clothe_query("Voiture  Rouge", "femme") == "outfit voiture rouge femme"
+    assert await explorer_service.transform_as_clothe_query("robe noire") == "robe noire"
+
+
+@pytest.mark.asyncio
+async def test_transform_is_memoized_on_normalized_query(explorer_service):
+    first = await explorer_service.transform_as_clothe_query("Robe Noire", "femme")
+    second = await explorer_service.transform_as_clothe_query("  robe   noire ", "femme")
+    other_gender = await explorer_service.transform_as_clothe_query("robe noire", "homme")
+
+    assert first == second == "robe noire femme"
+    assert other_gender == "robe noire homme"
+    assert explorer_service.best_fashion_score.await_count == 2
+    assert metrics.get("cache.explorer_query.hits") == 1
+
+
+@pytest.mark.asyncio
+async def test_query_cache_falls_back_to_persistent_tier():
+    cache = QueryCache(maxsize=10)
+    repo = MagicMock()
+    repo.get_cached_query = AsyncMock(return_value={"score": 0.9, "transformed_query": "robe"})
+
+    entry = await cache.get("Robe", None, repo=repo)
+    assert entry["transformed_query"] == "robe"
+    # Le second appel est servi par le tier mémoire
+    await cache.get("robe", None, repo=repo)
+    repo.get_cached_query.assert_awaited_once()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache("test", maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+@pytest.mark.asyncio
+async def test_search_cache_serves_fresh_page_without_upstream_call():
+    cache = SearchResultCache(maxsize=10, ttl=60, stale_ttl=60)
+    fetch = AsyncMock(return_value={"products": [], "bookmark": "b1"})
+
+    first = await cache.get_or_fetch("k", fetch)
+    second = await cache.get_or_fetch("k", fetch)
+
+    assert first == second == {"products": [], "bookmark": "b1"}
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_search_cache_deduplicates_concurrent_misses():
+    cache = SearchResultCache(maxsize=10, ttl=60, stale_ttl=60)
+    fetch = AsyncMock(return_value={"products": []})
+
+    await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(5)))
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_search_cache_serves_stale_and_revalidates():
+    cache = SearchResultCache(maxsize=10, ttl=60, stale_ttl=600)
+    cache._memory.set("k", {"bookmark": "old"}, age=120)
+    fetch = AsyncMock(return_value={"bookmark": "new"})
+
+    assert await cache.get_or_fetch("k", fetch) == {"bookmark": "old"}
+    await asyncio.sleep(0)
+    fetch.assert_awaited_once()
+    assert await cache.get_or_fetch("k", fetch) == {"bookmark": "new"}
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_serves_prefetched_page():
+    metrics.reset()
+    prefetcher = PagePrefetcher(enabled=True, max_concurrency=2, maxsize=10, ttl=60)
+    fetch = AsyncMock(return_value={"bookmark": "b2"})
+
+    prefetcher.schedule("k", fetch)
+    page = await prefetcher.take("k")
+
+    assert page == {"bookmark": "b2"}
+    assert await prefetcher.take("k") is None
+    assert metrics.get("explorer.prefetch.hits") == 1
+    assert metrics.get("explorer.prefetch.misses") == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_drops_expired_page(monkeypatch):
+    metrics.reset()
+    clock = [1000.0]
+    monkeypatch.setattr("app.core.lru_cache.time.monotonic", lambda: clock[0])
+    prefetcher = PagePrefetcher(enabled=True, max_concurrency=2, maxsize=10, ttl=60)
+    fetch = AsyncMock(return_value={"bookmark": "b2"})
+
+    prefetcher.schedule("k", fetch)
+    while prefetcher._inflight:
+        await asyncio.sleep(0)
+    clock[0] += 61
+
+    assert "k" not in prefetcher._pages
+    assert await prefetcher.take("k") is None
+    assert metrics.get("explorer.prefetch.misses") == 1
+    assert metrics.get("cache.explorer_prefetch.expired") == 1
+
+    prefetcher.schedule("k", fetch)
+    assert await prefetcher.take("k") == {"bookmark": "b2"}
+    assert fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_respects_budget_and_kill_switch():
+    metrics.reset()
+    prefetcher = PagePrefetcher(enabled=True, max_concurrency=1, maxsize=10, ttl=60)
+    blocker = asyncio.Event()
+
+    async def slow_fetch():
+        await blocker.wait()
+        return {}
+
+    prefetcher.schedule("a", slow_fetch)
+    prefetcher.schedule("b", slow_fetch)
+    assert metrics.get("explorer.prefetch.skipped_budget") == 1
+    blocker.set()
+    await prefetcher.close()
+
+    disabled = PagePrefetcher(enabled=False, max_concurrency=1, maxsize=10, ttl=60)
+    fetch = AsyncMock()
+    disabled.schedule("a", fetch)
+    assert await disabled.take("a") is None
+    fetch.assert_not_called()
+
+
+@pytest.fixture
+def local_index(tmp_path, fake_model, monkeypatch):
+    from app.features.explorer import explorer_service
+    from app.features.explorer.product_index import ProductIndex
+
+    index = ProductIndex(str(tmp_path), dtype="int8")
+    index.save(
+        [{"pin_id": "1", "description": "robe"}, {"pin_id": "2", "description": "chien"}],
+        np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32),
+    )
+    monkeypatch.setattr(explorer_service, "product_index", index)
+    return index
+
+
+def test_product_index_top_k(local_index):
+    assert local_index.load()
+    results = local_index.search(np.array([0.6, 0.8]), k=2)
+    assert [p["pin_id"] for p, _ in results] == ["2", "1"]
+    assert results[0][1] == pytest.approx(0.8, abs=0.02)
+    assert len(local_index.search(np.array([1.0, 0.0]), k=10)) == 2
+
+
+def test_int8_index_scores_by_blocks_like_float32(tmp_path, monkeypatch):
+    from app.features.explorer import product_index as product_index_module
+    from app.features.explorer.product_index import ProductIndex
+
+    monkeypatch.setattr(product_index_module, "SEARCH_BLOCK_ROWS", 3)
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(10, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    products = [{"pin_id": str(i)} for i in range(10)]
+    exact, quantized = ProductIndex(str(tmp_path / "f32")), ProductIndex(str(tmp_path / "i8"), dtype="int8")
+    for index in (exact, quantized):
+        index.save(products, embeddings)
+        assert index.load()
+
+    query = embeddings[7]
+    assert [p for p, _ in quantized.search(query, k=3)] == [p for p, _ in exact.search(query, k=3)]
+    assert quantized.search(query, k=1)[0][1] == pytest.approx(1.0, abs=0.02)
+
+
+@pytest.mark.asyncio
+async def test_product_index_reload_is_throttled_and_encode_is_batched(local_index, fake_model, monkeypatch):
+    from app.features.explorer import product_index as product_index_module
+
+    batcher = EmbeddingBatcher(window_ms=20, max_batch_size=8)
+    monkeypatch.setattr(product_index_module, "fashion_batcher", batcher)
+    loads = []
+    original_load = local_index.load
+    monkeypatch.setattr(local_index, "load", lambda: loads.append(1) or original_load())
+
+    results = await asyncio.gather(
+        local_index.search_text("robe", k=1), local_index.search_text("chien", k=1), batcher.score("robe"),
+    )
+    await local_index.search_text("robe", k=1)
+    await batcher.close()
+
+    assert [p["pin_id"] for p, _ in results[0]] == ["1"]
+    assert [p["pin_id"] for p, _ in results[1]] == ["2"]
+    assert results[2] == 1.0
+    # Une seule vérification du disque par intervalle, un seul forward pass pour les trois queries
+    assert len(loads) == 1
+    assert sorted(fake_model.encode.call_args_list[0].args[0]) == ["chien", "robe", "robe"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_merges_local_then_remote(explorer_service, local_index):
+    from app.features.explorer.explorer_schema import SearchClothingPayload
+
+    explorer_service.pinterest_scraper.get_page = AsyncMock(return_value={
+        "products": [{"pin_id": "1"}, {"pin_id": "3"}], "bookmark": None, "csrf_token": "t",
+    })
+    page = await explorer_service.search_clothes(SearchClothingPayload(query="robe hybride", mode="hybrid"), "user-1")
+    assert [p["pin_id"] for p in page["products"]] == ["1", "2", "3"]
+
+    explorer_service.pinterest_scraper.get_page = AsyncMock(side_effect=RuntimeError("rate limited"))
+    page = await explorer_service.search_clothes(SearchClothingPayload(query="robe locale", mode="local"), "user-1")
+    assert [p["pin_id"] for p in page["products"]] == ["1", "2"]
+    page = await explorer_service.search_clothes(SearchClothingPayload(query="robe 429", mode="hybrid"), "user-1")
+    assert [p["pin_id"] for p in page["products"]] == ["1", "2"]
+    explorer_service.pinterest_scraper.get_page.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_clothes_emits_products_then_page_and_fills_cache(explorer_service, monkeypatch):
+    from app.features.explorer import explorer_service as service_module
+    from app.features.explorer.explorer_schema import SearchClothingPayload
+
+    monkeypatch.setattr(service_module, "search_cache", SearchResultCache(maxsize=10, ttl=60, stale_ttl=60))
+    metrics.reset()
+
+    async def stream_page(**kwargs):
+        yield "product", {"pin_id": "1"}
+        yield "product", {"pin_id": "2"}
+        yield "page", {"bookmark": None, "csrf_token": "t"}
+
+    explorer_service.pinterest_scraper.stream_page = MagicMock(side_effect=stream_page)
+    payload = SearchClothingPayload(query="robe streamée")
+    events = [event async for event in explorer_service.stream_clothes(payload, "user-1")]
+
+    assert [kind for kind, _ in events] == ["product", "product", "page"]
+    session_id = events[-1][1].pop("session_id")
+    assert events[-1][1] == {"bookmark": None, "csrf_token": "t", "query": "robe streamée"}
+    histograms = metrics.snapshot()["histograms"]
+    assert histograms["explorer.stream.time_to_first_product_ms"]["count"] == 1
+    assert histograms["explorer.stream.total_ms"]["count"] == 1
+
+    # Deuxième appel (nouvelle session) servi depuis le cache, sans Pinterest
+    again = [event async for event in explorer_service.stream_clothes(payload, "user-1")]
+    assert again[-1][1].pop("session_id") != session_id
+    assert again == events
+    explorer_service.pinterest_scraper.stream_page.assert_called_once()
+
+    # Même session : tout a déjà été servi
+    payload.session_id = session_id
+    replay = [event async for event in explorer_service.stream_clothes(payload, "user-1")]
+    assert [kind for kind, _ in replay] == ["page"]
+
+
+def test_feed_dedup_across_pages_and_bookmark_chain():
+    from app.core.bloom_filter import BloomFilter
+    from app.features.explorer.feed_dedup import FeedDeduplicator
+
+    metrics.reset()
+    dedup = FeedDeduplicator(enabled=True, max_sessions=10, ttl=60, capacity=4, error_rate=0.001)
+    session_id = dedup.resolve_session("user-1")
+    page_1 = [{"pin_id": "1", "image_url": "a.jpg"}, {"pin_id": "2", "image_url": "b.jpg"}]
+    assert dedup.filter(session_id, page_1) == page_1
+    dedup.link_bookmark("user-1", "bm-2", session_id)
+
+    # Page suivante sans session_id : retrouvée par le bookmark
+    assert dedup.resolve_session("user-1", bookmark="bm-2") == session_id
+    # Même bookmark (cache de recherche partagé) reçu par un autre utilisateur : autre session
+    assert dedup.resolve_session("user-2", bookmark="bm-2") != session_id
+    page_2 = [{"pin_id": "1", "image_url": "a.jpg"}, {"pin_id": "3", "image_url": "b.jpg"}, {"pin_id": "4"}]
+    assert dedup.filter(session_id, page_2) == [{"pin_id": "4"}]
+    assert dedup.filter(dedup.resolve_session("user-2", bookmark="bm-2"), page_2) == page_2
+
+    assert metrics.get("explorer.dedup.products") == 8
+    assert metrics.get("explorer.dedup.dropped") == 2
+
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"pin:{i}")
+    assert all(f"pin:{i}" in bloom for i in range(1000))
+    assert sum(f"other:{i}" in bloom for i in range(1000)) < 50
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_table_scores_known_tokens_without_model(fake_model, tmp_path):
+    from app.core.config import settings
+    from app.features.explorer.vocabulary_table import VocabularyTable, build_vocabulary
+
+    assert {"robe", "noir", "femme", "oversize", "outfit"} <= set(build_vocabulary())
+
+    path = str(tmp_path / "vocab.npz")
+    await VocabularyTable.build(path, settings.EXPLORER_MODEL_NAME)
+    fake_model.encode.reset_mock()
+
+    table = VocabularyTable(path)
+    assert table.score("robe") == pytest.approx(1.0)
+    assert table.score("robe femme") == pytest.approx(np.sqrt(0.5))
+    assert table.score("robe téléportée") is None
+    fake_model.encode.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_table_is_picked_up_once_built(fake_model, tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.features.explorer.vocabulary_table import VocabularyTable, check_agreement
+
+    clock = [1000.0]
+    monkeypatch.setattr("app.features.explorer.vocabulary_table.time.monotonic", lambda: clock[0])
+    path = str(tmp_path / "vocab.npz")
+    table = VocabularyTable(path, reload_interval=30)
+    assert table.score("robe") is None
+
+    await VocabularyTable.build(path, settings.EXPLORER_MODEL_NAME)
+    assert table.score("robe") is None
+    clock[0] += 31
+    assert table.score("robe") == pytest.approx(1.0)
+
+    # Les queries que la table ne sait pas scorer comptent comme des désaccords
+    monkeypatch.setattr(table, "score", lambda query: None)
+    assert await check_agreement(table, sample=10) == 0
+
+
+def test_embedding_backend_selection(monkeypatch):
+    import sys
+    import types
+    from app.features.explorer.model_registry import _load_sentence_transformer
+
+    fake_module = types.SimpleNamespace(SentenceTransformer=MagicMock())
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake_module)
+
+    _load_sentence_transformer("mini", "onnx")
+    fake_module.SentenceTransformer.assert_called_with("mini", backend="onnx")
+    _load_sentence_transformer("mini", "onnx-int8", "onnx/model_qint8_avx2.onnx")
+    fake_module.SentenceTransformer.assert_called_with(
+        "mini", backend="onnx", model_kwargs={"file_name": "onnx/model_qint8_avx2.onnx"}
+    )
+    with pytest.raises(ValueError):
+        _load_sentence_transformer("mini", "tensorrt")
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def test_app_import_does_not_load_torch():
+    """ L'API (et donc le router explorer) doit s'importer sans torch ni sentence_transformers """
+    probe = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('torch', 'sentence_transformers') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR, "EXPLORER_PRELOAD_MODEL": "false"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.features.explorer.csrf_token_cache import CsrfTokenCache
+from app.features.explorer.pinterest_scraper import AsyncPinterestScraper, build_pinterest_session
+
+
+def pinterest_payload(pin_ids, bookmark="next-bm"):
+    return {
+        "resource_response": {
+            "bookmark": bookmark,
+            "data": {
+                "results": [
+                    {
+                        "id": pin_id,
+                        "link": f"https://shop.example/{pin_id}",
+                        "description": f"  Robe {pin_id} ",
+                        "images": {"orig": {"url": f"https://i.pinimg.com/{pin_id}.jpg"}},
+                        "unused": {"big": list(range(10))},
+                    }
+                    for pin_id in pin_ids
+                ]
+            },
+        }
+    }
+
+
+@pytest_asyncio.fixture
+async def fake_pinterest():
+    """ Faux Pinterest local : cookie csrftoken sur /, recherche sur BaseSearchResource """
+    calls = {"home": 0, "search": [], "rejected_tokens": set()}
+
+    async def home(request):
+        calls["home"] += 1
+        response = web.Response(text="ok")
+        response.set_cookie("csrftoken", f"tok-{calls['home']}")
+        return response
+
+    async def search(request):
+        token = request.headers.get("X-CSRFToken")
+        calls["search"].append((request.method, token))
+        if token in calls["rejected_tokens"]:
+            return web.Response(status=403)
+        return web.json_response(pinterest_payload(["1", "2"]))
+
+    app = web.Application()
+    app.router.add_get("/", home)
+    app.router.add_route("*", "/resource/BaseSearchResource/get", search)
+    server = TestServer(app)
+    await server.start_server()
+    yield str(server.make_url("")).rstrip("/"), calls
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_get_page_fetches_token_and_filters_results(fake_pinterest):
+    base_url, calls = fake_pinterest
+    async with build_pinterest_session() as session:
+        scraper = AsyncPinterestScraper(session, base_url=base_url, token_cache=CsrfTokenCache(3600, 300))
+        page = await scraper.get_page("robe noire", is_buyable=True)
+
+    assert calls["home"] == 1
+    assert calls["search"] == [("GET", "tok-1")]
+    assert page["bookmark"] == "next-bm"
+    assert page["csrf_token"] == "tok-1"
+    assert page["products"][0] == {
+        "pin_id": "1",
+        "product_url": "https://shop.example/1",
+        "description": "Robe 1",
+        "image_url": "https://i.pinimg.com/1.jpg",
+        "pinterest_url": "https://www.pinterest.com/pin/1/",
+        "query": "robe noire",
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_page_with_bookmark_posts_and_reuses_token(fake_pinterest):
+    base_url, calls = fake_pinterest
+    async with build_pinterest_session() as session:
+        scraper = AsyncPinterestScraper(session, base_url=base_url, token_cache=CsrfTokenCache(3600, 300))
+        await scraper.get_page("robe", bookmark="bm", csrf_token="client-tok")
+
+    assert calls["home"] == 0
+    assert calls["search"] == [("POST", "client-tok")]
+
+
+@pytest.mark.asyncio
+async def test_token_is_cached_and_fetched_once_for_concurrent_calls(fake_pinterest):
+    base_url, calls = fake_pinterest
+    async with build_pinterest_session() as session:
+        scraper = AsyncPinterestScraper(session, base_url=base_url, token_cache=CsrfTokenCache(3600, 300))
+        await asyncio.gather(*(scraper.get_page(f"robe {i}") for i in range(5)))
+        await scraper.get_page("jupe")
+
+    assert calls["home"] == 1
+    assert {token for _, token in calls["search"]} == {"tok-1"}
+
+
+@pytest.mark.asyncio
+async def test_forbidden_triggers_one_refresh_and_retry(fake_pinterest):
+    base_url, calls = fake_pinterest
+    calls["rejected_tokens"].add("expired")
+    async with build_pinterest_session() as session:
+        scraper = AsyncPinterestScraper(session, base_url=base_url, token_cache=CsrfTokenCache(3600, 300))
+        page = await scraper.get_page("robe", csrf_token="expired")
+
+    assert calls["home"] == 1
+    assert calls["search"] == [("GET", "expired"), ("GET", "tok-1")]
+    assert page["csrf_token"] == "tok-1"
+
+
+def test_build_request_does_not_leak_options_between_queries():
+    scraper = AsyncPinterestScraper()
+    scraper._build_request("robe", "bm", "tok", is_buyable=True)
+    _, kwargs = scraper._build_request("jupe", None, "tok", is_buyable=False)
+
+    options = json.loads(kwargs["params"]["data"])["options"]
+    assert options["query"] == "jupe"
+    assert "bookmarks" not in options
+    assert "scope" not in options
+
+
+@pytest.mark.asyncio
+async def test_stream_page_matches_get_page(fake_pinterest):
+    base_url, calls = fake_pinterest
+    calls["rejected_tokens"].add("stale")
+    async with build_pinterest_session() as session:
+        scraper = AsyncPinterestScraper(session, base_url=base_url, token_cache=CsrfTokenCache(3600, 300))
+        page = await scraper.get_page("robe", csrf_token="tok-0")
+        events = [event async for event in scraper.stream_page("robe", csrf_token="stale")]
+
+    assert events[:-1] == [("product", product) for product in page["products"]]
+    assert events[-1] == ("page", {"bookmark": "next-bm", "csrf_token": "tok-1"})
+
+
+def test_parse_page_projects_fields_and_tolerates_nulls():
+    scraper = AsyncPinterestScraper(session=object())
+    body = json.dumps({
+        "resource_response": {
+            "bookmark": None,
+            "data": {"results": [{"id": 7, "description": None, "rich_metadata": None, "images": None}]},
+        }
+    }).encode()
+
+    page = scraper._parse_page(body, "robe", "tok")
+
+    assert page["bookmark"] is None
+    assert page["products"] == [{
+        "pin_id": "7",
+        "product_url": None,
+        "description": "",
+        "image_url": "",
+        "pinterest_url": "https://www.pinterest.com/pin/7/",
+        "query": "robe",
+    }]
+    with pytest.raises(ValueError):
+        scraper._parse_page(b"<html>", "robe", "tok")
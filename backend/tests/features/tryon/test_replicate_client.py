@@ -0,0 +1,261 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.infrastructure.replicate.replicate_client import (
+    PredictionWaiters,
+    ReplicateError,
+    ReplicatePredictions,
+    verify_webhook_signature,
+)
+
+
+@pytest_asyncio.fixture
+async def fake_replicate():
+    """
+    Faux Replicate local : chaque prédiction passe par `processing` pendant
+    `polls_before_done` GET puis se termine avec le statut `final_status`.
+    """
+    state = {
+        "predictions": {},
+        "creates": [],
+        "gets": 0,
+        "cancels": [],
+        "polls_before_done": 2,
+        "final_status": "succeeded",
+        "throttle": 0,
+        "on_create": None,
+    }
+
+    async def create(request):
+        state["creates"].append((request.path, request.headers.get("Authorization"), await request.json()))
+        if state["throttle"]:
+            state["throttle"] -= 1
+            return web.json_response({"detail": "throttled"}, status=429, headers={"Retry-After": "0"})
+        prediction_id = f"p{len(state['predictions'])}"
+        state["predictions"][prediction_id] = 0
+        prediction = {"id": prediction_id, "status": "starting"}
+        if state["on_create"]:
+            state["on_create"](prediction_id)
+        return web.json_response(prediction, status=201)
+
+    async def get(request):
+        state["gets"] += 1
+        prediction_id = request.match_info["id"]
+        state["predictions"][prediction_id] += 1
+        if state["predictions"][prediction_id] <= state["polls_before_done"]:
+            return web.json_response({"id": prediction_id, "status": "processing"})
+        return web.json_response(done(prediction_id))
+
+    def done(prediction_id):
+        status = state["final_status"]
+        return {
+            "id": prediction_id,
+            "status": status,
+            "output": [f"{base}/files/{prediction_id}.png"] if status == "succeeded" else None,
+            "error": "CUDA out of memory" if status == "failed" else None,
+        }
+
+    async def cancel(request):
+        state["cancels"].append(request.match_info["id"])
+        return web.json_response({"id": request.match_info["id"], "status": "canceled"})
+
+    async def file(request):
+        return web.Response(body=b"png:" + request.match_info["name"].encode())
+
+    app = web.Application()
+    app.router.add_post("/v1/predictions", create)
+    app.router.add_post("/v1/models/{owner}/{name}/predictions", create)
+    app.router.add_get("/v1/predictions/{id}", get)
+    app.router.add_post("/v1/predictions/{id}/cancel", cancel)
+    app.router.add_get("/files/{name}", file)
+    server = TestServer(app)
+    await server.start_server()
+    base = str(server.make_url("")).rstrip("/")
+    state["done"] = done
+    async with aiohttp.ClientSession() as session:
+        yield session, f"{base}/v1", state
+    await server.close()
+
+
+def predictions_client(session, base_url, **kwargs):
+    options = {"api_token": "r8_test", "poll_initial": 0.01, "poll_max": 0.02, "timeout": 5}
+    options.update(kwargs)
+    return ReplicatePredictions(session=session, base_url=base_url, **options)
+
+
+@pytest.mark.asyncio
+async def test_run_polls_until_succeeded_and_downloads_output(fake_replicate):
+    session, base_url, state = fake_replicate
+    client = predictions_client(session, base_url)
+
+    output = await client.run("owner/model:abc123", {"image": "https://s3/body.png"})
+
+    path, auth, body = state["creates"][0]
+    assert path == "/v1/predictions"
+    assert auth == "Bearer r8_test"
+    assert body == {"version": "abc123", "input": {"image": "https://s3/body.png"}}
+    assert state["gets"] == 3
+    assert await client.download(output[0]) == b"png:p0.png"
+
+
+@pytest.mark.asyncio
+async def test_run_without_version_targets_model_endpoint(fake_replicate):
+    session, base_url, state = fake_replicate
+    await predictions_client(session, base_url).run("owner/model", {"x": 1})
+    assert state["creates"][0][0] == "/v1/models/owner/model/predictions"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_predictions_share_the_event_loop(fake_replicate):
+    session, base_url, state = fake_replicate
+    client = predictions_client(session, base_url)
+    loop = asyncio.get_running_loop()
+    executor_calls = []
+    run_in_executor = loop.run_in_executor
+    loop.run_in_executor = lambda *args: executor_calls.append(args) or run_in_executor(*args)
+    try:
+        outputs = await asyncio.gather(*(client.run("owner/model:v", {"i": i}) for i in range(200)))
+    finally:
+        loop.run_in_executor = run_in_executor
+
+    assert len({output[0] for output in outputs}) == 200
+    assert executor_calls == []
+
+
+@pytest.mark.asyncio
+async def test_failed_prediction_raises(fake_replicate):
+    session, base_url, state = fake_replicate
+    state["final_status"] = "failed"
+    with pytest.raises(ReplicateError, match="CUDA out of memory"):
+        await predictions_client(session, base_url).run("owner/model:v", {})
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_prediction(fake_replicate):
+    session, base_url, state = fake_replicate
+    state["polls_before_done"] = 10_000
+    with pytest.raises(ReplicateError, match="timed out"):
+        await predictions_client(session, base_url, timeout=0.1).run("owner/model:v", {})
+    assert state["cancels"] == ["p0"]
+
+
+@pytest.mark.asyncio
+async def test_create_retries_when_throttled(fake_replicate):
+    session, base_url, state = fake_replicate
+    state["throttle"] = 2
+    await predictions_client(session, base_url).run("owner/model:v", {})
+    assert len(state["creates"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_webhook_wakes_waiter_without_polling(fake_replicate):
+    session, base_url, state = fake_replicate
+    waiters = PredictionWaiters()
+    client = predictions_client(
+        session, base_url, webhook_url="https://api.example/webhook/replicate", waiters=waiters, poll_initial=30,
+    )
+    # Livraison du webhook peu après la création de la prédiction
+    loop = asyncio.get_running_loop()
+    state["on_create"] = lambda pid: loop.call_later(0.05, waiters.resolve, state["done"](pid))
+
+    output = await asyncio.wait_for(client.run("owner/model:v", {}), timeout=2)
+
+    assert output == [f"{base_url[:-3]}/files/p0.png"]
+    assert state["creates"][0][2]["webhook"] == "https://api.example/webhook/replicate"
+    assert state["creates"][0][2]["webhook_events_filter"] == ["completed"]
+    assert state["gets"] == 0
+    assert len(waiters) == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_delivered_before_create_returns_is_not_lost(fake_replicate):
+    session, base_url, state = fake_replicate
+    waiters = PredictionWaiters()
+    client = predictions_client(
+        session, base_url, webhook_url="https://api.example/webhook/replicate", waiters=waiters, poll_initial=30,
+    )
+    # Le webhook arrive pendant que la réponse du POST est encore en route
+    state["on_create"] = lambda pid: waiters.resolve(state["done"](pid))
+
+    output = await asyncio.wait_for(client.run("owner/model:v", {}), timeout=2)
+
+    assert output == [f"{base_url[:-3]}/files/p0.png"]
+    assert state["gets"] == 0
+    assert len(waiters) == 0
+
+
+def sign(secret: str, webhook_id: str, timestamp: str, body: bytes) -> str:
+    key = base64.b64decode(secret.split("_", 1)[1])
+    digest = hmac.new(key, f"{webhook_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    return "v1," + base64.b64encode(digest).decode()
+
+
+def test_verify_webhook_signature():
+    secret = "whsec_" + base64.b64encode(b"super-secret").decode()
+    body = json.dumps({"id": "p0", "status": "succeeded"}).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        "webhook-id": "msg_1",
+        "webhook-timestamp": timestamp,
+        "webhook-signature": "v1,bogus " + sign(secret, "msg_1", timestamp, body),
+    }
+
+    assert verify_webhook_signature(secret, headers, body)
+    assert not verify_webhook_signature(secret, headers, body + b" ")
+    stale = {**headers, "webhook-timestamp": str(int(time.time()) - 3600)}
+    assert not verify_webhook_signature(secret, stale, body)
+
+
+def test_webhook_route_checks_signature_and_ignores_unknown_predictions(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+
+    # Sans lifespan : la route n'a besoin ni de Mongo ni de S3
+    client = TestClient(app, raise_server_exceptions=False)
+
+    waiters = PredictionWaiters()
+    monkeypatch.setattr(settings, "REPLICATE_WEBHOOK_SECRET", None)
+    monkeypatch.setattr("app.features.webhook.webhook_route.prediction_waiters", waiters)
+
+    # Sans secret, aucun appel n'est accepté
+    response = client.post("/api/v1/webhook/replicate", json={"id": "unknown", "status": "succeeded"})
+    assert response.status_code == 401
+
+    secret = "whsec_" + base64.b64encode(b"k").decode()
+    monkeypatch.setattr(settings, "REPLICATE_WEBHOOK_SECRET", secret)
+    response = client.post("/api/v1/webhook/replicate", json={"id": "p0", "status": "succeeded"})
+    assert response.status_code == 400
+
+    body = json.dumps({"id": "unknown", "status": "succeeded"}).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        "webhook-id": "msg_1",
+        "webhook-timestamp": timestamp,
+        "webhook-signature": sign(secret, "msg_1", timestamp, body),
+        "Content-Type": "application/json",
+    }
+    response = client.post("/api/v1/webhook/replicate", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Prediction not awaited here."
+
+
+def test_webhook_url_requires_secret(monkeypatch):
+    from app.core.config import settings
+    from app.infrastructure.replicate.replicate_client import configured_webhook_url
+
+    monkeypatch.setattr(settings, "REPLICATE_WEBHOOK_URL", "https://api.example/webhook/replicate")
+    monkeypatch.setattr(settings, "REPLICATE_WEBHOOK_SECRET", None)
+    assert configured_webhook_url() is None
+    monkeypatch.setattr(settings, "REPLICATE_WEBHOOK_SECRET", "whsec_azerty")
+    assert configured_webhook_url() == "https://api.example/webhook/replicate"
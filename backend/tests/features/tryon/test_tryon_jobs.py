@@ -0,0 +1,425 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+
+from app.infrastructure.queue.job_repo import PermanentJobError
+from app.infrastructure.queue.job_worker import JobWorker
+
+
+class FakeJobs:
+    """ File en mémoire : rend les jobs fournis un par un """
+
+    def __init__(self, jobs):
+        self.pending = list(jobs)
+        self.claim = AsyncMock(side_effect=lambda *args: self.pending.pop(0) if self.pending else None)
+        self.heartbeat = AsyncMock(return_value=True)
+        self.complete = AsyncMock()
+        self.retry = AsyncMock()
+        self.fail = AsyncMock()
+        self.fail_expired = AsyncMock(return_value=[])
+
+
+def make_job(tryon_id="t1", attempts=1, max_attempts=3):
+    return {"_id": ObjectId(), "kind": "tryon", "payload": {"tryon_id": tryon_id}, "attempts": attempts, "max_attempts": max_attempts}
+
+
+async def run_until_drained(worker, jobs):
+    stop = asyncio.Event()
+    runner = asyncio.create_task(worker.run(stop))
+    while jobs.pending or worker._running:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await runner
+
+
+@pytest.mark.asyncio
+async def test_worker_completes_retries_and_fails_jobs():
+    ok, flaky = make_job("ok"), make_job("flaky", attempts=1)
+    exhausted, permanent = make_job("exhausted", attempts=3), make_job("permanent", attempts=1)
+    jobs = FakeJobs([ok, flaky, exhausted, permanent])
+    errors = {"flaky": RuntimeError("502"), "exhausted": RuntimeError("502"), "permanent": PermanentJobError("no mask")}
+
+    async def handler(payload):
+        if payload["tryon_id"] in errors:
+            raise errors[payload["tryon_id"]]
+
+    on_failure = AsyncMock()
+    worker = JobWorker(jobs, handlers={"tryon": handler}, on_failure={"tryon": on_failure},
+                       concurrency=1, poll_interval=0.01, backoff_seconds=10)
+    await run_until_drained(worker, jobs)
+
+    jobs.complete.assert_awaited_once_with(ok["_id"], worker.worker_id)
+    jobs.retry.assert_awaited_once()
+    assert jobs.retry.await_args.args[0] == flaky["_id"]
+    assert jobs.retry.await_args.args[3] == 10
+    assert {call.args[0] for call in jobs.fail.await_args_list} == {exhausted["_id"], permanent["_id"]}
+    assert [call.args[0]["tryon_id"] for call in on_failure.await_args_list] == ["exhausted", "permanent"]
+
+
+@pytest.mark.asyncio
+async def test_worker_respects_concurrency_cap():
+    jobs = FakeJobs([make_job() for _ in range(6)])
+    running, peak = 0, 0
+
+    async def handler(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    worker = JobWorker(jobs, handlers={"tryon": handler}, concurrency=2, poll_interval=0.01)
+    await run_until_drained(worker, jobs)
+
+    assert peak == 2
+    assert jobs.complete.await_count == 6
+    assert worker.backoff(1) == 10 and worker.backoff(3) == 40 and worker.backoff(10) == 300
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_survives_a_failed_renewal_and_cancels_on_lost_lease():
+    from app.core.metrics import metrics
+
+    # Un renouvellement qui lève : le heartbeat continue et le job se termine
+    jobs = FakeJobs([make_job("slow")])
+    jobs.heartbeat.side_effect = [ConnectionError("mongo down"), True, True, True, True, True]
+
+    async def handler(payload):
+        await asyncio.sleep(0.05)
+
+    worker = JobWorker(jobs, handlers={"tryon": handler}, heartbeat_seconds=0.01, poll_interval=0.01)
+    await run_until_drained(worker, jobs)
+    assert jobs.heartbeat.await_count >= 2
+    jobs.complete.assert_awaited_once()
+
+    # Bail perdu : l'exécution est annulée, rien n'est écrit pour ce job
+    jobs = FakeJobs([make_job("stolen")])
+    jobs.heartbeat.return_value = False
+    cancelled = asyncio.Event()
+    lost = metrics.get("jobs.tryon.lease_lost")
+
+    async def endless(payload):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    worker = JobWorker(jobs, handlers={"tryon": endless}, heartbeat_seconds=0.01, poll_interval=0.01)
+    await asyncio.wait_for(run_until_drained(worker, jobs), 5)
+    assert cancelled.is_set()
+    jobs.complete.assert_not_awaited()
+    jobs.retry.assert_not_awaited()
+    jobs.fail.assert_not_awaited()
+    assert metrics.get("jobs.tryon.lease_lost") == lost + 1
+
+
+@pytest.mark.asyncio
+async def test_create_tryon_only_enqueues():
+    from types import SimpleNamespace
+    from datetime import datetime
+    from app.features.tryon.tryon_schema import TryonCreateRequest
+    from app.features.tryon.tryon_service import TRYON_JOB, TryonService
+
+    user = SimpleNamespace(id=str(ObjectId()), credits=3)
+    body = SimpleNamespace(id=ObjectId(), user_id=user.id)
+    cloth = SimpleNamespace(id=ObjectId(), user_id=user.id)
+    service = TryonService(
+        repo=MagicMock(next_version=AsyncMock(return_value=1),
+                       create_tryon=AsyncMock(return_value=SimpleNamespace(id=ObjectId(), created_at=datetime.now(), status="pending"))),
+        storage=MagicMock(),
+        body_repo=MagicMock(get_body_by_id=AsyncMock(return_value=body)),
+        clothing_repo=MagicMock(get_clothing_by_id=AsyncMock(return_value=cloth)),
+        jobs=MagicMock(enqueue=AsyncMock()),
+    )
+
+    response = await service.create_tryon(user, TryonCreateRequest(body_id=str(body.id), clothing_id=str(cloth.id)))
+
+    assert response.status == "pending"
+    kind, payload = service.jobs.enqueue.await_args.args
+    assert kind == TRYON_JOB
+    assert payload["body_id"] == str(body.id) and payload["user_id"] == user.id
+
+
+async def consume_stream(key, chunks, **kwargs):
+    async for _ in chunks:
+        pass
+    return key
+
+
+def render_from_file(path, sizes, quality):
+    with open(path, "rb") as source:
+        data = source.read()
+    return {name: b"webp:" + data for name in sizes}
+
+
+def make_cache_service(cached_output=None):
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+    from datetime import datetime
+    from app.features.tryon.tryon_service import TryonService
+
+    user = SimpleNamespace(id=str(ObjectId()), credits=3)
+    body = SimpleNamespace(id=ObjectId(), user_id=user.id, image_url="body.png", mask_upper="mask.png")
+    cloth = SimpleNamespace(id=ObjectId(), user_id=user.id, image_url="cloth.png", cloth_type="upper")
+    repo = MagicMock(
+        next_version=AsyncMock(return_value=2),
+        get_cached_result=AsyncMock(return_value=cached_output),
+        get_renditions=AsyncMock(return_value={}),
+        set_cached_result=AsyncMock(),
+        set_tryon=AsyncMock(),
+    )
+    repo.create_tryon = AsyncMock(side_effect=lambda **kw: SimpleNamespace(
+        id=kw["tryon_id"], created_at=kw["created_at"], status=kw.get("status", "pending")))
+    storage = MagicMock(
+        get_etag=AsyncMock(side_effect=lambda key: f"etag-{key}"),
+        get_presigned_url=AsyncMock(side_effect=lambda key: f"https://s3/{key}"),
+        presign_many=AsyncMock(side_effect=lambda keys: {key: f"https://s3/{key}" for key in keys}),
+        upload_stream=AsyncMock(side_effect=consume_stream),
+        upload_image=AsyncMock(),
+    )
+
+    async def chunks():
+        yield b"png"
+
+    @asynccontextmanager
+    async def fake_stream(url):
+        yield SimpleNamespace(iter_chunks=chunks, content_type="image/png", content_length=3, md5=None)
+
+    service = TryonService(
+        repo=repo,
+        storage=storage,
+        body_repo=MagicMock(get_body_by_id=AsyncMock(return_value=body)),
+        clothing_repo=MagicMock(get_clothing_by_id=AsyncMock(return_value=cloth)),
+        jobs=MagicMock(enqueue=AsyncMock()),
+        publisher=MagicMock(publish=AsyncMock()),
+        predictions=MagicMock(run=AsyncMock(return_value=["https://replicate.delivery/out.png"]), stream=fake_stream),
+        images=MagicMock(render_webp_renditions_from_file=AsyncMock(side_effect=render_from_file)),
+    )
+    return service, user, body, cloth
+
+
+@pytest.mark.asyncio
+async def test_create_tryon_serves_cached_result_without_gpu_or_credit():
+    from app.core.metrics import metrics
+    from app.features.tryon.tryon_schema import TryonCreateRequest
+
+    service, user, body, cloth = make_cache_service(cached_output="tryons/previous.png")
+    hits = metrics.get("tryon.result_cache.hits")
+
+    response = await service.create_tryon(user, TryonCreateRequest(body_id=str(body.id), clothing_id=str(cloth.id)))
+
+    assert response.status == "ready" and response.version == 2
+    created = service.repo.create_tryon.await_args.kwargs
+    assert created["output_url"] == "tryons/previous.png" and created["charge"] is False
+    service.jobs.enqueue.assert_not_awaited()
+    event = service.publisher.publish.await_args.args[1]
+    assert event["status"] == "ready" and event["output_url"] == "https://s3/tryons/previous.png"
+    assert metrics.get("tryon.result_cache.hits") == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_and_force_regenerate_enqueue_with_cache_key():
+    from app.features.tryon.tryon_schema import TryonCreateRequest
+
+    service, user, body, cloth = make_cache_service(cached_output="tryons/previous.png")
+    request = TryonCreateRequest(body_id=str(body.id), clothing_id=str(cloth.id), force_regenerate=True)
+    response = await service.create_tryon(user, request)
+
+    assert response.status == "pending"
+    service.repo.get_cached_result.assert_not_awaited()
+    payload = service.jobs.enqueue.await_args.args[1]
+    assert len(payload["cache_key"]) == 64 and payload["version"] == 2
+
+    # Même entrées → même clé ; le worker enregistre la sortie sous cette clé
+    other, *_ = make_cache_service()
+    assert await other._result_cache_key(user.id, body, cloth) == payload["cache_key"]
+    assert await other._result_cache_key("someone-else", body, cloth) != payload["cache_key"]
+
+    await service.run_job(payload)
+    s3_key = service.repo.set_tryon.await_args.args[1]
+    assert service.storage.upload_stream.await_args.args[0] == s3_key
+    service.repo.set_cached_result.assert_awaited_once_with(payload["cache_key"], s3_key)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_failure_marks_tryon_failed_and_refunds_credit():
+    from app.features.tryon.tryon_schema import TryonCreateRequest
+
+    service, user, body, cloth = make_cache_service()
+    service.repo.set_error = AsyncMock()
+    service.repo.release_credits = AsyncMock()
+    service.jobs.enqueue.side_effect = RuntimeError("queue down")
+    request = TryonCreateRequest(body_id=str(body.id), clothing_id=str(cloth.id))
+
+    with pytest.raises(RuntimeError):
+        await service.create_tryon(user, request)
+
+    tryon_id = service.repo.create_tryon.await_args.kwargs["tryon_id"]
+    service.repo.set_error.assert_awaited_once_with(str(tryon_id), "Tryon could not be queued")
+    service.repo.release_credits.assert_awaited_once_with(user.id, 1)
+
+
+@pytest.mark.asyncio
+async def test_job_stores_webp_renditions_next_to_output(monkeypatch):
+    import os
+    from app.core.config import settings
+
+    service, user, body, cloth = make_cache_service()
+    tryon_id = str(ObjectId())
+
+    await service.run_job({"user_id": user.id, "tryon_id": tryon_id, "body_id": str(body.id),
+                           "clothing_id": str(cloth.id), "version": 1})
+
+    s3_key, renditions = service.repo.set_tryon.await_args.args[1:]
+    assert renditions == {
+        "thumbnail_url": s3_key.replace(".png", "_thumbnail.webp"),
+        "medium_url": s3_key.replace(".png", "_medium.webp"),
+    }
+    # Le pool relit la copie disque du flux, supprimée une fois le job terminé
+    spooled = service.images.render_webp_renditions_from_file.await_args.args[0]
+    assert not os.path.exists(spooled)
+    service.storage.get_presigned_url.assert_not_awaited()
+    uploads = {call.args[0]: call.args[1] for call in service.storage.upload_image.await_args_list}
+    assert uploads == dict.fromkeys(renditions.values(), b"webp:png")
+    assert {call.kwargs["content_type"] for call in service.storage.upload_image.await_args_list} == {"image/webp"}
+    event = service.publisher.publish.await_args.args[1]
+    assert event["thumbnail_url"] == f"https://s3/{renditions['thumbnail_url']}"
+
+    # Échec du rendu : le try-on reste prêt, sans déclinaisons
+    service.images.render_webp_renditions_from_file.side_effect = OSError("cannot identify image file")
+    await service.run_job({"user_id": user.id, "tryon_id": tryon_id, "body_id": str(body.id),
+                           "clothing_id": str(cloth.id), "version": 2})
+    assert service.repo.set_tryon.await_args.args[2] == {}
+    assert service.publisher.publish.await_args.args[1]["status"] == "ready"
+
+    # Sortie au-delà du plafond : pas de copie disque, pas de déclinaisons
+    service.images.render_webp_renditions_from_file.reset_mock()
+    monkeypatch.setattr(settings, "TRYON_RENDITION_MAX_SOURCE_BYTES", 2)
+    await service.run_job({"user_id": user.id, "tryon_id": tryon_id, "body_id": str(body.id),
+                           "clothing_id": str(cloth.id), "version": 3})
+    assert service.repo.set_tryon.await_args.args[2] == {}
+    service.images.render_webp_renditions_from_file.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_delete_keeps_output_shared_with_other_versions():
+    from types import SimpleNamespace
+
+    service, user, *_ = make_cache_service()
+    service.repo.get_tryon_by_id = AsyncMock(return_value=SimpleNamespace(user_id=user.id, output_url="tryons/shared.png"))
+    service.repo.count_by_output_url = AsyncMock(return_value=2)
+    service.repo.delete_tryon = AsyncMock()
+    service.storage.delete_image = AsyncMock()
+
+    await service.delete_tryon("t1", user)
+
+    service.storage.delete_image.assert_not_awaited()
+    service.repo.delete_tryon.assert_awaited_once_with("t1")
+
+
+def make_batch_service(cached=None, credits_ok=True):
+    from types import SimpleNamespace
+    from app.features.tryon.tryon_model import TryonModel
+
+    service, user, body, _ = make_cache_service()
+    body.mask_lower = "mask-lower.png"
+    clothes = [
+        SimpleNamespace(id=ObjectId(), user_id=user.id, image_url=f"cloth-{i}.png", cloth_type=cloth_type)
+        for i, cloth_type in enumerate(["upper", "lower", "upper"])
+    ]
+    service.clothing_repo.get_clothes_by_ids = AsyncMock(return_value=list(reversed(clothes)))
+    service.repo.reserve_credits = AsyncMock(return_value=credits_ok)
+    service.repo.release_credits = AsyncMock()
+    service.repo.get_cached_results = AsyncMock(side_effect=lambda keys: {
+        key: output for key, output in zip(keys, cached or []) if output
+    })
+    service.repo.create_tryons = AsyncMock(side_effect=lambda items: [TryonModel(_id=item.pop("tryon_id"), **item) for item in items])
+    service.storage.presign_many = AsyncMock(side_effect=lambda keys, expires_in=3600: {key: f"https://s3/{key}" for key in keys})
+    service.jobs.enqueue_many = AsyncMock()
+    return service, user, body, clothes
+
+
+@pytest.mark.asyncio
+async def test_batch_reserves_credits_once_and_enqueues_jobs_with_shared_inputs():
+    from app.features.tryon.tryon_schema import TryonBatchRequest
+    from app.features.tryon.tryon_service import TRYON_JOB
+
+    # Le premier vêtement a déjà un résultat en cache : ni crédit ni job pour lui
+    service, user, body, clothes = make_batch_service(cached=["tryons/previous.png"])
+    ids = [str(c.id) for c in clothes]
+
+    response = await service.create_tryon_batch(user, TryonBatchRequest(body_id=str(body.id), clothing_ids=ids + ids[:1]))
+
+    assert [item.clothing_id for item in response.items] == ids
+    assert [item.status for item in response.items] == ["ready", "pending", "pending"]
+    assert response.credits_used == 2
+    service.clothing_repo.get_clothes_by_ids.assert_awaited_once_with(user.id, ids)
+    service.body_repo.get_body_by_id.assert_awaited_once()
+    service.repo.reserve_credits.assert_awaited_once_with(user.id, 2)
+    # Entrées du lot signées en un seul appel (l'autre signe la sortie en cache pour l'événement)
+    assert [call.args[0][0] for call in service.storage.presign_many.await_args_list].count("body.png") == 1
+
+    kind, payloads = service.jobs.enqueue_many.await_args.args
+    assert kind == TRYON_JOB and [p["clothing_id"] for p in payloads] == ids[1:]
+    assert {p["inputs"]["person"] for p in payloads} == {"https://s3/body.png"}
+    assert [p["inputs"]["mask"] for p in payloads] == ["https://s3/mask-lower.png", "https://s3/mask.png"]
+    assert {p["batch_id"] for p in payloads} == {response.batch_id}
+
+    cached_event = service.publisher.publish.await_args.args[1]
+    assert cached_event["batch_id"] == response.batch_id and cached_event["status"] == "ready"
+
+    # Le worker réutilise les URLs signées du batch et marque ses événements du batch_id
+    service.clothing_repo.get_clothing_by_id = AsyncMock(return_value=clothes[1])
+    service.storage.presign_many.reset_mock()
+    await service.run_job(payloads[0])
+    assert service.predictions.run.await_args.kwargs["input"]["cloth"] == "https://s3/cloth-1.png"
+    assert all("body.png" not in call.args[0] for call in service.storage.presign_many.await_args_list)
+    assert service.publisher.publish.await_args.args[1]["batch_id"] == response.batch_id
+
+
+@pytest.mark.asyncio
+async def test_batch_is_rejected_before_any_side_effect():
+    from app.core.errors import UnauthorizedError, ValidationError
+    from app.features.tryon.tryon_schema import TryonBatchRequest
+
+    service, user, body, clothes = make_batch_service(credits_ok=False)
+    request = TryonBatchRequest(body_id=str(body.id), clothing_ids=[str(c.id) for c in clothes])
+    with pytest.raises(UnauthorizedError):
+        await service.create_tryon_batch(user, request)
+    service.repo.create_tryons.assert_not_awaited()
+    service.jobs.enqueue_many.assert_not_awaited()
+
+    # Vêtement inconnu ou d'un autre utilisateur : absent du résultat $in
+    service, user, body, clothes = make_batch_service()
+    request = TryonBatchRequest(body_id=str(body.id), clothing_ids=[str(c.id) for c in clothes])
+    service.clothing_repo.get_clothes_by_ids.return_value = clothes[:2]
+    with pytest.raises(UnauthorizedError):
+        await service.create_tryon_batch(user, request)
+
+    # Masque manquant sur le body : refus avant toute réservation de crédits
+    service.clothing_repo.get_clothes_by_ids.return_value = clothes
+    body.mask_lower = None
+    with pytest.raises(ValidationError):
+        await service.create_tryon_batch(user, request)
+    service.repo.reserve_credits.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batch_enqueue_failure_fails_records_and_releases_credits():
+    from app.features.tryon.tryon_schema import TryonBatchRequest
+
+    service, user, body, clothes = make_batch_service(cached=["tryons/previous.png"])
+    service.repo.set_error = AsyncMock()
+    service.jobs.enqueue_many.side_effect = RuntimeError("queue down")
+    request = TryonBatchRequest(body_id=str(body.id), clothing_ids=[str(c.id) for c in clothes])
+
+    with pytest.raises(RuntimeError):
+        await service.create_tryon_batch(user, request)
+
+    # Le try-on servi depuis le cache reste valide, seuls les deux en attente échouent
+    created = service.repo.create_tryons.await_args.args[0]
+    failed = [call.args[0] for call in service.repo.set_error.await_args_list]
+    assert [item["status"] for item in created] == ["ready", "pending", "pending"] and len(failed) == 2
+    service.repo.release_credits.assert_awaited_once_with(user.id, 2)
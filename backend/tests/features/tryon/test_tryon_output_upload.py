@@ -0,0 +1,123 @@
+import base64
+import hashlib
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.core.errors import InternalServerError
+from app.infrastructure.replicate.replicate_client import ReplicatePredictions
+from app.infrastructure.storage.storage_repo import StorageRepository
+
+
+class FakeS3:
+    """ Client boto3 minimal : garde les parties reçues et calcule les ETag comme S3 """
+
+    def __init__(self):
+        self.parts, self.objects, self.aborted = {}, {}, []
+        self.bodies = []
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.parts[Key] = []
+        return {"UploadId": f"up-{Key}"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentMD5):
+        assert base64.b64decode(ContentMD5) == hashlib.md5(Body).digest()
+        self.parts[Key].append(Body)
+        self.bodies.append(Body)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.parts.pop(Key)
+        self.objects[Key] = b"".join(parts)
+        digests = b"".join(hashlib.md5(part).digest() for part in parts)
+        return {"ETag": f'"{hashlib.md5(digests).hexdigest()}-{len(parts)}"'}
+
+    def put_object(self, Bucket, Key, Body, ContentType, ContentMD5):
+        self.objects[Key] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(Key)
+        self.parts.pop(Key, None)
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_sends_bounded_parts_and_checks_etag():
+    s3 = FakeS3()
+    storage = StorageRepository(bucket_name="bucket", s3_client=s3)
+    data = bytes(range(256)) * 100  # 25,6 ko
+
+    await storage.upload_stream("big.png", chunked(data, 1000), expected_length=len(data),
+                                expected_md5=hashlib.md5(data).hexdigest(), part_size=8000)
+    await storage.upload_stream("small.png", chunked(data[:500], 100), part_size=8000)
+
+    assert s3.objects["big.png"] == data
+    assert s3.objects["small.png"] == data[:500]
+    assert not s3.parts and not s3.aborted
+    # Chaque partie part dans son propre buffer, jamais réutilisé ni recopié
+    assert len(s3.bodies) == 4 and len({id(body) for body in s3.bodies}) == 4
+    assert all(isinstance(body, bytearray) for body in s3.bodies)
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_aborts_on_truncated_body():
+    s3 = FakeS3()
+    storage = StorageRepository(bucket_name="bucket", s3_client=s3)
+
+    with pytest.raises(InternalServerError):
+        await storage.upload_stream("cut.png", chunked(b"x" * 20000, 1000), expected_length=30000, part_size=8000)
+
+    assert s3.aborted == ["cut.png"] and "cut.png" not in s3.objects
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_only_warns_on_source_etag_mismatch():
+    s3 = FakeS3()
+    storage = StorageRepository(bucket_name="bucket", s3_client=s3)
+    data = b"y" * 20000
+
+    # ETag source qui n'est pas le MD5 du contenu (CDN, chiffrement...) : l'objet est gardé
+    await storage.upload_stream("cdn.png", chunked(data, 1000), expected_length=len(data),
+                                expected_md5="0" * 32, part_size=8000)
+
+    assert s3.objects["cdn.png"] == data and not s3.aborted
+
+
+@pytest_asyncio.fixture
+async def output_server():
+    data = b"\x89PNG" + bytes(range(256)) * 400
+
+    async def output(request):
+        return web.Response(body=data, content_type="image/png",
+                            headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+
+    app = web.Application()
+    app.router.add_get("/out.png", output)
+    server = TestServer(app)
+    await server.start_server()
+    yield str(server.make_url("/out.png")), data
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_replicate_output_streams_into_s3(output_server):
+    url, data = output_server
+    s3 = FakeS3()
+    storage = StorageRepository(bucket_name="bucket", s3_client=s3)
+
+    async with aiohttp.ClientSession() as session:
+        async with ReplicatePredictions(session=session, api_token="t").stream(url) as output:
+            assert output.content_length == len(data) and output.md5 == hashlib.md5(data).hexdigest()
+            await storage.upload_stream("tryon.png", output.iter_chunks(), content_type=output.content_type,
+                                        expected_length=output.content_length, expected_md5=output.md5,
+                                        part_size=32 * 1024)
+
+    assert s3.objects["tryon.png"] == data
@@ -7,6 +7,15 @@ from app.features.tryon.tryon_repo import TryonRepository
 from app.core.errors import NotFoundError
 from app.features.tryon.tryon_model import TryonModel
 
+def sorted_find(docs):
+    """ find().sort().limit().to_list() renvoyant `docs`, déjà dans l'ordre du tri demandé """
+    cursor = MagicMock()
+    cursor.sort.return_value.limit.return_value.to_list = AsyncMock(
+        side_effect=lambda length: docs[:length]
+    )
+    return cursor
+
+
 @pytest.fixture
 def fake_collection():
     col = MagicMock()
@@ -51,13 +60,14 @@ async def test_set_tryon_not_found(tryon_repo, fake_collection):
 
 @pytest.mark.asyncio
 async def test_get_all_by_user(tryon_repo, fake_collection):
-    fake_collection.find.return_value.to_list.return_value = [
+    fake_collection.find.return_value = sorted_find([
         {"_id": ObjectId(), "user_id": ObjectId(), "body_id": ObjectId(), "clothing_id": ObjectId(),
             "version": 1, "status": "ready", "created_at": datetime.now(), "updated_at": datetime.now()}
-    ]
-    result = await tryon_repo.get_all_by_user(str(ObjectId()))
+    ])
+    result, next_cursor = await tryon_repo.get_all_by_user(str(ObjectId()), limit=10)
     assert len(result) == 1
     assert isinstance(result[0], TryonModel)
+    assert next_cursor is None
 
 @pytest.mark.asyncio
 async def test_get_all_by_body_and_clothing(tryon_repo, fake_collection):
@@ -86,12 +96,126 @@ async def test_get_tryon_by_id_not_found(tryon_repo, fake_collection):
 
 @pytest.mark.asyncio
 async def test_delete_tryon_success(tryon_repo, fake_collection):
-    fake_collection.delete_one.return_value.deleted_count = 1
+    fake_collection.find_one_and_delete = AsyncMock(return_value={"_id": ObjectId()})
     await tryon_repo.delete_tryon(str(ObjectId()))
-    fake_collection.delete_one.assert_called_once()
+    fake_collection.find_one_and_delete.assert_called_once()
 
 @pytest.mark.asyncio
 async def test_delete_tryon_not_found(tryon_repo, fake_collection):
-    fake_collection.delete_one.return_value.deleted_count = 0
+    fake_collection.find_one_and_delete = AsyncMock(return_value=None)
     with pytest.raises(NotFoundError):
-        await tryon_repo.delete_tryon(str(ObjectId()))
\ No newline at end of file
+        await tryon_repo.delete_tryon(str(ObjectId()))
+
+@pytest.mark.asyncio
+async def test_next_version_increments_counter_and_seeds_from_history():
+    tryons, versions = MagicMock(), MagicMock()
+    tryons.find_one = AsyncMock(return_value={"version": 3})
+    versions.find_one_and_update = AsyncMock(side_effect=[None, {"seq": 4}, {"seq": 5}])
+    repo = TryonRepository(db={"tryons": tryons, "users": MagicMock(), "tryon_results": MagicMock(), "tryon_versions": versions})
+    body_id, clothing_id = str(ObjectId()), str(ObjectId())
+
+    # Pas encore de compteur : reprise depuis la dernière version existante
+    assert await repo.next_version(body_id, clothing_id) == 4
+    seeded = versions.find_one_and_update.await_args_list[1]
+    assert seeded.args[1][0]["$set"]["seq"]["$add"][0] == {"$ifNull": ["$seq", 3]}
+    assert seeded.kwargs["upsert"] is True
+
+    # Compteur présent : un seul $inc, sans relire l'historique
+    assert await repo.next_version(body_id, clothing_id) == 5
+    assert versions.find_one_and_update.await_args_list[2].args[1] == {"$inc": {"seq": 1}}
+    tryons.find_one.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_all_by_user_pages_latest_version_per_pair():
+    from app.core.errors import ValidationError
+
+    user_id, now = ObjectId(), datetime.now()
+    pairs = [(ObjectId(), ObjectId()) for _ in range(3)]
+
+    def doc(pair, version):
+        return {"_id": ObjectId(), "user_id": user_id, "body_id": pair[0], "clothing_id": pair[1],
+                "version": version, "status": "ready", "output_url": f"tryons/{version}.png", "created_at": now}
+
+    # L'index partiel ne contient que la dernière version prête de chaque paire
+    tryons = MagicMock(find=MagicMock(return_value=sorted_find([doc(pairs[0], 3), doc(pairs[1], 1), doc(pairs[2], 2)])))
+    repo = TryonRepository(db={"tryons": tryons, "users": MagicMock(), "tryon_results": MagicMock(), "tryon_versions": MagicMock()})
+
+    page, next_cursor = await repo.get_all_by_user(str(user_id), limit=2)
+
+    assert [(t.body_id, t.version) for t in page] == [(pairs[0][0], 3), (pairs[1][0], 1)]
+    query, projection = tryons.find.call_args.args
+    # Filtre de l'index partiel dans la requête : pas de page raccourcie par des try-ons en cours
+    assert query == {"user_id": user_id, "latest": True, "status": "ready", "output_url": {"$type": "string"}}
+    assert "error_message" not in projection
+    tryons.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+    tryons.find.return_value = sorted_find([doc(pairs[2], 2)])
+    page, last_cursor = await repo.get_all_by_user(str(user_id), limit=2, after=next_cursor)
+    query = tryons.find.call_args.args[0]
+    assert query["$or"][1] == {"body_id": pairs[1][0], "clothing_id": {"$gt": pairs[1][1]}}
+    assert [t.version for t in page] == [2] and last_cursor is None
+
+    with pytest.raises(ValidationError):
+        await repo.get_all_by_user(str(user_id), limit=2, after="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_latest_flag_moves_with_new_and_deleted_versions():
+    body_id, clothing_id = ObjectId(), ObjectId()
+    tryons = MagicMock(
+        insert_one=AsyncMock(),
+        update_many=AsyncMock(),
+        update_one=AsyncMock(),
+        find_one=AsyncMock(return_value=None),
+    )
+    repo = TryonRepository(db={"tryons": tryons, "users": MagicMock(), "tryon_results": MagicMock(), "tryon_versions": MagicMock()})
+
+    record = await repo.create_tryon(ObjectId(), str(ObjectId()), str(body_id), str(clothing_id), 3, datetime.now(), charge=False)
+
+    assert tryons.insert_one.await_args.args[0]["latest"] is True
+    older, update = tryons.update_many.await_args.args
+    assert older == {"body_id": body_id, "clothing_id": clothing_id, "version": {"$lt": 3}, "latest": {"$ne": False}}
+    assert update == {"$set": {"latest": False}}
+    tryons.update_one.assert_not_awaited()
+
+    # Une version plus récente a été créée en parallèle : celle-ci n'est pas la dernière
+    tryons.find_one.return_value = {"_id": ObjectId()}
+    record = await repo.create_tryon(ObjectId(), str(ObjectId()), str(body_id), str(clothing_id), 2, datetime.now(), charge=False)
+    tryons.update_one.assert_awaited_once_with({"_id": record.id}, {"$set": {"latest": False}})
+
+    # Suppression de la dernière version : la précédente reprend le flag
+    previous_id = ObjectId()
+    tryons.find_one_and_delete = AsyncMock(return_value={"_id": record.id, "body_id": body_id, "clothing_id": clothing_id, "latest": True})
+    tryons.find_one.return_value = {"_id": previous_id}
+    await repo.delete_tryon(str(record.id))
+    tryons.update_one.assert_awaited_with({"_id": previous_id}, {"$set": {"latest": True}})
+
+
+@pytest.mark.asyncio
+async def test_backfill_flags_pairs_with_unflagged_documents_on_every_run():
+    latest, older, oldest = ObjectId(), ObjectId(), ObjectId()
+
+    def aggregate(pairs):
+        cursor = MagicMock()
+        cursor.__aiter__.return_value = pairs
+        return cursor
+
+    tryons = MagicMock(update_many=AsyncMock())
+    tryons.name = "tryons"
+    tryons.aggregate = MagicMock(return_value=aggregate([{"_id": {"b": 1, "c": 2}, "versions": [
+        {"_id": latest}, {"_id": older}, {"_id": oldest},
+    ]}]))
+    repo = TryonRepository(db={"tryons": tryons, "users": MagicMock(), "tryon_results": MagicMock(), "tryon_versions": MagicMock()})
+
+    await repo._backfill_latest()
+
+    # Même si d'autres documents portent déjà le flag : seuls les documents sans flag comptent
+    assert tryons.aggregate.call_args.args[0][0] == {"$match": {"latest": {"$exists": False}}}
+    assert tryons.update_many.await_args_list[0].args == ({"_id": {"$in": [latest]}}, {"$set": {"latest": True}})
+    assert tryons.update_many.await_args_list[1].args == ({"_id": {"$in": [older, oldest]}}, {"$set": {"latest": False}})
+
+    tryons.update_many.reset_mock()
+    tryons.aggregate.return_value = aggregate([])
+    await repo._backfill_latest()
+    tryons.update_many.assert_not_awaited()
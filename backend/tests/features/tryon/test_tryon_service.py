@@ -32,12 +32,14 @@ def fake_repos():
 def tryon_service(fake_repos):
     for repo in fake_repos.values():
         for attr in [
-            'get_all_by_body_and_clothing', 'create_tryon', 'set_tryon',
+            'get_all_by_body_and_clothing', 'next_version', 'create_tryon', 'set_tryon',
             'get_all_by_user', 'get_tryon_by_id', 'delete_tryon',
             'get_presigned_url', 'delete_image',
-            'get_body_by_id', 'get_clothing_by_id'
+            'get_body_by_id', 'get_clothing_by_id',
+            'count_by_output_url', 'delete_cached_results'
         ]:
             setattr(repo, attr, AsyncMock())
+    fake_repos["storage"].presign_many = AsyncMock(side_effect=lambda keys, expires_in=3600: {k: f"https://signed.url/{k}" for k in keys if k})
     return TryonService(
         repo=fake_repos["repo"],
         storage=fake_repos["storage"],
@@ -53,7 +55,7 @@ async def test_create_tryon_success(tryon_service, fake_user):
 
     tryon_service.body_repo.get_body_by_id.return_value = SimpleNamespace(user_id=fake_user.id)
     tryon_service.clothing_repo.get_clothing_by_id.return_value = SimpleNamespace(user_id=fake_user.id)
-    tryon_service.repo.get_all_by_body_and_clothing.return_value = []
+    tryon_service.repo.next_version.return_value = 1
     tryon_service.repo.create_tryon.return_value = SimpleNamespace(
         id=ObjectId(), created_at=datetime.now(), status="pending"
     )
@@ -88,17 +90,21 @@ async def test_create_tryon_unauthorized_clothing(tryon_service, fake_user):
 
 @pytest.mark.asyncio
 async def test_get_all_tryons_success(tryon_service, fake_user):
-    tryon_service.repo.get_all_by_user.return_value = [
+    tryon_service.repo.get_all_by_user.return_value = ([
         SimpleNamespace(
-            id=ObjectId(), output_url="s3/fake.png", body_id=ObjectId(),
-            clothing_id=ObjectId(), status="ready", created_at=datetime.now(), version=1
+            id=ObjectId(), output_url="s3/fake.png", thumbnail_url="s3/fake_thumbnail.webp", medium_url=None,
+            body_id=ObjectId(), clothing_id=ObjectId(), status="ready", created_at=datetime.now(), version=1
         )
-    ]
-    tryon_service.storage.get_presigned_url.return_value = "https://signed.url/image.png"
+    ], "next-page")
 
     result = await tryon_service.get_all_tryons(fake_user.id)
     assert isinstance(result, TryonListResponse)
     assert len(result.tryons) == 1
+    assert result.tryons[0].output_url == "https://signed.url/s3/fake.png"
+    assert result.next_cursor == "next-page"
+    assert result.tryons[0].thumbnail_url == "https://signed.url/s3/fake_thumbnail.webp"
+    assert result.tryons[0].medium_url is None
+    tryon_service.storage.presign_many.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -107,6 +113,8 @@ async def test_get_tryon_by_id_success(tryon_service, fake_user):
         id=ObjectId(),
         user_id=fake_user.id,
         output_url="s3/image.png",
+        thumbnail_url=None,
+        medium_url=None,
         body_id=ObjectId(),
         clothing_id=ObjectId(),
         status="ready",
@@ -139,13 +147,17 @@ async def test_get_tryon_by_id_wrong_owner(tryon_service, fake_user):
 @pytest.mark.asyncio
 async def test_delete_tryon_success(tryon_service, fake_user):
     tryon = SimpleNamespace(
-        id=ObjectId(), user_id=fake_user.id, output_url="s3/output.png"
+        id=ObjectId(), user_id=fake_user.id, output_url="s3/output.png",
+        thumbnail_url="s3/output_thumbnail.webp", medium_url=None
     )
     tryon_service.repo.get_tryon_by_id.return_value = tryon
+    tryon_service.repo.count_by_output_url.return_value = 1
 
     result = await tryon_service.delete_tryon(str(tryon.id), fake_user)
     assert isinstance(result, TryonDeleteResponse)
-    tryon_service.storage.delete_image.assert_called_once_with("s3/output.png")
+    deleted = [call.args[0] for call in tryon_service.storage.delete_image.call_args_list]
+    assert deleted == ["s3/output.png", "s3/output_thumbnail.webp"]
+    tryon_service.repo.delete_cached_results.assert_called_once_with("s3/output.png")
     tryon_service.repo.delete_tryon.assert_called_once_with(str(tryon.id))
 
 
@@ -0,0 +1,67 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.core.metrics import metrics
+from app.infrastructure.http.http_clients import ClientProfile, HttpClients, RetryPolicy, request
+
+
+@pytest_asyncio.fixture
+async def flaky_server():
+    calls = {"get": 0, "post": 0}
+
+    async def get(request):
+        calls["get"] += 1
+        if calls["get"] == 1:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.Response(text="ok")
+
+    async def post(request):
+        calls["post"] += 1
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/flaky", get)
+    app.router.add_post("/flaky", post)
+    server = TestServer(app)
+    await server.start_server()
+    yield str(server.make_url("/flaky")), calls
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_registry_retries_idempotent_requests_and_reuses_connections(flaky_server):
+    url, calls = flaky_server
+    retry = RetryPolicy(attempts=3, backoff=0)
+    await HttpClients.connect({"test": ClientProfile(limit_per_host=2, total_timeout=5, retry=retry)})
+    before = {name: metrics.get(f"http.test.{name}") for name in ("requests", "retries", "connections.created", "connections.reused")}
+    try:
+        session = HttpClients.get("test")
+        async with request(session, "GET", url, retry=HttpClients.retry_policy("test"), name="test") as resp:
+            assert resp.status == 200 and await resp.text() == "ok"
+        # POST n'est pas idempotent : pas de nouvelle tentative
+        async with request(session, "POST", url, retry=retry, name="test") as resp:
+            assert resp.status == 503
+    finally:
+        await HttpClients.close()
+
+    assert calls == {"get": 2, "post": 1}
+    delta = {name: metrics.get(f"http.test.{name}") - value for name, value in before.items()}
+    assert delta["requests"] == 3 and delta["retries"] == 1
+    # Keep-alive : une seule connexion TCP pour les trois requêtes
+    assert delta["connections.created"] == 1 and delta["connections.reused"] == 2
+    with pytest.raises(Exception, match="not connected"):
+        HttpClients.get("test")
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    from email.utils import formatdate
+    import time
+
+    policy = RetryPolicy(backoff=1, backoff_max=10)
+    assert policy.delay(1, "3") == 3
+    assert policy.delay(1, "120") == 10
+    assert 3 < policy.delay(1, formatdate(time.time() + 5, usegmt=True)) <= 5
+    assert policy.delay(1, "Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert policy.delay(2, "soon") == 2
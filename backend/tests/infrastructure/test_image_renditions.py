@@ -0,0 +1,67 @@
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.infrastructure.images.image_pool import ImagePool, SourceSpool
+from app.infrastructure.images.renditions import render_webp_renditions
+
+SIZES = {"thumbnail": 256, "medium": 768}
+
+
+def png(width, height, mode="RGB"):
+    out = BytesIO()
+    Image.new(mode, (width, height), (200, 120, 40, 128)[: len(mode)]).save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_renditions_are_webp_bounded_and_never_upscaled():
+    renditions = render_webp_renditions(png(1536, 2048), SIZES)
+
+    images = {name: Image.open(BytesIO(data)) for name, data in renditions.items()}
+    assert {image.format for image in images.values()} == {"WEBP"}
+    assert images["medium"].size == (576, 768)
+    assert images["thumbnail"].size == (192, 256)
+
+    small = render_webp_renditions(png(300, 200), SIZES)
+    assert Image.open(BytesIO(small["medium"])).size == (300, 200)
+
+
+def test_renditions_keep_transparency():
+    rendition = render_webp_renditions(png(512, 512, mode="RGBA"), {"thumbnail": 64})["thumbnail"]
+    assert Image.open(BytesIO(rendition)).mode == "RGBA"
+
+
+async def stream(data, chunk_size=1000):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+@pytest.mark.asyncio
+async def test_source_spool_copies_the_stream_up_to_its_cap():
+    data = png(800, 600)
+    with SourceSpool(max_bytes=len(data)) as spool:
+        relayed = b"".join([chunk async for chunk in spool.tee(stream(data))])
+        assert relayed == data and spool.complete
+        with open(spool.path, "rb") as source:
+            assert source.read() == data
+        path = spool.path
+    assert not os.path.exists(path)
+
+    # Au-delà du plafond : le flux est relayé en entier, la copie abandonnée
+    with SourceSpool(max_bytes=len(data) - 1) as spool:
+        relayed = b"".join([chunk async for chunk in spool.tee(stream(data))])
+        assert relayed == data
+        assert spool.overflowed and not spool.complete and spool.path is None
+
+
+@pytest.mark.asyncio
+async def test_image_pool_renders_in_a_separate_process(tmp_path):
+    source = tmp_path / "output.png"
+    source.write_bytes(png(1024, 1024))
+    try:
+        renditions = await ImagePool.render_webp_renditions_from_file(str(source), SIZES, 80)
+    finally:
+        await ImagePool.close()
+    assert Image.open(BytesIO(renditions["thumbnail"])).size == (256, 256)
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from app.infrastructure.storage.s3_presigner import S3Presigner
+from app.infrastructure.storage.storage_repo import StorageRepository
+
+NOW = datetime(2026, 3, 14, 9, 26, 53, tzinfo=timezone.utc)
+KEYS = ["users/u1/bodies/b1/original.png", "users/u1/clothes/c 1/été+(1).jpg", "a/~b/c=d&e.png"]
+
+
+def s3_client(region="eu-west-3", **kwargs):
+    return boto3.client(
+        "s3",
+        region_name=region,
+        aws_access_key_id="AKIDEXAMPLE",
+        aws_secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        **kwargs,
+    )
+
+
+def boto3_urls(client, bucket, keys):
+    with mock.patch("botocore.auth.get_current_datetime", return_value=NOW.replace(tzinfo=None)):
+        return {
+            key: client.generate_presigned_url(
+                ClientMethod="get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=900,
+            )
+            for key in keys
+        }
+
+
+@pytest.mark.parametrize("bucket, options", [
+    ("tryon-bucket", {}),
+    ("tryon.assets", {"config": Config(signature_version="s3v4")}),
+    ("tryon-bucket", {"aws_session_token": "FQoGZXIvYXdzE//token=="}),
+])
+def test_presign_many_matches_boto3(bucket, options):
+    client = s3_client(**options)
+    presigner = S3Presigner(client, bucket)
+
+    assert presigner.presign_many(KEYS + ["", KEYS[0]], expires_in=900, now=NOW) == boto3_urls(client, bucket, KEYS)
+
+
+@pytest.mark.asyncio
+async def test_storage_presign_many_skips_empty_keys():
+    storage = StorageRepository(s3_client=s3_client(), bucket_name="tryon-bucket")
+
+    urls = await storage.presign_many([KEYS[0], None, KEYS[0]])
+
+    assert list(urls) == [KEYS[0]]
+    assert "X-Amz-Signature=" in urls[KEYS[0]]
+    assert (await storage.get_presigned_url(KEYS[0])).split("?")[0] == urls[KEYS[0]].split("?")[0]